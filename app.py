@@ -1,37 +1,67 @@
 import sys
-from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QIcon
-from ui.main_window import MainWindow
-from config import settings
+import time
+
+# Taken first so the startup profile covers the imports below
+LAUNCH = time.perf_counter()
+
+from core.startup import BackgroundCall, open_budget, profiler
+from ui.styles import preload_qss
+
+
+def _load_budget():
+    """Open the budget data and read the stylesheets (runs on a background thread)."""
+    preload_qss()
+    return open_budget()
 
 
 def main():
     """Main entry point for the application."""
-    # Enable high DPI scaling for better display on high-resolution screens
-    QApplication.setAttribute(Qt.AA_EnableHighDpiScaling, True)
-    QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps, True)
+    if "--serve" in sys.argv:
+        # Headless REST API; PyQt5 is never imported
+        from core.server import main as serve
+        sys.argv.remove("--serve")
+        return serve(sys.argv[1:])
+
+    if "--profile-startup" in sys.argv:
+        sys.argv.remove("--profile-startup")
+        profiler.start(LAUNCH)
+        profiler.record("app module imports", LAUNCH, time.perf_counter())
+
+    # Data files are read and indexed while PyQt5 loads and the window is built
+    budget_data = BackgroundCall("background data load", _load_budget)
+
+    with profiler.phase("import PyQt5 and ui"):
+        from PyQt5.QtWidgets import QApplication
+        from PyQt5.QtCore import Qt
+        from PyQt5.QtGui import QIcon
+        from ui.main_window import MainWindow
+        from ui.styles import read_qss
+        from config import settings
+
+    with profiler.phase("create QApplication"):
+        # Enable high DPI scaling for better display on high-resolution screens
+        QApplication.setAttribute(Qt.AA_EnableHighDpiScaling, True)
+        QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps, True)
 
-    # Create application instance
-    app = QApplication(sys.argv)
-    app.setStyle("Fusion")
+        # Create application instance
+        app = QApplication(sys.argv)
+        app.setStyle("Fusion")
 
-    # Load global QSS style if available
-    qss_file = settings.QSS_DIR / "app.qss"
-    if qss_file.exists():
-        with open(qss_file, "r", encoding="utf-8") as f:
-            app.setStyleSheet(f.read())
+        # Load global QSS style if available
+        app.setStyleSheet(read_qss("app.qss"))
 
-    # Set application icon
-    app.setWindowIcon(QIcon(str(settings.APP_ICON)))
+        # Set application icon
+        app.setWindowIcon(QIcon(str(settings.APP_ICON)))
 
     # Create and show main window
-    w = MainWindow()
-    w.show()
+    with profiler.phase("build main window"):
+        w = MainWindow(budget_data)
+    with profiler.phase("show main window"):
+        w.show()
 
     # Start the application event loop
     sys.exit(app.exec_())
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
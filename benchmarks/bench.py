@@ -0,0 +1,271 @@
+"""Benchmarks for BudgetManager and BudgetWindow on synthetic ledgers.
+
+Usage:
+    python benchmarks/bench.py                          # default sizes, JSON to stdout
+    python benchmarks/bench.py -o after.json --sizes 10x1000,100x100000
+    python benchmarks/bench.py -o after.json --compare before.json
+
+Sizes are CATEGORIESxEXPENSES. Every metric is reported in milliseconds
+(min / median / mean / p95 over its repetitions). The UI part runs under the
+offscreen Qt platform and is skipped with --no-ui or when PyQt5 is missing.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.budget_manager import BudgetManager  # noqa: E402
+from core.periods import current_period  # noqa: E402
+from core.storage import JournalStorage, JsonStorage  # noqa: E402
+
+
+DEFAULT_SIZES = "10x10,10x1000,50x10000,100x100000"
+DEFAULT_BACKENDS = "json,journal,sqlite,ledger"
+
+# Words combined into synthetic expense names (Arabic and Latin, like real statements)
+WORDS = ["قهوة", "مطعم", "بنزين", "سوبرماركت", "صيدلية", "فاتورة", "كهرباء", "ماء", "إنترنت", "جوال",
+         "ملابس", "هدية", "طبيب", "إيجار", "STARBUCKS", "AMAZON", "NETFLIX", "UBER", "IKEA", "CAREEM"]
+
+
+def parse_sizes(text):
+    """Parse "10x1000,100x100000" into [(categories, expenses)]."""
+    sizes = []
+    for part in text.split(","):
+        categories, expenses = part.lower().split("x")
+        sizes.append((int(categories), int(expenses)))
+    return sizes
+
+
+def make_ledger(categories, expenses, seed=0):
+    """Return a data document with the given number of categories and current-month expenses."""
+    rnd = random.Random(seed)
+    period = current_period()
+    days = [f"{period}-{day:02d}" for day in range(1, 29)]
+    data = {
+        "monthly_income": 10000.0,
+        "period": period,
+        "categories": [{"name": f"فئة {i}", "percentage": 100.0 / categories, "sub": []}
+                       for i in range(categories)],
+    }
+    for i in range(expenses):
+        c = data["categories"][rnd.randrange(categories)]
+        c["sub"].append({
+            "name": f"{rnd.choice(WORDS)} {rnd.choice(WORDS)} {i}",
+            "amount": round(rnd.uniform(1, 500), 2),
+            "date": rnd.choice(days),
+        })
+    return data
+
+
+def summarize(samples):
+    """Return min/median/mean/p95 (ms) of samples given in seconds."""
+    ms = sorted(s * 1000 for s in samples)
+    return {
+        "n": len(ms),
+        "min": round(ms[0], 3),
+        "median": round(statistics.median(ms), 3),
+        "mean": round(statistics.fmean(ms), 3),
+        "p95": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 3),
+    }
+
+
+def timed(function, repeat):
+    """Call function repeat times and return the wall-clock durations."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def open_manager(directory, backend):
+    """Open a synchronous BudgetManager on the data file of a benchmark directory."""
+    return BudgetManager(
+        os.path.join(directory, "data.json"), backend=backend, async_save=False,
+        periods_dir=os.path.join(directory, "periods")
+    )
+
+
+def full_save(storage, data):
+    """Write a complete snapshot; a journal writes the snapshot its compaction produces."""
+    if isinstance(storage, JournalStorage):
+        snapshot = dict(data, **{JournalStorage.SEQ_KEY: storage._seq})
+        JsonStorage.write(storage, JsonStorage.prepare(storage, snapshot))
+    else:
+        storage.write(storage.prepare(data))
+
+
+def bench_manager(data, backend, repeat, ops):
+    """Measure load, full save and single-operation latencies of one backend."""
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="budget-bench-") as directory:
+        JsonStorage(os.path.join(directory, "data.json"), backups=0).save(data)
+        # The first open builds backend-specific files (e.g. the SQLite import), not timed
+        open_manager(directory, backend).close()
+
+        managers = []
+
+        def load():
+            managers.append(open_manager(directory, backend))
+        results["load"] = timed(load, repeat)
+        for m in managers[:-1]:
+            m.close()
+        m = managers[-1]
+
+        results["save"] = timed(lambda: full_save(m.storage, m.data), repeat)
+
+        rnd = random.Random(1)
+        names = [c["name"] for c in m.get_categories()]
+        added = []
+
+        def add():
+            category = rnd.choice(names)
+            name = f"bench {len(added)}"
+            m.add_expense(category, name, 10.0)
+            added.append((category, name))
+        results["add_expense"] = timed(add, ops)
+
+        updates = iter(added)
+
+        def update():
+            category, name = next(updates)
+            m.update_expense(category, name, name + " *", 12.5)
+        results["update_expense"] = timed(update, ops)
+
+        deletes = iter(added)
+
+        def delete():
+            category, name = next(deletes)
+            m.delete_expense(category, name + " *")
+        results["delete_expense"] = timed(delete, ops)
+        m.close()
+    return results
+
+
+def bench_ui(app, data, repeat):
+    """Measure BudgetWindow reload and render times under the current Qt platform."""
+    from ui.budget_window import BudgetWindow
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="budget-bench-") as directory:
+        JsonStorage(os.path.join(directory, "data.json"), backups=0).save(data)
+        m = open_manager(directory, "json")
+        w = BudgetWindow(m)
+        w.resize(1280, 800)
+        w.show()
+        app.processEvents()
+
+        def run(method):
+            # Deferred work (visible card binding) runs on the next event-loop turn
+            method()
+            app.processEvents()
+
+        results["window_reload_all_data"] = timed(lambda: run(w._reload_all_data), repeat)
+        results["window_render_cards"] = timed(lambda: run(w._render_cards), repeat)
+        results["window_render_categories_table"] = timed(lambda: run(w._render_categories_table), repeat)
+        w.shutdown()
+        w.close()
+        w.deleteLater()
+        app.processEvents()
+        m.close()
+    return results
+
+
+def git_revision():
+    """Return the current git commit of the repository, or None."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(current, baseline_path):
+    """Print median ratios of current results against a baseline JSON file."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    before = {(r["size"], r["backend"], r["metric"]): r["ms"]["median"] for r in baseline["results"]}
+    print(f"{'size':>12} {'backend':>8} {'metric':>32} {'before':>10} {'after':>10} {'ratio':>7}",
+          file=sys.stderr)
+    for r in current["results"]:
+        key = (r["size"], r["backend"], r["metric"])
+        if key not in before:
+            continue
+        old, new = before[key], r["ms"]["median"]
+        ratio = new / old if old else float("inf")
+        flag = "  <-- slower" if ratio > 1.2 else ""
+        print(f"{key[0]:>12} {key[1]:>8} {key[2]:>32} {old:10.3f} {new:10.3f} {ratio:7.2f}{flag}",
+              file=sys.stderr)
+
+
+def main(argv=None):
+    """Run the benchmarks and write the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"CATEGORIESxEXPENSES list (default {DEFAULT_SIZES})")
+    parser.add_argument("--backends", default=DEFAULT_BACKENDS, help=f"storage backends (default {DEFAULT_BACKENDS})")
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions of load/save/render metrics")
+    parser.add_argument("--ops", type=int, default=20, help="operations timed for add/update/delete")
+    parser.add_argument("--no-ui", action="store_true", help="skip the BudgetWindow benchmarks")
+    parser.add_argument("-o", "--output", help="write JSON here instead of stdout")
+    parser.add_argument("--compare", help="baseline JSON to compare medians against")
+    args = parser.parse_args(argv)
+
+    app = None
+    if not args.no_ui:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        try:
+            from PyQt5.QtWidgets import QApplication
+            app = QApplication.instance() or QApplication([])
+        except ImportError:
+            print("PyQt5 is not installed; skipping UI benchmarks", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "ops": args.ops,
+        },
+        "results": [],
+    }
+
+    def add(size, backend, metrics):
+        """Append summarized metrics to the report."""
+        for metric, samples in metrics.items():
+            report["results"].append({"size": size, "backend": backend, "metric": metric, "ms": summarize(samples)})
+            print(f"{size:>12} {backend:>8} {metric:>32} {report['results'][-1]['ms']['median']:10.3f} ms",
+                  file=sys.stderr)
+
+    for categories, expenses in parse_sizes(args.sizes):
+        size = f"{categories}x{expenses}"
+        data = make_ledger(categories, expenses)
+        for backend in args.backends.split(","):
+            add(size, backend, bench_manager(data, backend, args.repeat, args.ops))
+        if app is not None:
+            add(size, "ui", bench_ui(app, data, args.repeat))
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
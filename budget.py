@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""Command-line interface to the budget data, for scripts and cron jobs (no Qt needed).
+
+Usage:
+    python budget.py add CATEGORY NAME AMOUNT [--date YYYY-MM-DD]
+    python budget.py update CATEGORY NAME AMOUNT [--rename NEW_NAME]
+    python budget.py delete CATEGORY NAME
+    python budget.py list [CATEGORY] [--json]
+    python budget.py summary [--json]
+    python budget.py income [AMOUNT]
+    python budget.py add-category NAME PERCENTAGE
+    python budget.py import < expenses.csv       # CATEGORY,NAME,AMOUNT[,DATE] per line
+    python budget.py --batch < commands.txt      # one command per line, saved once
+
+Every command opens the data file configured in config/settings.py (or
+--data) and saves synchronously before exiting. With --batch all commands
+are applied in one transaction: if any line fails, nothing is saved.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.cli import main  # noqa: E402
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except BrokenPipeError:
+        # Output piped into head or similar; changes were saved before printing
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
@@ -1,8 +1,10 @@
+import os
 import sys
-from pathlib import Path
 
+# Paths are plain strings: importing pathlib took a noticeable part of the budget.py CLI's startup
 
-def resource_path(relative_path: str) -> Path:
+
+def resource_path(relative_path: str) -> str:
     """
     Return the absolute path for a resource file.
     Works correctly both in development and after conversion to an executable using PyInstaller.
@@ -10,15 +12,15 @@ def resource_path(relative_path: str) -> Path:
     """
     try:
         # Temporary path created by PyInstaller at runtime
-        base_path = Path(sys._MEIPASS)
+        base_path = sys._MEIPASS
     except Exception:
         # Development environment path (before conversion to exe)
-        base_path = Path(__file__).resolve().parent.parent
-    return base_path / relative_path
+        base_path = BASE_DIR
+    return os.path.normpath(os.path.join(base_path, relative_path))
 
 
 # Base directory of the project (development environment)
-BASE_DIR = Path(__file__).resolve().parent.parent
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 
 # UI-related directories (read-only)
 CORE_DIR = resource_path("core")
@@ -35,14 +37,66 @@ CURRENCY = "ريال"
 # Store user data alongside the executable when frozen
 if getattr(sys, 'frozen', False):
     # Running from an executable file
-    BASE_PATH = Path(sys.executable).parent
+    BASE_PATH = os.path.dirname(sys.executable)
 else:
     # Development environment
     BASE_PATH = BASE_DIR
 
 # Writable data directory
-DATA_DIR = BASE_PATH / "core" / "data"
-DATA_DIR.mkdir(parents=True, exist_ok=True)  # Ensure the directory exists
+DATA_DIR = os.path.join(BASE_PATH, "core", "data")
+os.makedirs(DATA_DIR, exist_ok=True)  # Ensure the directory exists
 
 # JSON data file path
-DATA_FILE = DATA_DIR / "data.json"
+DATA_FILE = os.path.join(DATA_DIR, "data.json")
+
+# Storage backend used by BudgetManager:
+# "json" rewrites data.json on every change,
+# "journal" appends each change to data.json.journal and compacts it into data.json in the background
+# "sqlite" keeps categories and expenses in indexed tables in data.db (the open month is still
+#   loaded into memory at startup; earlier months go to PERIODS_DIR like with the other backends)
+# "ledger" keeps them in a memory-mapped binary file, data.ledger, appended to in place
+STORAGE_BACKEND = "journal"
+
+# Number of previous data.json versions kept in DATA_DIR for crash recovery
+BACKUP_GENERATIONS = 5
+
+# JSON library: "auto" picks orjson or ujson when installed, else the standard library
+JSON_CODEC = "auto"
+# JSON library of the budget.py CLI: the standard library imports in a fraction of orjson's
+# time, which matters more than parsing speed for one command on the current month's data
+CLI_JSON_CODEC = "json"
+# Write data.json without indentation (smaller and faster); set False for a hand-readable file
+JSON_COMPACT = True
+
+# Extra options passed to each storage backend
+STORAGE_OPTIONS = {
+    "json": {
+        "backups": BACKUP_GENERATIONS,
+        "codec": JSON_CODEC,
+        "compact": JSON_COMPACT,
+    },
+    "journal": {
+        "max_records": 1000,          # compact after this many journal records
+        "max_bytes": 1024 * 1024,     # or once the journal reaches this size
+        "backups": BACKUP_GENERATIONS,
+        "codec": JSON_CODEC,
+        "compact": JSON_COMPACT,
+    },
+}
+
+# Write changes on a background thread, debounced by this many milliseconds
+ASYNC_SAVE = True
+SAVE_DEBOUNCE_MS = 300
+
+# Only the current month is kept in data.json; earlier months are archived as
+# DATA_DIR/periods/YYYY-MM.json and this many of them stay cached once loaded
+PERIODS_DIR = os.path.join(DATA_DIR, "periods")
+PERIOD_CACHE_SIZE = 12
+
+# Address of the REST API started with `python app.py --serve`
+# (keep it on localhost unless the network is trusted: there is no authentication)
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+
+# User rules that pick a category for imported or quickly added expenses
+RULES_FILE = os.path.join(DATA_DIR, "rules.json")
@@ -0,0 +1,421 @@
+import threading
+import numpy as np
+from core.events import ChangeEvent
+from core.records import ExpenseList
+
+
+class ExpenseColumns:
+    """Expenses stored column-wise: category id, amount and day of each expense.
+
+    Columns live in over-allocated arrays so single additions append in
+    amortized O(1); ``size`` is the number of rows in use. Rows of the open
+    month also keep their expense name, so an update patches its row in
+    place and a deletion marks rows dead (``dead`` counts them) instead of
+    rebuilding the columns.
+    """
+
+    def __init__(self, names, percentages, cat_ids, amounts, days, expense_names=None, segments=None):
+        """Initialize ExpenseColumns from category metadata and column arrays.
+
+        expense_names gives the name of each open-month row (None for other
+        rows) and segments maps a category id to the (start, end) rows its
+        open-month expenses were built from, in their order.
+        """
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.percentages = np.asarray(percentages, dtype=np.float64)
+        self.size = len(amounts)
+        self.dead = 0
+        self._cat_ids = np.asarray(cat_ids, dtype=np.int32)
+        self._amounts = np.asarray(amounts, dtype=np.float64)
+        self._days = np.asarray(days, dtype="datetime64[D]")
+        self._alive = np.ones(self.size, dtype=bool)
+        self._expense_names = [None] * self.size if expense_names is None else expense_names
+        self._segments = segments or {}
+        # category id -> open-month rows appended since the columns were built
+        self._appended = {}
+        # Amounts sorted by (category, amount) and the row count of each category, once asked for
+        self._sorted = None
+        self._counts = None
+
+    @classmethod
+    def from_documents(cls, documents, default_day, tracked=None):
+        """Build columns from period documents (the live data and/or archived months).
+
+        Categories holding an ExpenseList are copied a column at a time. The
+        expense names of the tracked document (the open month, which updates
+        and deletions apply to) are kept.
+        """
+        names = []
+        index = {}
+        percentages = []
+        cat_ids, amounts, days = [], [], []
+        expense_names = []
+        segments = {}
+        size = 0
+        for document in documents:
+            default = document.get("period")
+            default = np.datetime64(f"{default}-01" if default else default_day, "D")
+            for c in document.get("categories", []):
+                i = index.get(c["name"])
+                if i is None:
+                    i = index[c["name"]] = len(names)
+                    names.append(c["name"])
+                    percentages.append(c["percentage"])
+                sub = c["sub"]
+                if isinstance(sub, ExpenseList):
+                    category_amounts = np.frombuffer(sub.amounts(), dtype=np.float64)
+                    category_days = np.array(sub.dates(), dtype="datetime64[D]")
+                    category_names = sub.names()
+                else:
+                    category_amounts = np.array([s["amount"] for s in sub], dtype=np.float64)
+                    category_days = np.array([s.get("date") for s in sub], dtype="datetime64[D]")
+                    category_names = [s["name"] for s in sub]
+                # Undated expenses belong to the document's period
+                category_days[np.isnat(category_days)] = default
+                count = len(category_amounts)
+                cat_ids.append(np.full(count, i, dtype=np.int32))
+                amounts.append(category_amounts)
+                days.append(category_days)
+                # Only the first record of a name is changed by the manager, like its name indexes
+                if document is tracked and i not in segments:
+                    segments[i] = (size, size + count)
+                    expense_names.extend(category_names)
+                else:
+                    expense_names.extend([None] * count)
+                size += count
+        if not cat_ids:
+            return cls(names, percentages, [], [], [])
+        # Concatenated copies, so no view keeps the ExpenseList arrays from growing
+        return cls(names, percentages, np.concatenate(cat_ids), np.concatenate(amounts), np.concatenate(days),
+                   expense_names, segments)
+
+    # Columns, trimmed to the rows in use
+    def _column(self, column):
+        """Return the live rows of a column."""
+        column = column[:self.size]
+        return column[self._alive[:self.size]] if self.dead else column
+
+    @property
+    def cat_ids(self):
+        """Return the category id of every expense."""
+        return self._column(self._cat_ids)
+
+    @property
+    def amounts(self):
+        """Return the amount of every expense."""
+        return self._column(self._amounts)
+
+    @property
+    def days(self):
+        """Return the date of every expense as datetime64[D]."""
+        return self._column(self._days)
+
+    def sorted_amounts(self):
+        """Return (amounts sorted by category then amount, row count of each category).
+
+        Sorted once, then kept in order by the changes that follow.
+        """
+        if self._sorted is None:
+            cat_ids, amounts = self.cat_ids, self.amounts
+            self._sorted = amounts[np.lexsort((amounts, cat_ids))]
+            self._counts = np.bincount(cat_ids, minlength=len(self.names))
+        return self._sorted, self._counts
+
+    def _sorted_position(self, i, amount):
+        """Return the position of amount among the sorted amounts of category i."""
+        start = int(self._counts[:i].sum())
+        return start + int(np.searchsorted(self._sorted[start:start + self._counts[i]], amount))
+
+    def _sorted_insert(self, i, amount):
+        """Insert an amount into the sorted view, if it was built."""
+        if self._sorted is not None:
+            self._sorted = np.insert(self._sorted, self._sorted_position(i, amount), amount)
+            self._counts[i] += 1
+
+    def _sorted_remove(self, i, amount):
+        """Remove an amount from the sorted view, if it was built."""
+        if self._sorted is not None:
+            self._sorted = np.delete(self._sorted, self._sorted_position(i, amount))
+            self._counts[i] -= 1
+
+    # Changes
+    def add_category(self, name, percentage):
+        """Add an empty category."""
+        if name in self.index:
+            return False
+        self.index[name] = len(self.names)
+        self.names.append(name)
+        self.percentages = np.append(self.percentages, percentage)
+        if self._counts is not None:
+            self._counts = np.append(self._counts, 0)
+        return True
+
+    def update_category(self, old_name, name, percentage):
+        """Rename a category and/or change its percentage."""
+        i = self.index.pop(old_name, None)
+        if i is None:
+            return False
+        self.names[i] = name
+        self.index[name] = i
+        self.percentages[i] = percentage
+        return True
+
+    def append(self, category, amount, day, name=None):
+        """Append one expense, growing the arrays geometrically when full.
+
+        name is given for an expense of the open month, so later updates and
+        deletions can find its row.
+        """
+        i = self.index.get(category)
+        if i is None:
+            return False
+        if self.size == len(self._amounts):
+            capacity = max(16, 2 * self.size)
+            self._cat_ids = np.resize(self._cat_ids, capacity)
+            self._amounts = np.resize(self._amounts, capacity)
+            self._days = np.resize(self._days, capacity)
+            self._alive = np.resize(self._alive, capacity)
+        self._cat_ids[self.size] = i
+        self._amounts[self.size] = amount
+        self._days[self.size] = np.datetime64(day, "D")
+        self._alive[self.size] = True
+        self._expense_names.append(name)
+        if name is not None:
+            self._appended.setdefault(i, []).append(self.size)
+        self._sorted_insert(i, amount)
+        self.size += 1
+        return True
+
+    def _rows_named(self, i, name):
+        """Yield the live open-month rows of category i called name, in the order of its expenses."""
+        names = self._expense_names
+        start, end = self._segments.get(i, (0, 0))
+        while True:
+            try:
+                row = names.index(name, start, end)
+            except ValueError:
+                break
+            yield row
+            start = row + 1
+        for row in self._appended.get(i, ()):
+            if names[row] == name:
+                yield row
+
+    def update(self, category, old_name, name, amount):
+        """Rename and re-price the first open-month expense called old_name, like the manager does."""
+        i = self.index.get(category)
+        row = None if i is None else next(self._rows_named(i, old_name), None)
+        if row is None:
+            return False
+        self._sorted_remove(i, self._amounts[row])
+        self._sorted_insert(i, amount)
+        self._amounts[row] = amount
+        self._expense_names[row] = name
+        return True
+
+    def remove(self, category, name):
+        """Mark every open-month expense called name dead."""
+        i = self.index.get(category)
+        if i is None:
+            return False
+        for row in list(self._rows_named(i, name)):
+            self._sorted_remove(i, self._amounts[row])
+            self._alive[row] = False
+            self._expense_names[row] = None
+            self.dead += 1
+        return True
+
+
+class BudgetAnalytics:
+    """Vectorized reports over the expenses of a BudgetManager.
+
+    Expenses are copied once into NumPy columns and kept in sync through the
+    manager's change events: added expenses are appended, updated ones
+    patched and deleted ones marked dead in place, and category changes
+    patch the category list. Deleting a category, closing the month or
+    reloading the data drops the columns so the next query rebuilds them,
+    as does a pile-up of dead rows. With include_archived the archived
+    months are loaded too (slower to build).
+    """
+
+    def __init__(self, manager, include_archived=False):
+        """Initialize BudgetAnalytics and subscribe to the manager's changes."""
+        self.m = manager
+        self.include_archived = include_archived
+        self._columns = None
+        # Results derived from the columns, cleared whenever they change
+        self._derived = {}
+        self._lock = threading.Lock()
+        manager.subscribe(self._on_change)
+
+    def close(self):
+        """Stop following the manager."""
+        self.m.unsubscribe(self._on_change)
+
+    # Cache maintenance
+    def _on_change(self, event):
+        """Keep the cached columns in step with a manager change."""
+        with self._lock:
+            columns = self._columns
+            if columns is None:
+                return
+            kind = event.kind
+            if kind == ChangeEvent.INCOME_CHANGED:
+                return
+            if kind == ChangeEvent.EXPENSE_ADDED:
+                if (event.date or "")[:7] >= self.m.get_current_period():
+                    patched = columns.append(event.category, event.value, event.date, event.expense)
+                elif self.include_archived:
+                    patched = columns.append(event.category, event.value, event.date)
+                else:
+                    # Archived, and archived months are not loaded
+                    return
+            elif kind == ChangeEvent.EXPENSE_UPDATED:
+                patched = columns.update(event.category, event.old_expense, event.expense, event.value)
+            elif kind == ChangeEvent.EXPENSE_DELETED:
+                patched = columns.remove(event.category, event.expense)
+            elif kind == ChangeEvent.CATEGORY_ADDED:
+                patched = columns.add_category(event.category, event.value)
+            elif kind == ChangeEvent.CATEGORY_UPDATED:
+                patched = columns.update_category(event.old_category, event.category, event.value)
+            else:
+                patched = False
+            # Rebuilt once more than half the rows are dead, to give their memory back
+            if not patched or columns.dead > columns.size // 2:
+                self._columns = None
+            self._derived = {}
+
+    def _current_columns(self):
+        """Return the columns, building them from the manager's data; needs both locks."""
+        if self._columns is None:
+            documents = [self.m.data]
+            if self.include_archived:
+                current = self.m.get_current_period()
+                documents += [self.m.get_period(p) or {} for p in self.m.get_periods() if p != current]
+            self._columns = ExpenseColumns.from_documents(
+                documents, f"{self.m.get_current_period()}-01", tracked=self.m.data
+            )
+            self._derived = {}
+        return self._columns
+
+    def columns(self):
+        """Return the cached ExpenseColumns, building them if needed."""
+        # Manager lock first: _on_change runs under its write lock and then takes self._lock
+        with self.m.read_lock, self._lock:
+            return self._current_columns()
+
+    def _derive(self, key, build):
+        """Return build(columns), computed once until the columns change."""
+        with self.m.read_lock, self._lock:
+            columns = self._current_columns()
+            if key not in self._derived:
+                self._derived[key] = build(columns)
+            return self._derived[key]
+
+    # Group-by
+    def spent_array(self):
+        """Return the spent amount of every category as an array ordered like columns().names."""
+        return self._derive("spent", lambda columns: np.bincount(
+            columns.cat_ids, weights=columns.amounts, minlength=len(columns.names)
+        ))
+
+    def spent_by_category(self):
+        """Return {category: spent}."""
+        with self.m.read_lock:
+            return dict(zip(self.columns().names, self.spent_array().tolist()))
+
+    def spent_by_month(self):
+        """Return {category: {YYYY-MM: spent}} in one grouped pass."""
+        return self._derive("by_month", self._spent_by_month)
+
+    @staticmethod
+    def _spent_by_month(columns):
+        """Group the amounts of columns by category and month."""
+        n = len(columns.names)
+        result = {name: {} for name in columns.names}
+        if columns.size:
+            # Months as consecutive integers, so grouping needs no sort
+            months = columns.days.astype("datetime64[M]").astype(np.int64)
+            first = months.min()
+            span = int(months.max() - first) + 1
+            totals = np.bincount(
+                (months - first) * n + columns.cat_ids, weights=columns.amounts, minlength=span * n
+            ).reshape(span, n)
+            for j, i in zip(*np.nonzero(totals)):
+                label = str(np.datetime64(int(first + j), "M"))
+                result[columns.names[i]][label] = float(totals[j, i])
+        return result
+
+    def percentiles(self, q=(50, 90, 95)):
+        """Return {category: [percentile of expense amounts for each q]} (linear interpolation).
+
+        Every category is computed at once: amounts are sorted by (category,
+        amount) and each percentile is read at its interpolated offset. The
+        sort is kept up to date by later changes, so it is paid once.
+        """
+        q = np.asarray(q, dtype=np.float64) / 100.0
+        with self.m.read_lock, self._lock:
+            columns = self._current_columns()
+            amounts, counts = columns.sorted_amounts()
+            # Copied: later changes update the counts and names in place
+            counts = counts.copy()
+            names = list(columns.names)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+        has_rows = counts > 0
+        position = q[None, :] * (counts[has_rows, None] - 1)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, counts[has_rows, None] - 1)
+        fraction = position - lower
+        base = starts[has_rows, None]
+        values = amounts[base + lower] * (1 - fraction) + amounts[base + upper] * fraction
+
+        result = {name: [0.0] * len(q) for name in names}
+        for name, row in zip(np.asarray(names, dtype=object)[has_rows], values.tolist()):
+            result[name] = row
+        return result
+
+    # Budget checks
+    def allocations(self, percentages=None, income=None):
+        """Return the allocated amount of every category for the given (default: current) split."""
+        with self.m.read_lock:
+            columns = self.columns()
+            income = self.m.get_monthly_income() if income is None else income
+            return income * (columns.percentages if percentages is None else percentages) / 100.0
+
+    def overspent(self, threshold=1.0):
+        """Return [(category, spent, allocated)] of categories spending over threshold × allocation, worst first."""
+        with self.m.read_lock:
+            names = list(self.columns().names)
+            spent = self.spent_array()
+            allocated = self.allocations()
+        over = np.nonzero(spent > allocated * threshold)[0]
+        over = over[np.argsort(allocated[over] - spent[over])]
+        return [(names[i], float(spent[i]), float(allocated[i])) for i in over.tolist()]
+
+    def what_if(self, changes=None, income=None):
+        """Return the totals of a hypothetical reallocation without touching the manager.
+
+        changes maps category names to new percentages; other categories keep
+        theirs. Returns a dict with per-category "allocated", "remaining" and
+        "overspent" arrays (ordered like columns().names) plus the totals.
+        """
+        with self.m.read_lock:
+            columns = self.columns()
+            percentages = columns.percentages.copy()
+            for name, percentage in (changes or {}).items():
+                if name not in columns.index:
+                    raise ValueError("الفئة غير موجودة.")
+                percentages[columns.index[name]] = percentage
+
+            allocated = self.allocations(percentages, income)
+            remaining = allocated - self.spent_array()
+        return {
+            "names": list(columns.names),
+            "allocated": allocated,
+            "remaining": remaining,
+            "overspent": remaining < 0,
+            "percentage_total": float(percentages.sum()),
+            "remaining_total": float(remaining.sum()),
+        }
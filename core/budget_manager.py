@@ -1,40 +1,555 @@
-import json
+import datetime
+import functools
+import math
 import os
+from contextlib import contextmanager
+from core.events import ChangeEvent, apply_event, expense_period
+from core.locks import FileLock, RWLock
+from core.periods import PeriodStore, current_period, parse_date
+from core.records import Category, to_records
+from core.rollups import RollupIndex
+from core.storage import BackgroundWriter, ChangeMonitor, open_storage
+
+
+# Slack allowed when checking that percentages add up to at most 100,
+# since the running total accumulates floating point error
+PERCENT_TOLERANCE = 1e-6
+
+
+def _locked(method):
+    """Run a mutator while holding the manager lock for writing."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _reading(method):
+    """Run a reader while holding the manager lock for reading, alongside other readers."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock.read_lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class BudgetManager:
     """Manages income, categories, and expenses data stored in data.json."""
 
-    def __init__(self, data_file="core/data/data.json"):
-        """Initialize BudgetManager with data file path."""
+    def __init__(self, data_file="core/data/data.json", backend="json", debug_checks=False,
+                 async_save=False, save_delay=0.3, periods_dir=None, period_cache_size=12,
+                 **storage_options):
+        """Initialize BudgetManager with data file path and storage backend.
+
+        With debug_checks enabled the name indexes are verified against the raw
+        data after every mutation (slow, meant for tests). With async_save,
+        saves are debounced by save_delay seconds and written on a background
+        thread; register with subscribe_saves() to learn how they went.
+
+        Only the current month is kept in the data file. Expenses of earlier
+        months are archived under periods_dir (default: a "periods" folder next
+        to the data file) and loaded on demand through get_period(). Monthly
+        per-category totals of every period are kept in a rollup index
+        (get_period_totals(), get_category_trend()) so reports over past months
+        do not have to load their files.
+
+        Mutators hold an internal lock for writing and summaries hold it for
+        reading, so the manager can be shared between threads. Other
+        processes using the same data file are kept out during saves by an
+        advisory lock on "<data_file>.lock"; changes they made are merged by
+        reload_if_changed(), and before any save would overwrite them.
+        """
         self.data_file = data_file
-        self.data = self._load()
+        self.debug_checks = debug_checks
+        self.storage = open_storage(data_file, backend, **storage_options)
+        self._file_lock = FileLock(str(data_file) + ".lock")
+        self.storage.lock = self._file_lock
+        self.monitor = ChangeMonitor(self.storage, self._file_lock)
+        with self._file_lock.shared():
+            self.data = self._load()
+            self.monitor.mark()
+        self._lock = RWLock()
+        self._listeners = []
+        self._save_listeners = []
+        self._writer = None
+        if async_save:
+            self._writer = BackgroundWriter(
+                self.storage, self._lock.read_lock, lambda: self.data, delay=save_delay,
+                on_done=self._notify_saved, monitor=self.monitor, refresh=self.reload_if_changed
+            )
+        # Open batch() nesting level and the events it has deferred
+        self._batch_depth = 0
+        self._pending_events = []
+        # Expenses dated in archived periods, written to their files when the batch ends
+        self._pending_archive = []
+        self._last_batch_saved = True
+        # Name indexes: category name -> record, category name -> {expense name -> row of its first expense}
+        # (None once deletions have moved rows; rebuilt by _expense_rows() when next needed)
+        self._categories = {}
+        self._expenses = {}
+        # Running totals: category name -> spent amount, plus global sums
+        self._spent = {}
+        self._spent_total = 0.0
+        self._percentage_total = 0.0
+        # Word index over the current month's expense names, created on the first search
+        self._search_index = None
+
+        if periods_dir is None:
+            periods_dir = os.path.join(os.path.dirname(os.path.abspath(data_file)), "periods")
+        codec = storage_options.get("codec", "auto")
+        self.periods = PeriodStore(periods_dir, period_cache_size, codec)
+        self.rollups = RollupIndex(os.path.join(periods_dir, "_rollups.json"), self._period_amounts, codec)
+        rollups_changed = self.rollups.load(self.periods)
+        self._rebuild_indexes()
+        if rollups_changed:
+            self._save_rollups()
+        self._check_period()
 
     # Basic operations
     def _load(self):
-        """Load data from JSON file."""
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except Exception:
-                return {}
-        return {}
-
-    def _save(self):
-        """Save data to JSON file."""
+        """Load data through the storage backend, as Category records."""
         try:
-            with open(self.data_file, "w", encoding="utf-8") as f:
-                json.dump(self.data, f, ensure_ascii=False, indent=2)
-            return True
+            return to_records(self.storage.load())
         except Exception:
+            return {}
+
+    def _save(self, events=()):
+        """Persist data (and the events that produced it) through the storage backend."""
+        if self._writer:
+            self._writer.submit(events)
+            return True
+        reloaded = None
+        try:
+            with self._file_lock:
+                if self.monitor.changed():
+                    # Another process saved since we last did: keep its changes and replay ours over them
+                    reloaded = self._merge_external(events)
+                self.storage.write(self.storage.prepare(self.data, events))
+                self.monitor.mark()
+        except Exception as e:
+            self._notify_saved(False, str(e))
             return False
+        finally:
+            if reloaded is not None:
+                self._notify(reloaded)
+        self._notify_saved(True, "")
+        return True
+
+    def flush(self):
+        """Wait until every scheduled save has been written."""
+        if self._writer:
+            self._writer.flush()
+
+    def close(self):
+        """Flush and release the storage backend."""
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+        self.storage.close()
+        self._file_lock.close()
+
+    # External changes
+    def watched_paths(self):
+        """Return the files another process changes when it saves the same data."""
+        return self.storage.paths()
+
+    def reload_if_changed(self):
+        """Merge the changes another process saved to the data files; return True if anything changed.
+
+        Only the files are stat'ed when nothing changed, so this can be
+        called on every file watcher notification. Changes made here but not
+        yet written are replayed over the reloaded data, and listeners
+        receive one DATA_RELOADED event naming the categories that changed.
+        """
+        with self._lock:
+            with self._file_lock.shared():
+                if not self.monitor.changed():
+                    return False
+                event = self._merge_external(self._writer.unwritten() if self._writer else ())
+            if event is None:
+                return False
+            self._commit(event, persist=False)
+            return True
+
+    def _merge_external(self, unwritten=()):
+        """Adopt the data on disk plus the unwritten events; return a DATA_RELOADED event, or None.
+
+        Called with both locks held. Categories whose percentage and expenses
+        are unchanged keep their records; only the changed ones are replaced.
+        """
+        try:
+            data = self.storage.load()
+        except Exception as e:
+            print(f"Error reloading data: {e}")
+            return None
+        finally:
+            self.monitor.mark()
+        for event in unwritten:
+            try:
+                apply_event(data, event)
+            except Exception as e:
+                print(f"Error replaying change: {e}")
+        to_records(data)
+
+        old = {}
+        for c in self.get_categories():
+            old.setdefault(c["name"], c)
+        cats = data.get("categories", [])
+        changed = []
+        for i, c in enumerate(cats):
+            previous = old.pop(c["name"], None)
+            if previous is not None and previous["percentage"] == c["percentage"] and previous["sub"] == c["sub"]:
+                cats[i] = previous
+            else:
+                changed.append(c["name"])
+        # Categories left in old were deleted
+        changed.extend(old)
+        if (not changed and data.get("monthly_income") == self.data.get("monthly_income")
+                and data.get("period") == self.data.get("period")
+                and [c["name"] for c in cats] == [c["name"] for c in self.get_categories()]):
+            return None
+
+        period_closed = data.get("period") != self.data.get("period")
+        self.data = data
+        if period_closed:
+            # The other process archived a month into the period files
+            self.periods.invalidate()
+            self.rollups.refresh(self.periods)
+        self._rebuild_indexes()
+        if period_closed:
+            self._save_rollups()
+        return ChangeEvent(ChangeEvent.DATA_RELOADED, value=changed)
+
+    # Indexes
+    def _rebuild_indexes(self):
+        """Rebuild the name indexes and cached totals from self.data."""
+        self._categories = {}
+        self._expenses = {}
+        self._spent = {}
+        self._spent_total = 0.0
+        self._percentage_total = 0.0
+        for c in self.data.get("categories", []):
+            self._percentage_total += c["percentage"]
+            spent = c["sub"].total()
+            self._spent_total += spent
+            if c["name"] in self._categories:
+                # Keep the first record, as the linear lookups always did
+                continue
+            self._categories[c["name"]] = c
+            self._spent[c["name"]] = spent
+            self._expenses[c["name"]] = c["sub"].first_rows()
+        self.rollups.rebuild_live(self.data, self.get_current_period())
+        if self._search_index is not None:
+            self._search_index.invalidate()
+
+    def verify_indexes(self):
+        """Raise RuntimeError if the name indexes or cached totals disagree with self.data."""
+        expected_cats = {}
+        expected_exps = {}
+        for c in self.data.get("categories", []):
+            if c["name"] in expected_cats:
+                continue
+            expected_cats[c["name"]] = id(c)
+            by_name = expected_exps[c["name"]] = {}
+            for i, s in enumerate(c["sub"]):
+                by_name.setdefault(s["name"], i)
+
+        actual_cats = {name: id(c) for name, c in self._categories.items()}
+        actual_exps = {cat: self._expense_rows(cat) for cat in self._expenses}
+        if actual_cats != expected_cats:
+            raise RuntimeError("Category index is out of sync with data.")
+        if actual_exps != expected_exps:
+            raise RuntimeError("Expense index is out of sync with data.")
+
+        cats = self.data.get("categories", [])
+        if not math.isclose(self._percentage_total, sum(c["percentage"] for c in cats), abs_tol=1e-6):
+            raise RuntimeError("Cached percentage total is out of sync with data.")
+        if not math.isclose(self._spent_total, sum(s["amount"] for c in cats for s in c["sub"]), abs_tol=1e-6):
+            raise RuntimeError("Cached spent total is out of sync with data.")
+        for name, c in self._categories.items():
+            if not math.isclose(self._spent[name], sum(s["amount"] for s in c["sub"]), abs_tol=1e-6):
+                raise RuntimeError(f"Cached spent amount of '{name}' is out of sync with data.")
+
+        expected = RollupIndex(self.rollups.path, self._period_amounts)
+        expected.rebuild_live(self.data, self.get_current_period())
+        for period in expected.periods():
+            actual = {name: (b["sum"], b["count"]) for name, b in self.rollups.period_totals(period).items()}
+            wanted = {name: (b["sum"], b["count"]) for name, b in expected.period_totals(period).items()}
+            if actual.keys() != wanted.keys() or any(
+                    actual[n][1] != wanted[n][1] or not math.isclose(actual[n][0], wanted[n][0], abs_tol=1e-6)
+                    for n in wanted):
+                raise RuntimeError(f"Rollups of period {period} are out of sync with data.")
+
+        from core.search import SearchIndex
+        if self.search_index.keys() != SearchIndex(self.get_categories).keys():
+            raise RuntimeError("Search index is out of sync with data.")
+
+    def _expense_rows(self, category_name):
+        """Return {expense name: row of its first expense} of a category, or None if it does not exist."""
+        rows = self._expenses.get(category_name)
+        if rows is None and category_name in self._categories:
+            rows = self._expenses[category_name] = self._categories[category_name]["sub"].first_rows()
+        return rows
+
+    @property
+    def search_index(self):
+        """The word index of the search, created on first use."""
+        if self._search_index is None:
+            # Imported here so the command line does not pay for it
+            from core.search import SearchIndex
+            self._search_index = SearchIndex(self.get_categories)
+        return self._search_index
+
+    @property
+    def read_lock(self):
+        """The manager lock taken for reading, to read several values consistently."""
+        return self._lock.read_lock
+
+    def get_category(self, name: str):
+        """Return the category record with the given name, or None."""
+        return self._categories.get(name)
+
+    # Summaries
+    @_reading
+    def get_category_summary(self, name: str):
+        """Return allocated/spent/remaining totals of one category, or None."""
+        c = self._categories.get(name)
+        if c is None:
+            return None
+        allocated = self.get_monthly_income() * c["percentage"] / 100.0
+        spent = self._spent[name]
+        return {
+            "name": name,
+            "percentage": c["percentage"],
+            "allocated": allocated,
+            "spent": spent,
+            "remaining": allocated - spent,
+            "percent_used": (spent / allocated * 100) if allocated > 0 else 0.0,
+        }
+
+    @_reading
+    def get_summary(self):
+        """Return global totals read from the cached aggregates."""
+        income = self.get_monthly_income()
+        allocated = income * self._percentage_total / 100.0
+        return {
+            "income": income,
+            "percentage_total": self._percentage_total,
+            "percentage_remaining": max(100.0 - self._percentage_total, 0.0),
+            "allocated": allocated,
+            "spent": self._spent_total,
+            "remaining": allocated - self._spent_total,
+            "categories": len(self._categories),
+        }
+
+    # Change notification
+    def subscribe(self, callback):
+        """Register a callback invoked with a ChangeEvent after each mutation."""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        """Remove a previously registered change callback."""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def subscribe_saves(self, callback):
+        """Register a callback(ok, error) invoked after each write to disk.
+
+        With async_save the callback runs on the writer thread.
+        """
+        if callback not in self._save_listeners:
+            self._save_listeners.append(callback)
+
+    def _notify_saved(self, ok, error):
+        """Report the outcome of a write to the save listeners."""
+        for callback in list(self._save_listeners):
+            try:
+                callback(ok, error)
+            except Exception as e:
+                print(f"Error in save listener: {e}")
+
+    def _commit(self, event, persist=True):
+        """Persist the data and notify listeners, or defer both inside a batch.
+
+        persist=False only notifies, for changes already written elsewhere
+        (e.g. an expense added to an archived period).
+        """
+        if self.debug_checks:
+            self.verify_indexes()
+        if self._batch_depth:
+            self._pending_events.append((event, persist))
+            return True
+        return self._flush([(event, persist)])
+
+    def _flush(self, items):
+        """Save once for the given (event, persist) items, then notify listeners of each."""
+        to_save = [event for event, persist in items if persist]
+        saved = self._save(to_save) if to_save else True
+        for event, _ in items:
+            self._notify(event)
+        return saved
+
+    def _notify(self, event):
+        """Pass a ChangeEvent to every change listener."""
+        for callback in list(self._listeners):
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Error in change listener: {e}")
+
+    # Transactions
+    @contextmanager
+    def batch(self):
+        """Group mutations into one save and one round of notifications.
+
+        If the block raises, self.data is rolled back to its state before the
+        outermost batch and nothing is saved or notified. Expenses dated in
+        archived periods are written to their period files once, when the
+        outermost batch ends. Nested batches join the outermost one.
+        """
+        with self._lock:
+            if self._batch_depth:
+                self._batch_depth += 1
+                try:
+                    yield self
+                finally:
+                    self._batch_depth -= 1
+                return
+
+            self._check_period()
+            import copy
+            snapshot = copy.deepcopy(self.data)
+            self._batch_depth = 1
+            try:
+                yield self
+            except BaseException:
+                self.data = snapshot
+                self._rebuild_indexes()
+                raise
+            finally:
+                self._batch_depth = 0
+                events, self._pending_events = self._pending_events, []
+                archive, self._pending_archive = self._pending_archive, []
+            if archive:
+                self._archive_expenses(archive)
+            self._last_batch_saved = self._flush(events) if events else True
+
+    # Periods
+    def _check_period(self):
+        """Archive expenses of finished months once the calendar month has changed."""
+        period = current_period()
+        if self.data.get("period") == period:
+            return
+        # The period files are written before the data file drops the archived
+        # expenses; archive() skips them if this is repeated after a failed save.
+        # The file lock keeps another instance from archiving at the same time.
+        with self._lock, self._file_lock:
+            self.periods.archive(self.data, period)
+            event = ChangeEvent(ChangeEvent.PERIOD_CLOSED, value=period)
+            apply_event(self.data, event)
+            self.rollups.refresh(self.periods)
+            self._rebuild_indexes()
+            self._save_rollups()
+            self._commit(event)
+
+    def get_current_period(self) -> str:
+        """Return the YYYY-MM period held in the data file."""
+        return self.data.get("period") or current_period()
+
+    def get_periods(self):
+        """Return every known period (archived ones plus the current one), oldest first."""
+        periods = self.periods.periods()
+        current = self.get_current_period()
+        return periods if current in periods else periods + [current]
+
+    def get_period(self, period: str):
+        """Return the document of a period, loading an archived one on demand."""
+        if period == self.get_current_period():
+            return self.data
+        return self.periods.get(period)
+
+    def iter_expenses(self, periods=None):
+        """Yield (period, category name, expense) over the given (default: all) periods.
+
+        Archived months are read one at a time without entering the period
+        cache, and the current month is copied one category at a time under
+        the lock, so a long scan holds neither the whole ledger nor the lock.
+        """
+        current = self.get_current_period()
+        for period in self.get_periods() if periods is None else periods:
+            if period == current:
+                with self._lock.read_lock:
+                    names = [c["name"] for c in self.get_categories()]
+                for name in names:
+                    with self._lock.read_lock:
+                        c = self._categories.get(name)
+                        expenses = c["sub"].copy() if c else []
+                    for expense in expenses:
+                        yield self._period_of(expense), name, expense
+            else:
+                document = self.periods.read(period) or {}
+                for c in document.get("categories", []):
+                    for expense in c["sub"]:
+                        yield period, c["name"], expense
+
+    # Rollups
+    def _period_of(self, expense):
+        """Return the period an expense of the data file belongs to."""
+        return expense_period(expense, self.get_current_period())
+
+    def _period_amounts(self, period, category_name):
+        """Return the expense amounts of a category in a period (rollup min/max source)."""
+        if period >= self.get_current_period():
+            c = self._categories.get(category_name)
+            return [s["amount"] for s in c["sub"] if self._period_of(s) == period] if c else []
+        document = self.periods.get(period) or {}
+        return [s["amount"] for c in document.get("categories", []) if c["name"] == category_name for s in c["sub"]]
+
+    def _archive_expenses(self, items):
+        """Write (category record, expense) pairs to their period files, one write per period."""
+        by_period = {}
+        for c, expense in items:
+            by_period.setdefault(expense["date"][:7], []).append((c, expense))
+        income = self.get_monthly_income()
+        for period, period_items in sorted(by_period.items()):
+            self.periods.add_expenses(period, period_items, income)
+            for c, expense in period_items:
+                self.rollups.add(period, c["name"], expense["amount"])
+        self._save_rollups()
+
+    def _save_rollups(self):
+        """Persist the rollups of archived periods; failures only cost a rebuild on next start."""
+        try:
+            self.rollups.save(self.periods, self.get_current_period())
+        except Exception as e:
+            print(f"Error saving rollups: {e}")
+
+    # Search
+    @_reading
+    def search_expenses(self, query: str):
+        """Return {category: set of expense names} of the current month matching query, or None if it is blank.
+
+        Every word of the query must start a word of the expense name; Arabic
+        letter variants, diacritics and case are ignored.
+        """
+        return self.search_index.search(query)
+
+    def get_period_totals(self, period: str):
+        """Return {category: {"sum", "count", "min", "max"}} of a period without loading it."""
+        return self.rollups.period_totals(period)
+
+    def get_category_trend(self, name: str, periods=None):
+        """Return [(period, spent)] of a category over the given (default: all) periods."""
+        return self.rollups.trend(name, self.get_periods() if periods is None else periods)
 
     # Monthly income
+    @_locked
     def set_monthly_income(self, value: float):
         """Set the monthly income value."""
         self.data["monthly_income"] = float(value)
-        return self._save()
+        return self._commit(ChangeEvent(ChangeEvent.INCOME_CHANGED, value=float(value)))
 
     def get_monthly_income(self) -> float:
         """Get the current monthly income."""
@@ -45,6 +560,7 @@ class BudgetManager:
         """Return the list of categories."""
         return self.data.get("categories", [])
 
+    @_locked
     def add_category(self, name: str, percentage: float):
         """Add a new category with a percentage of the income."""
         name = name.strip()
@@ -54,71 +570,173 @@ class BudgetManager:
             raise ValueError("النسبة يجب أن تكون بين 0 و 100.")
 
         cats = self.data.setdefault("categories", [])
-        for c in cats:
-            if c["name"].strip() == name:
-                raise ValueError("فئة بهذا الاسم موجودة مسبقاً.")
+        if name in self._categories:
+            raise ValueError("فئة بهذا الاسم موجودة مسبقاً.")
 
-        total = sum(c["percentage"] for c in cats) + percentage
-        if total > 100:
+        total = self._percentage_total + percentage
+        if total > 100 + PERCENT_TOLERANCE:
             raise ValueError(f"إجمالي النسب ({total:.1f}%) يتجاوز 100%. الرجاء تعديل النسب.")
 
-        cats.append({"name": name, "percentage": float(percentage), "sub": []})
-        return self._save()
+        category = Category(name, float(percentage))
+        cats.append(category)
+        self._categories[name] = category
+        self._expenses[name] = {}
+        self._spent[name] = 0.0
+        self._percentage_total += category["percentage"]
+        return self._commit(ChangeEvent(ChangeEvent.CATEGORY_ADDED, category=name, value=float(percentage)))
 
+    @_locked
     def delete_category(self, name: str):
         """Delete a category by its name."""
-        cats = self.data.get("categories", [])
-        new_cats = [c for c in cats if c["name"] != name]
-        self.data["categories"] = new_cats
-        return self._save()
+        if self._categories.pop(name, None) is not None:
+            self._expenses.pop(name, None)
+            if self._search_index is not None:
+                self._search_index.remove_category(name)
+            cats = self.data.get("categories", [])
+            removed = [c for c in cats if c["name"] == name]
+            self.data["categories"] = [c for c in cats if c["name"] != name]
+            # Duplicate names (from older data) are removed too but were never cached
+            duplicates_spent = sum(s["amount"] for c in removed[1:] for s in c["sub"])
+            for c in removed:
+                for s in c["sub"]:
+                    self.rollups.remove(self._period_of(s), name, s["amount"])
+            self._spent_total -= self._spent.pop(name) + duplicates_spent
+            self._percentage_total -= sum(c["percentage"] for c in removed)
+        return self._commit(ChangeEvent(ChangeEvent.CATEGORY_DELETED, category=name))
 
+    @_locked
     def update_category(self, old_name: str, new_name: str, new_percentage: float):
         """Update category name or percentage with validation."""
-        cats = self.data.get("categories", [])
-        found = False
-        total_except_old = sum(c["percentage"] for c in cats if c["name"] != old_name)
-        if total_except_old + new_percentage > 100:
+        c = self._categories.get(old_name)
+        total_except_old = self._percentage_total - (c["percentage"] if c else 0.0)
+        if total_except_old + new_percentage > 100 + PERCENT_TOLERANCE:
             raise ValueError(f"إجمالي النسب ({total_except_old + new_percentage:.1f}%) يتجاوز 100٪.")
 
-        for c in cats:
-            if c["name"] == old_name:
-                c["name"] = new_name.strip() or old_name
-                c["percentage"] = float(new_percentage)
-                found = True
-                break
-
-        if not found:
+        if c is None:
             raise ValueError("الفئة المراد تعديلها غير موجودة.")
 
-        self.data["categories"] = cats
-        return self._save()
+        name = new_name.strip() or old_name
+        if name != old_name and name in self._categories:
+            raise ValueError("فئة بهذا الاسم موجودة مسبقاً.")
+
+        self._percentage_total += float(new_percentage) - c["percentage"]
+        c["name"] = name
+        c["percentage"] = float(new_percentage)
+        if name != old_name:
+            self._categories[name] = self._categories.pop(old_name)
+            self._expenses[name] = self._expenses.pop(old_name)
+            self._spent[name] = self._spent.pop(old_name)
+            # Archived periods keep the name the category had back then
+            self.rollups.rename_category(old_name, name, self.get_current_period())
+            if self._search_index is not None:
+                self._search_index.rename_category(old_name, name)
+
+        return self._commit(ChangeEvent(
+            ChangeEvent.CATEGORY_UPDATED, category=c["name"], old_category=old_name, value=c["percentage"]
+        ))
+
+    @_locked
+    def add_categories(self, categories):
+        """Add many (name, percentage) categories with a single save."""
+        with self.batch():
+            for name, percentage in categories:
+                self.add_category(name, percentage)
+        return self._last_batch_saved
 
     # Expenses
-    def add_expense(self, category_name: str, expense_name: str, amount: float):
-        """Add a new expense to a category."""
+    def _add_spent(self, category_name, delta):
+        """Apply an amount delta to the cached spent totals."""
+        self._spent[category_name] += delta
+        self._spent_total += delta
+
+    @_locked
+    def add_expense(self, category_name: str, expense_name: str, amount: float, date=None):
+        """Add a new expense to a category, dated today unless a date is given."""
         if amount <= 0:
             raise ValueError("المبلغ يجب أن يكون أكبر من الصفر.")
-        for c in self.data.get("categories", []):
-            if c["name"] == category_name:
-                c["sub"].append({"name": expense_name.strip(), "amount": float(amount)})
-                return self._save()
-        raise ValueError("الفئة غير موجودة.")
+        c = self._categories.get(category_name)
+        if c is None:
+            raise ValueError("الفئة غير موجودة.")
+        date = parse_date(date) if date else datetime.date.today().isoformat()
+        if not self._batch_depth:
+            self._check_period()
 
+        expense = {"name": expense_name.strip(), "amount": float(amount), "date": date}
+        event = ChangeEvent(
+            ChangeEvent.EXPENSE_ADDED, category=category_name, expense=expense["name"], value=expense["amount"],
+            date=date
+        )
+        if date[:7] < self.get_current_period():
+            # Past months live in their own period file
+            if self._batch_depth:
+                self._pending_archive.append((c, expense))
+            else:
+                self._archive_expenses([(c, expense)])
+            return self._commit(event, persist=False)
+
+        c["sub"].append(expense)
+        rows = self._expenses[category_name]
+        if rows is not None:
+            rows.setdefault(expense["name"], len(c["sub"]) - 1)
+        if self._search_index is not None:
+            self._search_index.add(category_name, expense["name"])
+        self._add_spent(category_name, expense["amount"])
+        self.rollups.add(date[:7], category_name, expense["amount"])
+        return self._commit(event)
+
+    @_locked
     def update_expense(self, category_name: str, old_expense: str, new_name: str, new_amount: float):
         """Update an existing expense within a category."""
-        for c in self.data.get("categories", []):
-            if c["name"] == category_name:
-                for s in c["sub"]:
-                    if s["name"] == old_expense:
-                        s["name"] = new_name.strip() or old_expense
-                        s["amount"] = float(new_amount)
-                        return self._save()
-        raise ValueError("المصروف غير موجود.")
+        by_name = self._expense_rows(category_name) or {}
+        row = by_name.get(old_expense)
+        if row is None:
+            raise ValueError("المصروف غير موجود.")
+
+        expenses = self._categories[category_name]["sub"]
+        s = expenses[row]
+        self._add_spent(category_name, float(new_amount) - s["amount"])
+        self.rollups.remove(self._period_of(s), category_name, s["amount"])
+        self.rollups.add(self._period_of(s), category_name, float(new_amount))
+        s["name"] = new_name.strip() or old_expense
+        s["amount"] = float(new_amount)
+        if s["name"] != old_expense:
+            if self._search_index is not None:
+                self._search_index.remove(category_name, old_expense)
+                self._search_index.add(category_name, s["name"])
+            # The old name now starts at its next expense, the new one at the earlier row
+            following = expenses.find(old_expense, row + 1)
+            if following is None:
+                del by_name[old_expense]
+            else:
+                by_name[old_expense] = following
+            by_name[s["name"]] = min(by_name.get(s["name"], row), row)
+
+        return self._commit(ChangeEvent(
+            ChangeEvent.EXPENSE_UPDATED, category=category_name, expense=s["name"],
+            old_expense=old_expense, value=s["amount"]
+        ))
 
+    @_locked
     def delete_expense(self, category_name: str, expense_name: str):
         """Delete an expense from a category."""
-        for c in self.data.get("categories", []):
-            if c["name"] == category_name:
-                c["sub"] = [s for s in c["sub"] if s["name"] != expense_name]
-                return self._save()
-        raise ValueError("المصروف غير موجود.")
+        c = self._categories.get(category_name)
+        if c is None:
+            raise ValueError("المصروف غير موجود.")
+        removed = c["sub"].remove_name(expense_name)
+        if removed:
+            # Rows after the removed expenses have moved up; the row index is rebuilt when next needed
+            self._expenses[category_name] = None
+            self._add_spent(category_name, -sum(s["amount"] for s in removed))
+            for s in removed:
+                self.rollups.remove(self._period_of(s), category_name, s["amount"])
+            if self._search_index is not None:
+                self._search_index.remove(category_name, expense_name, len(removed))
+        return self._commit(ChangeEvent(ChangeEvent.EXPENSE_DELETED, category=category_name, expense=expense_name))
+
+    @_locked
+    def add_expenses(self, expenses):
+        """Add many (category, name, amount[, date]) expenses with a single save."""
+        with self.batch():
+            for item in expenses:
+                self.add_expense(*item)
+        return self._last_batch_saved
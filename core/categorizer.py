@@ -0,0 +1,375 @@
+import bisect
+import os
+import re
+import threading
+from collections import deque
+from core.codec import get_codec
+from core.events import ChangeEvent
+from core.storage import write_atomic
+from core.text import normalize_text
+
+
+class Rule:
+    """Map expenses to a category by merchant name and/or amount range."""
+
+    EXACT = "exact"
+    PREFIX = "prefix"
+    CONTAINS = "contains"
+    REGEX = "regex"
+    AMOUNT = "amount"
+    KINDS = (EXACT, PREFIX, CONTAINS, REGEX, AMOUNT)
+
+    __slots__ = ("kind", "pattern", "category", "min_amount", "max_amount")
+
+    def __init__(self, kind, pattern, category, min_amount=None, max_amount=None):
+        """Initialize Rule with its match kind, pattern and target category."""
+        self.kind = kind
+        self.pattern = pattern
+        self.category = category
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+
+    def __repr__(self):
+        """Return a readable representation for debugging."""
+        return f"Rule({self.kind}, {self.pattern!r} -> {self.category!r}, {self.min_amount}..{self.max_amount})"
+
+    def accepts(self, amount):
+        """Return True if the amount is within the rule's range (or the rule has none)."""
+        if amount is None:
+            return self.min_amount is None and self.max_amount is None
+        return ((self.min_amount is None or amount >= self.min_amount)
+                and (self.max_amount is None or amount <= self.max_amount))
+
+    def to_dict(self):
+        """Return a compact dict with only the fields that are set."""
+        return {k: getattr(self, k) for k in self.__slots__ if getattr(self, k) is not None}
+
+    @classmethod
+    def from_dict(cls, d):
+        """Build a Rule from a dict produced by to_dict."""
+        return cls(**{k: d.get(k) for k in cls.__slots__})
+
+
+class _AhoCorasick:
+    """Multi-keyword matcher: finds every keyword contained in a text in one pass."""
+
+    def __init__(self, keywords):
+        """Build the automaton from (keyword, value) pairs."""
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for keyword, value in keywords:
+            node = 0
+            for ch in keyword:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                node = nxt
+            self.out[node].append(value)
+
+        # Breadth-first fail links; each node also inherits the outputs of its fail node
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def find(self, text):
+        """Yield the value of every keyword occurring in text."""
+        node = 0
+        for ch in text:
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            yield from self.out[node]
+
+
+class _CompiledRules:
+    """Rule set compiled into lookup structures.
+
+    Exact, prefix, keyword and amount rules are looked up in time independent
+    of how many rules there are; regex rules share one compiled alternation
+    whose cost still grows with the number of regex rules.
+    """
+
+    def __init__(self, rules):
+        """Compile rules; a lower rule index means a higher priority."""
+        self.rules = rules
+        self.exact = {}
+        self.prefix = {}
+        keywords = []
+        alternatives = []
+        amount_rules = []
+        for i, rule in enumerate(rules):
+            if rule.kind == Rule.EXACT:
+                self.exact.setdefault(normalize_text(rule.pattern), []).append(i)
+            elif rule.kind == Rule.PREFIX:
+                node = self.prefix
+                for ch in normalize_text(rule.pattern):
+                    node = node.setdefault(ch, {})
+                node.setdefault(None, []).append(i)
+            elif rule.kind == Rule.CONTAINS:
+                keywords.append((normalize_text(rule.pattern), i))
+            elif rule.kind == Rule.REGEX:
+                alternatives.append(i)
+            elif rule.kind == Rule.AMOUNT:
+                amount_rules.append(i)
+
+        self.contains = _AhoCorasick(keywords) if keywords else None
+
+        # One anchored alternation: the engine tries the alternatives in priority
+        # order, so the first group that matches is the best regex rule
+        self.regex_rules = alternatives
+        self.regex = None
+        if alternatives:
+            pattern = "|".join(f"(?P<r{i}>.*?(?:{rules[i].pattern}))" for i in alternatives)
+            self.regex = re.compile(f"^(?:{pattern})", re.I | re.S)
+
+        self._build_amount_index(amount_rules)
+
+    def _build_amount_index(self, indexes):
+        """Precompute the best amount rule of every elementary interval, for a bisect lookup.
+
+        Slot 2k+1 stands for the point points[k] and even slots for the open
+        gaps around the points. Rules are visited in priority order and each
+        fills the still-empty slots of its range, skipping filled runs through
+        a next-free-slot table, so building stays near-linear.
+        """
+        points = sorted({v for i in indexes for v in (self.rules[i].min_amount, self.rules[i].max_amount)
+                         if v is not None})
+        position = {v: k for k, v in enumerate(points)}
+        slots = 2 * len(points) + 1
+        best = [None] * slots
+        next_free = list(range(slots + 1))
+
+        def find(slot):
+            """Return the first empty slot at or after slot, compressing the path."""
+            root = slot
+            while next_free[root] != root:
+                root = next_free[root]
+            while next_free[slot] != root:
+                next_free[slot], slot = root, next_free[slot]
+            return root
+
+        for i in indexes:
+            rule = self.rules[i]
+            first = 0 if rule.min_amount is None else 2 * position[rule.min_amount] + 1
+            last = slots - 1 if rule.max_amount is None else 2 * position[rule.max_amount] + 1
+            slot = find(first)
+            while slot <= last:
+                best[slot] = i
+                next_free[slot] = slot + 1
+                slot = find(slot + 1)
+
+        self.amount_points = points
+        self.amount_best = best if indexes else []
+
+    def _amount_rule(self, amount):
+        """Return the best amount-only rule for an amount, or None."""
+        if amount is None or not self.amount_best:
+            return None
+        k = bisect.bisect_left(self.amount_points, amount)
+        if k < len(self.amount_points) and self.amount_points[k] == amount:
+            return self.amount_best[2 * k + 1]
+        return self.amount_best[2 * k]
+
+    def classify(self, name, amount=None):
+        """Return the index of the highest-priority rule matching, or None."""
+        text = normalize_text(name)
+        candidates = list(self.exact.get(text, ()))
+
+        node = self.prefix
+        for ch in text:
+            candidates.extend(node.get(None, ()))
+            node = node.get(ch)
+            if node is None:
+                break
+        else:
+            candidates.extend(node.get(None, ()))
+
+        if self.contains is not None:
+            candidates.extend(self.contains.find(text))
+
+        if self.regex is not None:
+            match = self.regex.match(str(name))
+            if match:
+                first = int(match.lastgroup[1:])
+                if self.rules[first].accepts(amount):
+                    candidates.append(first)
+                else:
+                    # Rare: the best regex is excluded by its amount range, check the rest
+                    candidates.extend(i for i in self.regex_rules if i > first and self.rules[i].accepts(amount)
+                                      and re.search(self.rules[i].pattern, str(name), re.I | re.S))
+
+        best = self._amount_rule(amount)
+        for i in sorted(candidates):
+            if best is not None and i > best:
+                break
+            if self.rules[i].accepts(amount):
+                return i
+        return best
+
+
+class Categorizer:
+    """User rules mapping merchant names and amounts to budget categories.
+
+    Rules are kept in order of priority (first match wins) and stored in a
+    JSON file. They are compiled on first use after every change into an
+    exact-name table, a prefix trie, an Aho-Corasick automaton for keywords,
+    a single combined regex and an interval index for amount ranges.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path=None, codec="auto"):
+        """Initialize Categorizer, loading rules from path if it exists."""
+        self.path = str(path) if path else None
+        self.codec = get_codec(codec)
+        self._rules = []
+        self._compiled = None
+        self._lock = threading.Lock()
+        self.load()
+
+    # Persistence
+    def load(self):
+        """Load rules from the rules file."""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "rb") as f:
+                document = self.codec.loads(f.read())
+            rules = [Rule.from_dict(d) for d in document.get("rules", [])]
+        except Exception as e:
+            print(f"Error loading rules: {e}")
+            return
+        with self._lock:
+            self._rules = rules
+            self._compiled = None
+
+    def save(self):
+        """Write the rules file atomically."""
+        if not self.path:
+            return
+        document = {"version": self.VERSION, "rules": [r.to_dict() for r in self._rules]}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        write_atomic(self.path, self.codec.dumps(document, pretty=True))
+
+    # Editing
+    def rules(self):
+        """Return the rules in priority order."""
+        return list(self._rules)
+
+    def add_rule(self, kind, pattern, category, min_amount=None, max_amount=None, index=None):
+        """Validate and insert a rule (at the end unless index is given), then save."""
+        pattern = (pattern or "").strip()
+        category = (category or "").strip()
+        if kind not in Rule.KINDS:
+            raise ValueError("نوع القاعدة غير معروف.")
+        if not category:
+            raise ValueError("الفئة مطلوبة.")
+        if kind == Rule.AMOUNT:
+            pattern = None
+            if min_amount is None and max_amount is None:
+                raise ValueError("حدد الحد الأدنى أو الأعلى للمبلغ.")
+        elif not pattern:
+            raise ValueError("نص القاعدة مطلوب.")
+        if min_amount is not None and max_amount is not None and min_amount > max_amount:
+            raise ValueError("الحد الأدنى للمبلغ أكبر من الحد الأعلى.")
+        if kind == Rule.REGEX:
+            try:
+                # Checked in the form used inside the combined regex
+                compiled = re.compile(f".*?(?:{pattern})")
+            except re.error:
+                raise ValueError("التعبير النمطي غير صالح.")
+            if compiled.groupindex or compiled.groups:
+                raise ValueError("استخدم (?:...) بدلاً من المجموعات في التعبير النمطي.")
+
+        rule = Rule(kind, pattern, category,
+                    None if min_amount is None else float(min_amount),
+                    None if max_amount is None else float(max_amount))
+        with self._lock:
+            self._rules.insert(len(self._rules) if index is None else index, rule)
+            self._compiled = None
+        self.save()
+        return rule
+
+    def remove_rule(self, index):
+        """Delete the rule at index, then save."""
+        with self._lock:
+            del self._rules[index]
+            self._compiled = None
+        self.save()
+
+    def learn(self, name, category):
+        """Remember a manual choice as an exact-name rule, ahead of the other rules."""
+        text = normalize_text(name)
+        if not text or self.classify(name) == category:
+            return
+        with self._lock:
+            self._rules = [r for r in self._rules
+                           if not (r.kind == Rule.EXACT and normalize_text(r.pattern) == text)]
+            self._compiled = None
+        self.add_rule(Rule.EXACT, name, category, index=0)
+
+    def rename_category(self, old_name, new_name):
+        """Point the rules of a renamed category at its new name."""
+        changed = False
+        with self._lock:
+            for rule in self._rules:
+                if rule.category == old_name:
+                    rule.category = new_name
+                    changed = True
+            self._compiled = None
+        if changed:
+            self.save()
+
+    def remove_category(self, name):
+        """Drop the rules of a deleted category."""
+        with self._lock:
+            rules = [r for r in self._rules if r.category != name]
+            changed = len(rules) != len(self._rules)
+            self._rules = rules
+            self._compiled = None
+        if changed:
+            self.save()
+
+    def follow(self, manager):
+        """Keep the rules in step with categories renamed or deleted through manager."""
+        manager.subscribe(self._on_change)
+
+    def _on_change(self, event):
+        """Apply a manager change to the rules."""
+        if event.kind == ChangeEvent.CATEGORY_UPDATED and event.old_category != event.category:
+            self.rename_category(event.old_category, event.category)
+        elif event.kind == ChangeEvent.CATEGORY_DELETED:
+            self.remove_category(event.category)
+        elif event.kind == ChangeEvent.DATA_RELOADED:
+            # Another process changed the data and has updated the rules file itself
+            self.load()
+
+    # Matching
+    def _matcher(self):
+        """Return the compiled rules, compiling them after a change."""
+        with self._lock:
+            if self._compiled is None:
+                self._compiled = _CompiledRules(list(self._rules))
+            return self._compiled
+
+    def classify(self, name, amount=None):
+        """Return the category of the first rule matching an expense, or None."""
+        matcher = self._matcher()
+        i = matcher.classify(name, amount)
+        return None if i is None else matcher.rules[i].category
+
+    def classify_transaction(self, transaction):
+        """Classify an import pipeline transaction (see core.importer.categorize)."""
+        return self.classify(transaction["name"], transaction["amount"])
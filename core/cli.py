@@ -0,0 +1,229 @@
+import argparse
+import functools
+import json
+import os
+import sys
+from config import settings
+from core.startup import open_manager
+
+
+def amount(text):
+    """Parse an amount argument."""
+    try:
+        return float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid amount: {text}")
+
+
+def formatter(cls=argparse.HelpFormatter):
+    """Return a formatter_class of cls given the terminal width.
+
+    Left to itself argparse imports shutil (and the compression modules it
+    pulls in) for the width on every add_argument; this reads it the same
+    way with os alone.
+    """
+    try:
+        width = int(os.environ["COLUMNS"])
+    except (KeyError, ValueError):
+        width = 0
+    if width <= 0:
+        try:
+            width = os.get_terminal_size(sys.__stdout__.fileno()).columns or 80
+        except (AttributeError, ValueError, OSError):
+            width = 80
+    return functools.partial(cls, width=width - 2)
+
+
+def print_rows(rows):
+    """Print rows as tab-separated lines."""
+    for row in rows:
+        print("\t".join(f"{value:.2f}" if isinstance(value, float) else str(value) for value in row))
+
+
+def print_json(value):
+    """Print a value as indented JSON."""
+    print(json.dumps(value, ensure_ascii=False, indent=2))
+
+
+# Commands
+def cmd_add(m, args):
+    """Add an expense."""
+    m.add_expense(args.category, args.name, args.amount, args.date)
+
+
+def cmd_update(m, args):
+    """Change the amount (and optionally the name) of an expense."""
+    m.update_expense(args.category, args.name, args.rename or args.name, args.amount)
+
+
+def cmd_delete(m, args):
+    """Delete the expenses of a category with the given name."""
+    c = m.get_category(args.category)
+    if c is None or c["sub"].find(args.name) is None:
+        raise ValueError("المصروف غير موجود.")
+    m.delete_expense(args.category, args.name)
+
+
+def cmd_list(m, args):
+    """List the categories, or the expenses of one category."""
+    if args.category is None:
+        rows = [m.get_category_summary(c["name"]) for c in m.get_categories()]
+        if args.json:
+            print_json(rows)
+        else:
+            print_rows((r["name"], r["percentage"], r["allocated"], r["spent"], r["remaining"]) for r in rows)
+        return
+    c = m.get_category(args.category)
+    if c is None:
+        raise ValueError("الفئة غير موجودة.")
+    if args.json:
+        print_json(c["sub"].to_json())
+    else:
+        print_rows((name, amount, date or "") for name, amount, date in c["sub"].rows())
+
+
+def cmd_summary(m, args):
+    """Print the global totals."""
+    summary = m.get_summary()
+    if args.json:
+        print_json(summary)
+    else:
+        print_rows(summary.items())
+
+
+def cmd_income(m, args):
+    """Print or set the monthly income."""
+    if args.amount is None:
+        print(f"{m.get_monthly_income():.2f}")
+    else:
+        m.set_monthly_income(args.amount)
+
+
+def cmd_add_category(m, args):
+    """Add a category."""
+    m.add_category(args.name, args.percentage)
+
+
+def cmd_import(m, args):
+    """Add the expenses read from stdin as CATEGORY,NAME,AMOUNT[,DATE] lines, with a single save."""
+    import csv
+
+    expenses = []
+    for number, row in enumerate(csv.reader(sys.stdin), 1):
+        if not row or row[0].startswith("#"):
+            continue
+        if len(row) not in (3, 4):
+            raise ValueError(f"السطر {number}: يجب أن يحتوي على الفئة والاسم والمبلغ.")
+        try:
+            expenses.append((row[0].strip(), row[1].strip(), float(row[2])) + tuple(d.strip() for d in row[3:] if d.strip()))
+        except ValueError:
+            raise ValueError(f"السطر {number}: مبلغ غير صالح.")
+    m.add_expenses(expenses)
+
+
+# Command name -> (help, function)
+COMMANDS = {
+    "add": ("add an expense", cmd_add),
+    "update": ("change the amount or name of an expense", cmd_update),
+    "delete": ("delete an expense", cmd_delete),
+    "list": ("list categories, or the expenses of a category", cmd_list),
+    "summary": ("print the global totals", cmd_summary),
+    "income": ("print or set the monthly income", cmd_income),
+    "add-category": ("add a category", cmd_add_category),
+    "import": ("add CATEGORY,NAME,AMOUNT[,DATE] lines from stdin", cmd_import),
+}
+
+
+def build_parser():
+    """Return the parser of the global options; each command's arguments are parsed separately."""
+    epilog = "commands:\n" + "\n".join(f"  {name:<14}{text}" for name, (text, _) in COMMANDS.items())
+    parser = argparse.ArgumentParser(
+        prog="budget", description="Manage the personal budget from the command line.",
+        epilog=epilog, formatter_class=formatter(argparse.RawDescriptionHelpFormatter),
+    )
+    parser.add_argument("--data", help=f"data file (default {settings.DATA_FILE})")
+    parser.add_argument("--batch", action="store_true",
+                        help="read one command per line from stdin and save once")
+    parser.add_argument("command", nargs="?", choices=COMMANDS, metavar="COMMAND", help="one of the commands below")
+    parser.add_argument("arguments", nargs=argparse.REMAINDER, help="arguments of the command")
+    return parser
+
+
+def command_parser(name):
+    """Return the parser of one command's arguments."""
+    # Built on demand: argparse setup is a noticeable part of the startup time
+    text, run = COMMANDS[name]
+    p = argparse.ArgumentParser(prog=f"budget {name}", description=text, formatter_class=formatter())
+    if name in ("add", "update", "delete"):
+        p.add_argument("category")
+        p.add_argument("name")
+    if name in ("add", "update"):
+        p.add_argument("amount", type=amount)
+    if name == "add":
+        p.add_argument("--date", help="YYYY-MM-DD (default today)")
+    elif name == "update":
+        p.add_argument("--rename", help="new name of the expense")
+    elif name == "list":
+        p.add_argument("category", nargs="?")
+    elif name == "income":
+        p.add_argument("amount", type=amount, nargs="?")
+    elif name == "add-category":
+        p.add_argument("name")
+        p.add_argument("percentage", type=amount)
+    if name in ("list", "summary"):
+        p.add_argument("--json", action="store_true")
+    p.set_defaults(run=run)
+    return p
+
+
+def run_batch(m):
+    """Apply the commands read from stdin in one transaction; nothing is saved if one fails."""
+    import shlex
+
+    parsers = {}
+    with m.batch():
+        for number, line in enumerate(sys.stdin, 1):
+            words = shlex.split(line, comments=True)
+            if not words:
+                continue
+            if words[0] not in COMMANDS or words[0] == "import":
+                raise ValueError(f"السطر {number}: أمر غير صالح.")
+            if words[0] not in parsers:
+                parsers[words[0]] = command_parser(words[0])
+            try:
+                args = parsers[words[0]].parse_args(words[1:])
+            except SystemExit:
+                # argparse has already printed the usage error
+                raise ValueError(f"السطر {number}: أمر غير صالح.")
+            try:
+                args.run(m, args)
+            except ValueError as e:
+                raise ValueError(f"السطر {number}: {e}")
+
+
+def main(argv=None):
+    """Run one command (or a batch) and return the exit status."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.batch and args.command is not None:
+        parser.error("--batch reads its commands from stdin")
+    if not args.batch:
+        if args.command is None:
+            parser.print_help()
+            return 2
+        args = command_parser(args.command).parse_args(args.arguments, namespace=args)
+
+    # Saved before exiting, so no writer thread
+    m = open_manager(async_save=False, data_file=args.data, codec=settings.CLI_JSON_CODEC)
+    try:
+        if args.batch:
+            run_batch(m)
+        else:
+            args.run(m, args)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        m.close()
+    return 0
+
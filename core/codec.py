@@ -0,0 +1,99 @@
+import importlib
+import json
+
+# Optional fast JSON libraries, imported by get_codec on first use (orjson alone
+# takes longer to import than the rest of the core, which the CLI notices)
+orjson = None
+ujson = None
+
+
+UTF8_BOM = b"\xef\xbb\xbf"
+
+
+def _strip_bom(raw):
+    """Drop a UTF-8 byte order mark some editors add when saving by hand."""
+    return raw[3:] if raw.startswith(UTF8_BOM) else raw
+
+
+def _encode_record(obj):
+    """Encode record objects (see core.records) through their to_json()."""
+    to_json = getattr(obj, "to_json", None)
+    if to_json is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return to_json()
+
+
+class StdlibCodec:
+    """JSON codec built on the standard library."""
+
+    name = "json"
+
+    def dumps(self, obj, pretty=False) -> bytes:
+        """Encode an object as UTF-8 JSON bytes."""
+        if pretty:
+            text = json.dumps(obj, ensure_ascii=False, indent=2, default=_encode_record)
+        else:
+            text = json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_encode_record)
+        return text.encode("utf-8")
+
+    def loads(self, raw: bytes):
+        """Decode UTF-8 JSON bytes, compact or pretty."""
+        return json.loads(_strip_bom(raw).decode("utf-8"))
+
+
+class OrjsonCodec:
+    """JSON codec built on orjson (fastest, works on bytes directly)."""
+
+    name = "orjson"
+
+    def dumps(self, obj, pretty=False) -> bytes:
+        """Encode an object as UTF-8 JSON bytes."""
+        return orjson.dumps(obj, default=_encode_record, option=orjson.OPT_INDENT_2 if pretty else 0)
+
+    def loads(self, raw: bytes):
+        """Decode UTF-8 JSON bytes, compact or pretty."""
+        return orjson.loads(_strip_bom(raw))
+
+
+class UjsonCodec:
+    """JSON codec built on ujson."""
+
+    name = "ujson"
+
+    def dumps(self, obj, pretty=False) -> bytes:
+        """Encode an object as UTF-8 JSON bytes."""
+        return ujson.dumps(obj, ensure_ascii=False, indent=2 if pretty else 0, default=_encode_record).encode("utf-8")
+
+    def loads(self, raw: bytes):
+        """Decode UTF-8 JSON bytes, compact or pretty."""
+        return ujson.loads(_strip_bom(raw))
+
+
+def _optional(module):
+    """Import an optional module, or return None when it is not installed."""
+    try:
+        return importlib.import_module(module)
+    except ImportError:
+        return None
+
+
+def get_codec(name="auto"):
+    """Return the named codec, or the fastest installed one for "auto"."""
+    global orjson, ujson
+    available = {"json": StdlibCodec}
+    if orjson is None and name in ("auto", "orjson"):
+        orjson = _optional("orjson")
+    if ujson is None and (name == "ujson" or (name == "auto" and orjson is None)):
+        ujson = _optional("ujson")
+    if orjson is not None:
+        available["orjson"] = OrjsonCodec
+    if ujson is not None:
+        available["ujson"] = UjsonCodec
+
+    if name == "auto":
+        for candidate in ("orjson", "ujson", "json"):
+            if candidate in available:
+                return available[candidate]()
+    if name not in available:
+        raise ValueError(f"JSON codec not available: {name}")
+    return available[name]()
@@ -0,0 +1,95 @@
+class ChangeEvent:
+    """Describe a single mutation applied to the budget data."""
+
+    INCOME_CHANGED = "income_changed"
+    CATEGORY_ADDED = "category_added"
+    CATEGORY_UPDATED = "category_updated"
+    CATEGORY_DELETED = "category_deleted"
+    EXPENSE_ADDED = "expense_added"
+    EXPENSE_UPDATED = "expense_updated"
+    EXPENSE_DELETED = "expense_deleted"
+    PERIOD_CLOSED = "period_closed"
+    # Only notified, never saved: the data was reloaded after another process changed it
+    DATA_RELOADED = "data_reloaded"
+
+    __slots__ = ("kind", "category", "old_category", "expense", "old_expense", "value", "date")
+
+    def __init__(self, kind, category=None, old_category=None, expense=None, old_expense=None, value=None,
+                 date=None):
+        """Initialize ChangeEvent with its kind and affected names."""
+        self.kind = kind
+        self.category = category
+        self.old_category = old_category
+        self.expense = expense
+        self.old_expense = old_expense
+        self.value = value
+        self.date = date
+
+    def __repr__(self):
+        """Return a readable representation for debugging."""
+        fields = ", ".join(f"{k}={getattr(self, k)!r}" for k in self.__slots__[1:] if getattr(self, k) is not None)
+        return f"ChangeEvent({self.kind}{', ' + fields if fields else ''})"
+
+    def to_dict(self):
+        """Return a compact dict with only the fields that are set."""
+        return {k: getattr(self, k) for k in self.__slots__ if getattr(self, k) is not None}
+
+    @classmethod
+    def from_dict(cls, d):
+        """Build a ChangeEvent from a dict produced by to_dict."""
+        return cls(**{k: d[k] for k in cls.__slots__ if k in d})
+
+
+def expense_period(expense, default):
+    """Return the YYYY-MM period of an expense; undated (older) expenses get the default."""
+    date = expense.get("date")
+    return date[:7] if date else default
+
+
+def apply_event(data, event):
+    """Replay a ChangeEvent on a raw data document without validation."""
+    cats = data.setdefault("categories", [])
+    kind = event.kind
+
+    if kind == ChangeEvent.INCOME_CHANGED:
+        data["monthly_income"] = float(event.value)
+    elif kind == ChangeEvent.CATEGORY_ADDED:
+        cats.append({"name": event.category, "percentage": float(event.value), "sub": []})
+    elif kind == ChangeEvent.CATEGORY_UPDATED:
+        for c in cats:
+            if c["name"] == event.old_category:
+                c["name"] = event.category
+                c["percentage"] = float(event.value)
+                break
+    elif kind == ChangeEvent.CATEGORY_DELETED:
+        data["categories"] = [c for c in cats if c["name"] != event.category]
+    elif kind == ChangeEvent.EXPENSE_ADDED:
+        for c in cats:
+            if c["name"] == event.category:
+                expense = {"name": event.expense, "amount": float(event.value)}
+                if event.date:
+                    expense["date"] = event.date
+                c["sub"].append(expense)
+                break
+    elif kind == ChangeEvent.EXPENSE_UPDATED:
+        for c in cats:
+            if c["name"] == event.category:
+                for s in c["sub"]:
+                    if s["name"] == event.old_expense:
+                        s["name"] = event.expense
+                        s["amount"] = float(event.value)
+                        break
+                break
+    elif kind == ChangeEvent.EXPENSE_DELETED:
+        for c in cats:
+            if c["name"] == event.category:
+                c["sub"] = [s for s in c["sub"] if s["name"] != event.expense]
+                break
+    elif kind == ChangeEvent.PERIOD_CLOSED:
+        # Expenses before the new period now live in their period files
+        old = data.get("period", event.value)
+        for c in cats:
+            c["sub"] = [s for s in c["sub"] if expense_period(s, old) >= event.value]
+        data["period"] = event.value
+    else:
+        raise ValueError(f"Unknown change event: {kind}")
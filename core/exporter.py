@@ -0,0 +1,177 @@
+import csv
+import os
+
+
+# Column headers of each report
+EXPENSE_HEADERS = ["الشهر", "التاريخ", "الفئة", "المصروف", "المبلغ"]
+CATEGORY_HEADERS = ["الفئة", "النسبة %", "المخصص", "المصروف", "المتبقي", "نسبة الاستهلاك %"]
+SUMMARY_HEADERS = ["الشهر", "الفئة", "عدد المصروفات", "المجموع", "الأدنى", "الأعلى"]
+
+# Rows written between two progress callbacks
+PROGRESS_EVERY = 2000
+
+
+class ExportStats:
+    """Counters of one export run."""
+
+    __slots__ = ("total", "written", "cancelled")
+
+    def __init__(self, total=0):
+        """Initialize ExportStats with the expected number of rows."""
+        self.total = total
+        self.written = 0
+        self.cancelled = False
+
+    def percent(self) -> int:
+        """Return the share of rows written, 0-100."""
+        if not self.total:
+            return 100
+        return min(100, int(self.written * 100 / self.total))
+
+
+class CsvWriter:
+    """Write rows to a UTF-8 CSV file (with a BOM so spreadsheets detect Arabic text)."""
+
+    def __init__(self, path, title=""):
+        """Open the CSV file for writing."""
+        self._file = open(path, "w", newline="", encoding="utf-8-sig")
+        self._writer = csv.writer(self._file)
+
+    def write_header(self, headers):
+        """Write the header row."""
+        self._writer.writerow(headers)
+
+    def write_row(self, row):
+        """Write one row."""
+        self._writer.writerow(row)
+
+    def close(self):
+        """Flush and close the file."""
+        self._file.close()
+
+
+class XlsxWriter:
+    """Write rows to an XLSX workbook in openpyxl's streaming (write-only) mode."""
+
+    def __init__(self, path, title=""):
+        """Create the workbook; requires openpyxl."""
+        try:
+            from openpyxl import Workbook
+        except ImportError:
+            raise ValueError("التصدير إلى Excel يتطلب تثبيت openpyxl.")
+        self.path = path
+        self._book = Workbook(write_only=True)
+        self._sheet = self._book.create_sheet(title[:31] or "Sheet")
+        self._sheet.sheet_view.rightToLeft = True
+
+    def write_header(self, headers):
+        """Write the header row."""
+        self._sheet.append(headers)
+
+    def write_row(self, row):
+        """Write one row."""
+        self._sheet.append(row)
+
+    def close(self):
+        """Save the workbook."""
+        self._book.save(self.path)
+
+
+# Writers by file extension; the UI adds a PDF writer on top of these
+WRITERS = {
+    ".csv": CsvWriter,
+    ".xlsx": XlsxWriter,
+}
+
+
+def _amount(value):
+    """Round an amount for display, keeping None for missing values."""
+    return None if value is None else round(value, 2)
+
+
+def expense_rows(manager, periods=None):
+    """Yield one row per expense, streamed period by period."""
+    for period, category, expense in manager.iter_expenses(periods):
+        yield [period, expense.get("date", ""), category, expense["name"], _amount(expense["amount"])]
+
+
+def category_rows(manager, periods=None):
+    """Yield one row per category of the current month."""
+    for c in list(manager.get_categories()):
+        s = manager.get_category_summary(c["name"])
+        if s is None:
+            continue
+        yield [s["name"], _amount(s["percentage"]), _amount(s["allocated"]), _amount(s["spent"]),
+               _amount(s["remaining"]), _amount(s["percent_used"])]
+
+
+def summary_rows(manager, periods=None):
+    """Yield one row per category and month, read from the rollup index."""
+    for period in manager.get_periods() if periods is None else periods:
+        for category, t in sorted(manager.get_period_totals(period).items()):
+            yield [period, category, t["count"], _amount(t["sum"]), _amount(t["min"]), _amount(t["max"])]
+
+
+def _count_expenses(manager, periods):
+    """Return the number of expenses in the periods, from the rollups."""
+    return sum(t["count"] for p in periods for t in manager.get_period_totals(p).values())
+
+
+# report name -> (title, headers, row generator, expected row count)
+REPORTS = {
+    "expenses": ("المصروفات", EXPENSE_HEADERS, expense_rows, _count_expenses),
+    "categories": ("الفئات", CATEGORY_HEADERS, category_rows, lambda m, periods: len(m.get_categories())),
+    "summary": ("الملخص الشهري", SUMMARY_HEADERS, summary_rows,
+                lambda m, periods: sum(len(m.get_period_totals(p)) for p in periods)),
+}
+
+
+def export_report(manager, path, report="expenses", periods=None, writer_class=None,
+                  progress=None, cancelled=None):
+    """Stream a report to a CSV, XLSX (or, with writer_class, any other) file.
+
+    Rows go from the manager to the writer one at a time, so memory does not
+    grow with the ledger. The file is written under a temporary name and only
+    renamed to path when complete; a cancelled or failed export leaves no file.
+    progress(stats) is called every PROGRESS_EVERY rows and at the end;
+    cancelled() is checked at the same points. Returns the ExportStats.
+    """
+    if report not in REPORTS:
+        raise ValueError("نوع التقرير غير معروف.")
+    if writer_class is None:
+        writer_class = WRITERS.get(os.path.splitext(path)[1].lower())
+        if writer_class is None:
+            raise ValueError("صيغة ملف التصدير غير مدعومة.")
+    title, headers, rows, count = REPORTS[report]
+    periods = manager.get_periods() if periods is None else list(periods)
+    stats = ExportStats(count(manager, periods))
+
+    temp_path = f"{path}.part"
+    writer = writer_class(temp_path, title)
+    try:
+        writer.write_header(headers)
+        for row in rows(manager, periods):
+            writer.write_row(row)
+            stats.written += 1
+            if stats.written % PROGRESS_EVERY == 0:
+                if cancelled is not None and cancelled():
+                    stats.cancelled = True
+                    break
+                if progress is not None:
+                    progress(stats)
+        writer.close()
+        if stats.cancelled:
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, path)
+    except BaseException:
+        try:
+            writer.close()
+        except Exception:
+            pass
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    if progress is not None:
+        progress(stats)
+    return stats
@@ -0,0 +1,311 @@
+import csv
+import datetime
+import functools
+import os
+import re
+from collections import Counter, deque
+
+
+# Header names recognised in CSV statements (compared lowercased)
+CSV_COLUMNS = {
+    "date": ("date", "transaction date", "posting date", "posted", "value date", "التاريخ", "تاريخ"),
+    "name": ("description", "name", "payee", "merchant", "details", "memo", "narrative", "الوصف", "البيان", "الاسم"),
+    "amount": ("amount", "value", "المبلغ", "مبلغ"),
+    "debit": ("debit", "withdrawal", "withdrawals", "paid out", "مدين", "سحب"),
+    "category": ("category", "الفئة", "التصنيف"),
+}
+
+# Accepted statement date formats, tried in order (day before month)
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%d.%m.%Y", "%m/%d/%Y", "%Y%m%d")
+
+# Arabic-Indic and Persian digits, Arabic decimal and thousands separators
+_DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹٫٬", "01234567890123456789.,")
+_NOT_NUMBER = re.compile(r"[^\d.,\-]")
+
+READ_BLOCK = 64 * 1024
+
+# Bank transaction ids remembered to drop repeats within a statement; repeats
+# are adjacent or close in practice, and a bounded window keeps memory constant
+ID_WINDOW = 10000
+
+
+class ImportStats:
+    """Counters describing an import run."""
+
+    __slots__ = ("rows", "imported", "duplicates", "skipped", "bytes_read", "total_bytes")
+
+    def __init__(self, total_bytes=0):
+        """Initialize ImportStats with the size of the file being read."""
+        self.rows = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.skipped = 0
+        self.bytes_read = 0
+        self.total_bytes = total_bytes
+
+    def percent(self) -> int:
+        """Return the share of the file read so far, 0-100."""
+        return int(self.bytes_read * 100 / self.total_bytes) if self.total_bytes else 100
+
+
+# Parsing
+def parse_amount(text):
+    """Parse a statement amount such as "1,234.50", "-1.234,50", "(12.00)" or Arabic digits."""
+    text = str(text).strip().translate(_DIGITS)
+    negative = text.startswith("(") and text.endswith(")")
+    text = _NOT_NUMBER.sub("", text)
+    if "," in text and "." in text:
+        # Whichever separator comes last is the decimal point
+        if text.rfind(",") > text.rfind("."):
+            text = text.replace(".", "").replace(",", ".")
+        else:
+            text = text.replace(",", "")
+    elif "," in text:
+        head, _, tail = text.rpartition(",")
+        text = f"{head.replace(',', '')}.{tail}" if len(tail) in (1, 2) else text.replace(",", "")
+    if not text or text in ("-", "."):
+        raise ValueError(f"Invalid amount: {text!r}")
+    value = float(text)
+    return -abs(value) if negative else value
+
+
+# Statements repeat the same few dates many times, so parsed dates are cached
+@functools.lru_cache(maxsize=4096)
+def parse_statement_date(text):
+    """Parse a statement date into YYYY-MM-DD."""
+    text = str(text).strip().translate(_DIGITS)
+    # OFX dates carry a time and timezone after the day: 20240131120000[-5:EST]
+    if len(text) > 8 and text[:8].isdigit():
+        text = text[:8]
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid date: {text!r}")
+
+
+def _lines(path, stats):
+    """Yield decoded lines of a file while counting the bytes read."""
+    encoding = "utf-8-sig"
+    with open(path, "rb") as f:
+        for raw in f:
+            stats.bytes_read += len(raw)
+            yield raw.decode(encoding, errors="replace")
+            encoding = "utf-8"
+
+
+def read_csv(path, stats, columns=None, negative_is_expense=True):
+    """Yield raw transactions {"date", "name", "amount", "category"} from a CSV statement.
+
+    Columns are detected from the header unless columns maps the fields
+    (date, name, amount or debit, category) to header names. In an amount
+    column spending is negative unless negative_is_expense is False; a
+    debit column holds spending as positive values.
+    """
+    reader = csv.reader(_lines(path, stats))
+    header = next(reader, None)
+    if header is None:
+        return
+    header = [h.strip().lower() for h in header]
+    index = {}
+    for field, names in CSV_COLUMNS.items():
+        wanted = (columns or {}).get(field)
+        candidates = (wanted.lower(),) if wanted else names
+        for name in candidates:
+            if name in header:
+                index[field] = header.index(name)
+                break
+    if "date" not in index or "name" not in index or not ("amount" in index or "debit" in index):
+        raise ValueError("تعذّر التعرف على أعمدة الملف (التاريخ، الوصف، المبلغ).")
+
+    for row in reader:
+        stats.rows += 1
+        if not row:
+            stats.skipped += 1
+            continue
+        try:
+            if "debit" in index and row[index["debit"]].strip():
+                amount = abs(parse_amount(row[index["debit"]]))
+            elif "amount" in index:
+                amount = parse_amount(row[index["amount"]])
+                amount = -amount if negative_is_expense else amount
+            else:
+                amount = 0.0
+            yield {
+                "date": row[index["date"]],
+                "name": row[index["name"]],
+                "amount": amount,
+                "category": row[index["category"]].strip() if "category" in index else None,
+            }
+        except (IndexError, ValueError):
+            stats.skipped += 1
+
+
+_OFX_TRANSACTION = re.compile(rb"<STMTTRN>(.*?)</STMTTRN>", re.S | re.I)
+_OFX_FIELD = re.compile(rb"<(\w+)>([^<\r\n]*)")
+
+
+def read_ofx(path, stats):
+    """Yield raw transactions from an OFX statement (SGML 1.x or XML 2.x), block by block."""
+    buffer = b""
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(READ_BLOCK)
+            stats.bytes_read += len(block)
+            buffer += block
+            end = 0
+            for match in _OFX_TRANSACTION.finditer(buffer):
+                end = match.end()
+                stats.rows += 1
+                fields = {k.upper().decode("ascii"): v.strip().decode("utf-8", errors="replace")
+                          for k, v in _OFX_FIELD.findall(match.group(1))}
+                try:
+                    yield {
+                        "date": fields["DTPOSTED"],
+                        "name": fields.get("NAME") or fields.get("MEMO") or fields.get("PAYEE", ""),
+                        # OFX debits are negative
+                        "amount": -parse_amount(fields["TRNAMT"]),
+                        "category": None,
+                        "id": fields.get("FITID"),
+                    }
+                except (KeyError, ValueError):
+                    stats.skipped += 1
+            # Keep only the unfinished transaction for the next block
+            tail = buffer[end:]
+            start = tail.upper().rfind(b"<STMTTRN>")
+            buffer = tail[start:] if start >= 0 else tail[-len(b"<STMTTRN>"):]
+            if not block:
+                break
+
+
+def read_statement(path, stats, **options):
+    """Yield raw transactions from a CSV or OFX/QFX file, chosen by extension."""
+    if os.path.splitext(str(path))[1].lower() in (".ofx", ".qfx"):
+        return read_ofx(path, stats)
+    return read_csv(path, stats, **options)
+
+
+# Pipeline stages
+def normalize(transactions, stats):
+    """Normalize dates and names and keep only spending (positive amounts)."""
+    for t in transactions:
+        try:
+            t["date"] = parse_statement_date(t["date"])
+        except ValueError:
+            stats.skipped += 1
+            continue
+        t["name"] = " ".join(str(t["name"]).split()) or "—"
+        if t["amount"] <= 0:
+            # Credits and zero lines are not expenses
+            stats.skipped += 1
+            continue
+        t["amount"] = round(t["amount"], 2)
+        yield t
+
+
+def categorize(transactions, stats, categories, classify=None, default_category=None):
+    """Attach a category to each transaction, dropping those that cannot be placed.
+
+    The statement's own category column wins when it names an existing
+    category, then classify(transaction) if given, then default_category.
+    """
+    for t in transactions:
+        category = t.get("category")
+        if category not in categories and classify is not None:
+            category = classify(t)
+        if category not in categories:
+            category = default_category
+        if category not in categories:
+            stats.skipped += 1
+            continue
+        t["category"] = category
+        yield t
+
+
+def dedupe(transactions, stats, existing=None, id_window=ID_WINDOW):
+    """Drop transactions already present, by bank id or by (category, date, name, amount).
+
+    existing(period) returns the (category, date, name, amount) keys of the
+    expenses stored for a YYYY-MM period; it is called once per period the
+    statement touches. Each stored expense cancels a single matching
+    transaction, so repeated identical purchases within one statement are kept.
+    A bank id is dropped when it repeats one of the last id_window ids.
+    """
+    remaining = Counter()
+    loaded = set()
+    seen_ids = set()
+    recent_ids = deque()
+    for t in transactions:
+        period = t["date"][:7]
+        if existing is not None and period not in loaded:
+            loaded.add(period)
+            remaining.update(existing(period))
+        bank_id = t.get("id")
+        if bank_id:
+            if bank_id in seen_ids:
+                stats.duplicates += 1
+                continue
+            if len(recent_ids) >= id_window:
+                seen_ids.discard(recent_ids.popleft())
+            seen_ids.add(bank_id)
+            recent_ids.append(bank_id)
+        key = (t["category"], t["date"], t["name"], t["amount"])
+        if remaining.get(key):
+            remaining[key] -= 1
+            stats.duplicates += 1
+            continue
+        yield t
+
+
+def chunked(iterable, size):
+    """Yield lists of at most size items."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def existing_keys(manager, period):
+    """Return dedupe keys of the expenses the manager holds for a period."""
+    # The current month's lists may be appended to by other threads meanwhile
+    with manager.read_lock:
+        document = manager.get_period(period) or {}
+        return [
+            (c["name"], s.get("date"), s["name"], s["amount"])
+            for c in document.get("categories", []) for s in c["sub"]
+            if (s.get("date") or period)[:7] == period
+        ]
+
+
+def import_statement(manager, path, default_category=None, classify=None, chunk_size=5000,
+                     progress=None, cancelled=None, **options):
+    """Stream a statement file into the manager, committing chunk_size expenses at a time.
+
+    progress(stats) is called after every chunk; cancelled() is checked
+    between chunks and stops the import (already committed chunks stay).
+    Memory use is bounded by the chunk size, not by the file size.
+    Returns the ImportStats of the run.
+    """
+    stats = ImportStats(os.path.getsize(path))
+    with manager.read_lock:
+        categories = {c["name"] for c in manager.get_categories()}
+    pipeline = read_statement(path, stats, **options)
+    pipeline = normalize(pipeline, stats)
+    pipeline = categorize(pipeline, stats, categories, classify, default_category)
+    pipeline = dedupe(pipeline, stats, lambda period: existing_keys(manager, period))
+
+    for chunk in chunked(pipeline, chunk_size):
+        if cancelled is not None and cancelled():
+            break
+        manager.add_expenses([(t["category"], t["name"], t["amount"], t["date"]) for t in chunk])
+        stats.imported += len(chunk)
+        if progress is not None:
+            progress(stats)
+    if progress is not None:
+        progress(stats)
+    return stats
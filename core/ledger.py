@@ -0,0 +1,402 @@
+import copy
+import mmap
+import os
+import struct
+import threading
+from array import array
+from core.events import ChangeEvent, apply_event
+from core.records import Category, ExpenseList
+from core.storage import JsonStorage, Storage, write_atomic
+
+
+MAGIC = b"BUDGETL1"
+VERSION = 1
+
+# magic, version, period ("YYYY-MM"), flags, monthly income, category capacity and count,
+# expense capacity and count, string table capacity, bytes used and number of strings
+HEADER = struct.Struct("<8sI8sIdIIQQQQQ")
+# name (byte offset, length) in the string table, percentage, spent total, expense count
+CATEGORY = struct.Struct("<IIddQ")
+# category index, amount, name and date as string numbers
+EXPENSE = struct.Struct("<IdII")
+# Date of an undated expense
+NO_DATE = 0xFFFFFFFF
+
+HAS_INCOME = 1
+HAS_PERIOD = 2
+
+# Reserved room of a new file; a file that fills up is rewritten with twice the room it needs
+MIN_CATEGORIES = 64
+MIN_EXPENSES = 4096
+MIN_STRINGS = 64 * 1024
+
+
+class LedgerFull(Exception):
+    """Raised when an append does not fit in the room reserved in the file."""
+
+
+def _layout(category_capacity, expense_capacity):
+    """Return the offsets of the category directory, the expense records and the string table."""
+    directory = HEADER.size
+    expenses = directory + category_capacity * CATEGORY.size
+    strings = expenses + expense_capacity * EXPENSE.size
+    return directory, expenses, strings
+
+
+def _clean(text):
+    """Drop NUL characters, which terminate strings in the table."""
+    return text.replace("\0", "")
+
+
+def encode_ledger(data):
+    """Serialize a budget document (dicts or records) into the ledger format, with room to grow.
+
+    Every distinct name and date is stored once in the string table.
+    """
+    categories = data.get("categories", [])
+    count = sum(len(c["sub"]) for c in categories)
+    category_capacity = max(MIN_CATEGORIES, 2 * len(categories))
+    expense_capacity = max(MIN_EXPENSES, 2 * count)
+
+    # Category names come first in the table; the directory points at them by byte offset
+    strings = [c["name"] for c in categories]
+    directory = bytearray(category_capacity * CATEGORY.size)
+    offset = 0
+    for index, (c, name) in enumerate(zip(categories, strings)):
+        sub = c["sub"]
+        spent = sub.total() if isinstance(sub, ExpenseList) else sum(s["amount"] for s in sub)
+        length = len(_clean(name).encode("utf-8"))
+        CATEGORY.pack_into(directory, index * CATEGORY.size, offset, length, c["percentage"], spent, len(sub))
+        offset += length + 1
+
+    # Names and dates follow, numbered in order of first use
+    numbers = {}
+    number = numbers.setdefault
+    base = len(strings)
+    records = bytearray(expense_capacity * EXPENSE.size)
+    pack = EXPENSE.pack_into
+    at = 0
+    for index, c in enumerate(categories):
+        sub = c["sub"]
+        rows = sub.rows() if isinstance(sub, ExpenseList) else ((s["name"], s["amount"], s.get("date")) for s in sub)
+        for name, amount, date in rows:
+            # A new key gets the next number, since len(numbers) is taken before it is inserted
+            name_id = number(name, base + len(numbers))
+            date_id = NO_DATE if date is None else number(date, base + len(numbers))
+            pack(records, at, index, amount, name_id, date_id)
+            at += EXPENSE.size
+    strings.extend(numbers)
+
+    # Every string ends with a NUL (so an empty table is empty, not one empty string)
+    table = "\0".join(strings) + "\0" if strings else ""
+    if table.count("\0") != len(strings):
+        table = "\0".join(_clean(text) for text in strings) + "\0"
+    table = table.encode("utf-8")
+    string_capacity = max(MIN_STRINGS, 2 * len(table))
+    period = data.get("period")
+    flags = (HAS_INCOME if "monthly_income" in data else 0) | (HAS_PERIOD if period else 0)
+    header = HEADER.pack(
+        MAGIC, VERSION, (period or "").encode("ascii"), flags, float(data.get("monthly_income", 0.0)),
+        category_capacity, len(categories), expense_capacity, count, string_capacity, len(table), len(strings)
+    )
+    return b"".join([header, directory, records, table, bytes(string_capacity - len(table))])
+
+
+class LedgerFile:
+    """A ledger file mapped into memory.
+
+    The header and the category directory, including each category's spent
+    total and expense count, are read straight from the mapping, and
+    document() decodes the expenses. Appends (income, categories, renames,
+    expenses) are written in place into the room reserved in the file, in
+    two steps: new strings and expense records first, then commit() flushes
+    them before writing the directory entries and the header that count
+    them, and flushes again. A crash before the header reaches the disk
+    leaves the appends uncounted.
+    """
+
+    def __init__(self, path):
+        """Map an existing ledger file for reading and in-place appends."""
+        self.path = str(path)
+        self._file = open(self.path, "r+b")
+        self._map = None
+        # Directory entries changed since the last commit(), by index
+        self._pending = {}
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0)
+            self._read_header()
+        except Exception:
+            self.close()
+            raise
+        # Names of the categories in directory order, decoded once
+        self._names = [self._text(name_off, name_len) for name_off, name_len, _, _, _ in self._directory()]
+        # String number of each text in the table, read on the first dated append
+        self._string_ids = None
+
+    def _read_header(self):
+        """Read the header fields and the region offsets."""
+        if len(self._map) < HEADER.size:
+            raise ValueError("Ledger file is truncated.")
+        (magic, version, period, self.flags, self.income, self.category_capacity, self.category_count,
+         self.expense_capacity, self.expense_count, self.string_capacity, self.string_used,
+         self.string_count) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a budget ledger file.")
+        self.period = period.rstrip(b"\0").decode("ascii")
+        self._directory_at, self._expenses_at, self._strings_at = _layout(
+            self.category_capacity, self.expense_capacity
+        )
+        if len(self._map) < self._strings_at + self.string_capacity:
+            raise ValueError("Ledger file is truncated.")
+
+    def _write_header(self):
+        """Write the header fields back, committing the appends before it."""
+        HEADER.pack_into(
+            self._map, 0, MAGIC, VERSION, self.period.encode("ascii"), self.flags, self.income,
+            self.category_capacity, self.category_count, self.expense_capacity, self.expense_count,
+            self.string_capacity, self.string_used, self.string_count
+        )
+
+    def _text(self, offset, length):
+        """Decode one string of the string table."""
+        start = self._strings_at + offset
+        with memoryview(self._map) as view:
+            return str(view[start:start + length], "utf-8")
+
+    def _directory(self):
+        """Return the category directory entries as tuples, including uncommitted changes."""
+        end = self._directory_at + self.category_count * CATEGORY.size
+        with memoryview(self._map) as view:
+            entries = list(CATEGORY.iter_unpack(view[self._directory_at:end]))
+        for index, entry in self._pending.items():
+            entries[index] = entry
+        return entries
+
+    def _entry(self, index):
+        """Return one directory entry, including uncommitted changes."""
+        entry = self._pending.get(index)
+        if entry is None:
+            entry = CATEGORY.unpack_from(self._map, self._directory_at + index * CATEGORY.size)
+        return entry
+
+    def document(self):
+        """Decode the whole ledger into a budget document with Category records.
+
+        The string table is decoded in one pass and every expense refers to
+        its entries, so equal names share one str object. Directory totals
+        left stale by an interrupted append are corrected on the way.
+        """
+        columns = [([], array("d"), []) for _ in range(self.category_count)]
+        end = self._expenses_at + self.expense_count * EXPENSE.size
+        with memoryview(self._map) as view:
+            strings = str(view[self._strings_at:self._strings_at + self.string_used], "utf-8").split("\0")
+            for index, amount, name_id, date_id in EXPENSE.iter_unpack(view[self._expenses_at:end]):
+                names, amounts, dates = columns[index]
+                names.append(strings[name_id])
+                amounts.append(amount)
+                dates.append(None if date_id == NO_DATE else strings[date_id])
+
+        data = {"categories": []}
+        if self.flags & HAS_INCOME:
+            data["monthly_income"] = self.income
+        if self.flags & HAS_PERIOD:
+            data["period"] = self.period
+        for index, (name, entry, (names, amounts, dates)) in enumerate(zip(self._names, self._directory(), columns)):
+            name_off, name_len, percentage, spent, count = entry
+            sub = ExpenseList.from_columns(names, amounts, dates)
+            if count != len(sub) or spent != sub.total():
+                self._pending[index] = (name_off, name_len, percentage, sub.total(), len(sub))
+            data["categories"].append(Category(name, percentage, sub))
+        return data
+
+    # In-place appends
+    def _add_strings(self, texts):
+        """Append strings to the table and return their (number, offset, length).
+
+        Raises LedgerFull, writing nothing, if they do not fit.
+        """
+        raws = [_clean(text).encode("utf-8") for text in texts]
+        if self.string_used + sum(len(raw) + 1 for raw in raws) > self.string_capacity:
+            raise LedgerFull("string table")
+        refs = []
+        for raw in raws:
+            at = self._strings_at + self.string_used
+            self._map[at:at + len(raw) + 1] = raw + b"\0"
+            refs.append((self.string_count, self.string_used, len(raw)))
+            self.string_used += len(raw) + 1
+            self.string_count += 1
+        return refs
+
+    def find_category(self, name):
+        """Return the directory index of the first category with the given name, or None."""
+        try:
+            return self._names.index(name)
+        except ValueError:
+            return None
+
+    def set_income(self, value):
+        """Set the monthly income."""
+        self.income = float(value)
+        self.flags |= HAS_INCOME
+
+    def add_category(self, name, percentage):
+        """Append a category to the directory."""
+        if self.category_count >= self.category_capacity:
+            raise LedgerFull("categories")
+        ((_, name_off, name_len),) = self._add_strings([name])
+        self._pending[self.category_count] = (name_off, name_len, float(percentage), 0.0, 0)
+        self.category_count += 1
+        self._names.append(name)
+
+    def update_category(self, index, name, percentage):
+        """Rename a category and/or change its percentage."""
+        name_off, name_len, _, spent, count = self._entry(index)
+        if name != self._names[index]:
+            ((_, name_off, name_len),) = self._add_strings([name])
+        self._pending[index] = (name_off, name_len, float(percentage), spent, count)
+        self._names[index] = name
+
+    def _string_id(self, text):
+        """Return the number of a string already in the table, or None (used so each date is stored once)."""
+        if self._string_ids is None:
+            with memoryview(self._map) as view:
+                strings = str(view[self._strings_at:self._strings_at + self.string_used], "utf-8").split("\0")
+            self._string_ids = {}
+            for number, string in enumerate(strings[:self.string_count]):
+                self._string_ids.setdefault(string, number)
+        return self._string_ids.get(text)
+
+    def append_expense(self, index, name, amount, date=None):
+        """Append an expense to the category at a directory index and update its totals."""
+        if self.expense_count >= self.expense_capacity:
+            raise LedgerFull("expenses")
+        date_id = NO_DATE if date is None else self._string_id(date)
+        new_date = date_id is None
+        refs = self._add_strings([name, date] if new_date else [name])
+        if new_date:
+            date_id = self._string_ids[date] = refs[1][0]
+        EXPENSE.pack_into(self._map, self._expenses_at + self.expense_count * EXPENSE.size,
+                          index, float(amount), refs[0][0], date_id)
+        name_off, name_len, percentage, spent, count = self._entry(index)
+        self._pending[index] = (name_off, name_len, percentage, spent + float(amount), count + 1)
+        self.expense_count += 1
+
+    def commit(self):
+        """Make the appends durable and count them.
+
+        The strings and records are flushed first; only then are the
+        directory entries and the header written and flushed (two msyncs).
+        """
+        self._map.flush()
+        for index, entry in self._pending.items():
+            CATEGORY.pack_into(self._map, self._directory_at + index * CATEGORY.size, *entry)
+        self._pending = {}
+        self._write_header()
+        self._map.flush()
+
+    def close(self):
+        """Unmap and close the file."""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+class LedgerStorage(Storage):
+    """Store the budget in a memory-mapped binary ledger next to the JSON file (data.json -> data.ledger).
+
+    Loading decodes fixed-width records instead of parsing JSON. Income
+    changes, new or renamed categories and new expenses are written into the
+    file in place; other changes, and appends that outgrow the reserved room,
+    rewrite the file atomically. An existing data.json is imported the first
+    time the ledger is created.
+    """
+
+    IN_PLACE = {ChangeEvent.INCOME_CHANGED, ChangeEvent.CATEGORY_ADDED, ChangeEvent.CATEGORY_UPDATED,
+                ChangeEvent.EXPENSE_ADDED}
+
+    def __init__(self, path):
+        """Initialize LedgerStorage, creating the ledger file if needed."""
+        self.json_path = str(path)
+        root, _ = os.path.splitext(self.json_path)
+        self.path = root + ".ledger"
+        # Writes come from the background writer thread, loads from the manager's thread
+        self._lock = threading.Lock()
+        if not os.path.exists(self.path):
+            data = JsonStorage(self.json_path).load() if os.path.exists(self.json_path) else {}
+            write_atomic(self.path, encode_ledger(data))
+        self.file = LedgerFile(self.path)
+
+    def load(self):
+        """Map the ledger again and decode the budget document from it.
+
+        Mapping again picks up a file another process rewrote, and header
+        fields it changed by appending in place.
+        """
+        with self._lock:
+            mapped = LedgerFile(self.path)
+            self.file.close()
+            self.file = mapped
+            return self.file.document()
+
+    def paths(self):
+        """Return the ledger file."""
+        return [self.path]
+
+    def prepare(self, data, events=()):
+        """Keep the events when they can be appended in place, else copy the whole document."""
+        if events and all(event.kind in self.IN_PLACE for event in events):
+            return "events", list(events)
+        return "rewrite", copy.deepcopy(data)
+
+    def write(self, payload):
+        """Append the events in place, or rewrite the file from a document."""
+        kind, value = payload
+        with self._lock:
+            if kind == "rewrite":
+                self._rewrite(value)
+                return
+            for i, event in enumerate(value):
+                try:
+                    self._apply(event)
+                except LedgerFull:
+                    # Out of room: rebuild from the file plus the events not yet written
+                    data = self.file.document()
+                    for rest in value[i:]:
+                        apply_event(data, rest)
+                    self._rewrite(data)
+                    return
+            self.file.commit()
+
+    def _apply(self, event):
+        """Append one event to the mapped file."""
+        kind = event.kind
+        if kind == ChangeEvent.INCOME_CHANGED:
+            self.file.set_income(event.value)
+        elif kind == ChangeEvent.CATEGORY_ADDED:
+            self.file.add_category(event.category, event.value)
+        elif kind == ChangeEvent.CATEGORY_UPDATED:
+            index = self.file.find_category(event.old_category)
+            if index is not None:
+                self.file.update_category(index, event.category, event.value)
+        elif kind == ChangeEvent.EXPENSE_ADDED:
+            index = self.file.find_category(event.category)
+            if index is not None:
+                self.file.append_expense(index, event.expense, event.value, event.date)
+        else:
+            raise ValueError(f"Change event cannot be appended in place: {kind}")
+
+    def _rewrite(self, data):
+        """Atomically replace the ledger with a freshly encoded document and map it again."""
+        payload = encode_ledger(data)
+        # The file must be unmapped before it can be replaced on Windows
+        self.file.close()
+        try:
+            write_atomic(self.path, payload)
+        finally:
+            self.file = LedgerFile(self.path)
+
+    def close(self):
+        """Unmap the ledger file."""
+        with self._lock:
+            self.file.close()
@@ -0,0 +1,182 @@
+import os
+import threading
+from contextlib import contextmanager
+
+# Advisory file locks are POSIX only; elsewhere FileLock only serializes threads
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class _Side:
+    """One side (read or write) of an RWLock, usable as a context manager."""
+
+    __slots__ = ("acquire", "release")
+
+    def __init__(self, acquire, release):
+        """Initialize _Side with the lock's acquire and release methods."""
+        self.acquire = acquire
+        self.release = release
+
+    def __enter__(self):
+        """Acquire this side of the lock."""
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        """Release this side of the lock."""
+        self.release()
+        return False
+
+
+class RWLock:
+    """Reader-writer lock: any number of readers or one writer, both re-entrant.
+
+    The thread holding the write lock may also take the read lock. Taking
+    the write lock while holding only the read lock raises RuntimeError
+    instead of deadlocking. Waiting writers keep new readers out, so a
+    steady stream of readers cannot starve them. Used directly as a context
+    manager the lock is taken for writing, like the RLock it replaces.
+    """
+
+    def __init__(self):
+        """Initialize an unlocked RWLock."""
+        self._cond = threading.Condition(threading.Lock())
+        # Thread id -> read nesting depth
+        self._readers = {}
+        self._writer = None
+        self._write_depth = 0
+        self._waiting_writers = 0
+        self.read_lock = _Side(self.acquire_read, self.release_read)
+        self.write_lock = _Side(self.acquire_write, self.release_write)
+
+    def acquire_read(self):
+        """Take the read lock, waiting while another thread writes or waits to."""
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me or me in self._readers:
+                self._readers[me] = self._readers.get(me, 0) + 1
+                return
+            while self._writer is not None or self._waiting_writers:
+                self._cond.wait()
+            self._readers[me] = 1
+
+    def release_read(self):
+        """Release one level of the read lock."""
+        me = threading.get_ident()
+        with self._cond:
+            depth = self._readers.get(me)
+            if not depth:
+                raise RuntimeError("Read lock released by a thread that does not hold it.")
+            if depth > 1:
+                self._readers[me] = depth - 1
+                return
+            del self._readers[me]
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        """Take the write lock, waiting until no other thread reads or writes."""
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            if me in self._readers:
+                raise RuntimeError("Cannot take the write lock while holding the read lock.")
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self):
+        """Release one level of the write lock."""
+        with self._cond:
+            if self._writer != threading.get_ident():
+                raise RuntimeError("Write lock released by a thread that does not hold it.")
+            self._write_depth -= 1
+            if not self._write_depth:
+                self._writer = None
+                self._cond.notify_all()
+
+    def __enter__(self):
+        """Take the write lock."""
+        self.acquire_write()
+        return self
+
+    def __exit__(self, *exc):
+        """Release the write lock."""
+        self.release_write()
+        return False
+
+
+class FileLock:
+    """Advisory lock on a file shared by every process using the same data.
+
+    Other processes running the app (or tools that honour flock) are kept
+    out while one of them writes; readers may share the lock. Within a
+    process the lock is a re-entrant mutex and the flock is only taken by
+    the outermost acquire. Without fcntl (Windows) only threads are
+    serialized.
+    """
+
+    def __init__(self, path):
+        """Initialize FileLock on path (created on first use)."""
+        self.path = str(path)
+        self._mutex = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def acquire(self, shared=False):
+        """Take the lock, shared between readers or exclusive."""
+        self._mutex.acquire()
+        try:
+            if self._depth == 0 and fcntl is not None:
+                if self._fd is None:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                    self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(self._fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        except BaseException:
+            self._mutex.release()
+            raise
+        self._depth += 1
+
+    def release(self):
+        """Release one level of the lock."""
+        self._depth -= 1
+        try:
+            if self._depth == 0 and self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            self._mutex.release()
+
+    @contextmanager
+    def shared(self):
+        """Hold the lock for reading."""
+        self.acquire(shared=True)
+        try:
+            yield self
+        finally:
+            self.release()
+
+    def __enter__(self):
+        """Hold the lock for writing."""
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        """Release the lock."""
+        self.release()
+        return False
+
+    def close(self):
+        """Close the lock file."""
+        with self._mutex:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
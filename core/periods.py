@@ -0,0 +1,140 @@
+import datetime
+import os
+import re
+from collections import OrderedDict
+from core.codec import get_codec
+from core.events import expense_period
+from core.storage import write_atomic
+
+
+PERIOD_FILE = re.compile(r"^\d{4}-\d{2}\.json$")
+
+
+def current_period(today=None) -> str:
+    """Return the YYYY-MM period containing today (or the given date)."""
+    return (today or datetime.date.today()).strftime("%Y-%m")
+
+
+def parse_date(value) -> str:
+    """Normalize a date or ISO string to YYYY-MM-DD, raising ValueError if invalid."""
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    try:
+        return datetime.date.fromisoformat(str(value).strip()).isoformat()
+    except ValueError:
+        raise ValueError("التاريخ غير صالح، استخدم الصيغة YYYY-MM-DD.")
+
+
+class PeriodStore:
+    """Archive of closed monthly periods, one JSON file per YYYY-MM.
+
+    Only the periods that are asked for are read from disk; the most recently
+    used ``cache_size`` of them stay in memory.
+    """
+
+    def __init__(self, directory, cache_size=12, codec="auto"):
+        """Initialize PeriodStore with its directory and LRU cache size."""
+        self.directory = str(directory)
+        self.cache_size = cache_size
+        self.codec = get_codec(codec)
+        self._cache = OrderedDict()
+
+    def path(self, period):
+        """Return the file path of a period."""
+        return os.path.join(self.directory, f"{period}.json")
+
+    def periods(self):
+        """Return the archived periods, oldest first, without loading them."""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-5] for name in os.listdir(self.directory) if PERIOD_FILE.match(name))
+
+    def get(self, period):
+        """Return the document of an archived period, or None if it does not exist."""
+        if period in self._cache:
+            self._cache.move_to_end(period)
+            return self._cache[period]
+        document = self.read(period)
+        if document is not None:
+            self._remember(period, document)
+        return document
+
+    def read(self, period):
+        """Read a period document from disk without caching it (for one-off scans)."""
+        path = self.path(period)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return self.codec.loads(f.read())
+
+    def invalidate(self):
+        """Forget the cached documents, e.g. after another process wrote period files."""
+        self._cache.clear()
+
+    def _remember(self, period, document):
+        """Put a document in the LRU cache, evicting the least recently used."""
+        self._cache[period] = document
+        self._cache.move_to_end(period)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _save(self, period, document):
+        """Write a period document atomically."""
+        os.makedirs(self.directory, exist_ok=True)
+        write_atomic(self.path(period), self.codec.dumps(document))
+        self._remember(period, document)
+
+    @staticmethod
+    def _category(document, name, percentage):
+        """Return the category record of a period document, creating it if needed."""
+        for c in document["categories"]:
+            if c["name"] == name:
+                return c
+        category = {"name": name, "percentage": percentage, "sub": []}
+        document["categories"].append(category)
+        return category
+
+    def _document(self, period, income):
+        """Return an existing period document or a new empty one."""
+        return self.get(period) or {"period": period, "monthly_income": income, "categories": []}
+
+    def archive(self, data, before):
+        """Move every expense of data older than the given period into its period file.
+
+        Returns the number of archived expenses; data itself is not modified.
+        Each period file records the open period of the data its expenses
+        came from, so archiving the same data again (the save closing the
+        period failed, or the process died before it) adds nothing twice.
+        """
+        default = data.get("period", before)
+        source = data.get("period", "")
+        income = float(data.get("monthly_income", 0.0))
+        by_period = {}
+        for c in data.get("categories", []):
+            for s in c["sub"]:
+                period = expense_period(s, default)
+                if period < before:
+                    by_period.setdefault(period, []).append((c, s))
+
+        archived = 0
+        for period, items in sorted(by_period.items()):
+            # Read from disk: another instance may have archived this data already
+            self._cache.pop(period, None)
+            document = self._document(period, income)
+            if source in document.get("archived_from", ()):
+                continue
+            for c, s in items:
+                self._category(document, c["name"], c["percentage"])["sub"].append(dict(s))
+            document.setdefault("archived_from", []).append(source)
+            self._save(period, document)
+            archived += len(items)
+        return archived
+
+    def add_expenses(self, period, items, income):
+        """Append many (category, expense) pairs to an archived period with a single write."""
+        # Read from disk: another instance may have written the file since it was cached
+        self._cache.pop(period, None)
+        document = self._document(period, income)
+        for category, expense in items:
+            self._category(document, category["name"], category["percentage"])["sub"].append(dict(expense))
+        self._save(period, document)
@@ -0,0 +1,291 @@
+from array import array
+from itertools import compress
+
+
+class Expense:
+    """One expense of an ExpenseList, read and written with the dict keys of the JSON shape.
+
+    An Expense is a view on a row of its list: it is created on access and
+    stays valid until rows before it are removed.
+    """
+
+    __slots__ = ("_list", "_index")
+
+    def __init__(self, expenses, index):
+        """Initialize Expense as a view on row index of an ExpenseList."""
+        self._list = expenses
+        self._index = index
+
+    def __getitem__(self, key):
+        """Return "name", "amount" or "date" (KeyError for an undated expense)."""
+        if key == "name":
+            return self._list._names[self._index]
+        if key == "amount":
+            return self._list._amounts[self._index]
+        if key == "date":
+            date = self._list._dates[self._index]
+            if date is not None:
+                return date
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        """Write a field back to the list's columns."""
+        if key == "name":
+            self._list._names[self._index] = value
+        elif key == "amount":
+            self._list._amounts[self._index] = value
+        elif key == "date":
+            self._list._dates[self._index] = value
+        else:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        """Return a field, or default when it is missing."""
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        """Return the keys present, as in the JSON shape."""
+        return ("name", "amount") if self._list._dates[self._index] is None else ("name", "amount", "date")
+
+    def __contains__(self, key):
+        """Return True if the field is present."""
+        return key in self.keys()
+
+    def to_dict(self):
+        """Return the expense in its JSON shape."""
+        return {key: self[key] for key in self.keys()}
+
+    def __repr__(self):
+        """Return a readable representation for debugging."""
+        return f"Expense({self.to_dict()})"
+
+
+class ExpenseList:
+    """Expenses of one category stored column-wise.
+
+    Amounts live in an array('d') and names and dates in lists of strings,
+    equal strings read together sharing one object, so an expense costs a
+    few machine words instead of a dict with its own float and strings.
+    Iterating or indexing yields Expense views.
+    """
+
+    __slots__ = ("_names", "_amounts", "_dates")
+    # remove_name() deletes up to this many rows in place, and rebuilds the columns beyond it
+    DELETE_IN_PLACE = 32
+
+    def __init__(self, expenses=(), pool=None):
+        """Initialize ExpenseList from expense dicts (or views); see extend() for pool."""
+        self._names = []
+        self._amounts = array("d")
+        self._dates = []
+        self.extend(expenses, pool)
+
+    @classmethod
+    def from_columns(cls, names, amounts, dates):
+        """Build an ExpenseList that takes ownership of ready-made columns (lists and an array('d'))."""
+        expenses = cls()
+        expenses._names = names
+        expenses._amounts = amounts
+        expenses._dates = dates
+        return expenses
+
+    def __len__(self):
+        """Return the number of expenses."""
+        return len(self._names)
+
+    def __getitem__(self, index):
+        """Return the Expense view at index (a list of views for a slice)."""
+        if isinstance(index, slice):
+            return [Expense(self, i) for i in range(*index.indices(len(self._names)))]
+        size = len(self._names)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("expense index out of range")
+        return Expense(self, index)
+
+    def __iter__(self):
+        """Yield an Expense view per row."""
+        for i in range(len(self._names)):
+            yield Expense(self, i)
+
+    def append(self, expense):
+        """Append an expense given as a dict (or a view)."""
+        self._names.append(expense["name"])
+        self._amounts.append(expense["amount"])
+        self._dates.append(expense.get("date"))
+
+    def extend(self, expenses, pool=None):
+        """Append many expenses, one column at a time.
+
+        Equal names and dates are stored as one string object, looked up in
+        pool (a dict, shared to deduplicate across lists) or a fresh one.
+        """
+        if not isinstance(expenses, (list, tuple)):
+            expenses = list(expenses)
+        share = ({} if pool is None else pool).setdefault
+        self._names.extend([share(s["name"], s["name"]) for s in expenses])
+        self._amounts.extend([s["amount"] for s in expenses])
+        dates = [s.get("date") for s in expenses]
+        self._dates.extend([date if date is None else share(date, date) for date in dates])
+
+    def names(self):
+        """Return the name column (do not modify it)."""
+        return self._names
+
+    def amounts(self):
+        """Return the amount column (do not resize it)."""
+        return self._amounts
+
+    def dates(self):
+        """Return the date column, None for an undated expense (do not modify it)."""
+        return self._dates
+
+    def rows(self):
+        """Return an iterator of (name, amount, date) tuples; date is None when missing."""
+        return zip(self._names, self._amounts, self._dates)
+
+    def pairs(self):
+        """Return [(name, amount)] of every expense."""
+        return list(zip(self._names, self._amounts))
+
+    def total(self):
+        """Return the sum of the amounts."""
+        return sum(self._amounts, 0.0)
+
+    def find(self, name, start=0):
+        """Return the row of the first expense called name at or after start, or None."""
+        try:
+            return self._names.index(name, start)
+        except ValueError:
+            return None
+
+    def first_rows(self):
+        """Return {name: row of the first expense with that name}."""
+        # Built back to front so the first row of each name is written last
+        return dict(zip(reversed(self._names), range(len(self._names) - 1, -1, -1)))
+
+    def remove_name(self, name):
+        """Delete every expense called name and return them as dicts."""
+        rows = []
+        row = self.find(name)
+        while row is not None:
+            rows.append(row)
+            row = self.find(name, row + 1)
+        removed = [Expense(self, i).to_dict() for i in rows]
+        if len(rows) <= self.DELETE_IN_PLACE:
+            # Bottom up, so the rows still to delete keep their positions
+            for i in reversed(rows):
+                del self._names[i]
+                del self._amounts[i]
+                del self._dates[i]
+        elif rows:
+            keep = [n != name for n in self._names]
+            self._names = list(compress(self._names, keep))
+            self._amounts = array("d", compress(self._amounts, keep))
+            self._dates = list(compress(self._dates, keep))
+        return removed
+
+    def __eq__(self, other):
+        """Return True if both lists hold the same expenses in the same order."""
+        if not isinstance(other, ExpenseList):
+            return NotImplemented
+        return self._amounts == other._amounts and self._names == other._names and self._dates == other._dates
+
+    # Mutable, like a list
+    __hash__ = None
+
+    def copy(self):
+        """Return an independent copy (the columns are copied, strings are shared)."""
+        other = ExpenseList()
+        other._names = list(self._names)
+        other._amounts = array("d", self._amounts)
+        other._dates = list(self._dates)
+        return other
+
+    def __deepcopy__(self, memo):
+        """Copy the columns; strings and floats are immutable."""
+        return self.copy()
+
+    def to_json(self):
+        """Return the expenses in their JSON shape (a list of dicts)."""
+        return [
+            {"name": name, "amount": amount} if date is None else {"name": name, "amount": amount, "date": date}
+            for name, amount, date in zip(self._names, self._amounts, self._dates)
+        ]
+
+    def __repr__(self):
+        """Return a short representation for debugging."""
+        return f"ExpenseList({len(self)} expenses)"
+
+
+class Category:
+    """A budget category record, read and written with the dict keys of the JSON shape."""
+
+    __slots__ = ("name", "percentage", "sub")
+    KEYS = ("name", "percentage", "sub")
+
+    def __init__(self, name, percentage, sub=(), pool=None):
+        """Initialize Category; sub may be an ExpenseList or expense dicts (see ExpenseList.extend for pool)."""
+        self.name = name
+        self.percentage = percentage
+        self.sub = sub if isinstance(sub, ExpenseList) else ExpenseList(sub, pool)
+
+    @classmethod
+    def from_dict(cls, d, pool=None):
+        """Build a Category from its JSON shape."""
+        return cls(d["name"], d["percentage"], d.get("sub", ()), pool)
+
+    def __getitem__(self, key):
+        """Return "name", "percentage" or "sub"."""
+        if key in self.KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        """Set a field; a plain list assigned to "sub" is converted to an ExpenseList."""
+        if key not in self.KEYS:
+            raise KeyError(key)
+        if key == "sub" and not isinstance(value, ExpenseList):
+            value = ExpenseList(value)
+        setattr(self, key, value)
+
+    def get(self, key, default=None):
+        """Return a field, or default for an unknown key."""
+        return getattr(self, key) if key in self.KEYS else default
+
+    def keys(self):
+        """Return the keys of the JSON shape."""
+        return self.KEYS
+
+    def __contains__(self, key):
+        """Return True for the keys of the JSON shape."""
+        return key in self.KEYS
+
+    def __deepcopy__(self, memo):
+        """Copy the record and its expense columns."""
+        return Category(self.name, self.percentage, self.sub.copy())
+
+    def to_json(self):
+        """Return the category in its JSON shape (the codec encodes sub through its own to_json)."""
+        return {"name": self.name, "percentage": self.percentage, "sub": self.sub}
+
+    def __repr__(self):
+        """Return a short representation for debugging."""
+        return f"Category({self.name!r}, {self.percentage}, {self.sub!r})"
+
+
+def to_records(data):
+    """Replace the category dicts of a data document with Category records, in place."""
+    categories = data.get("categories")
+    if categories:
+        # Names and dates repeat across categories too, so they share one pool
+        pool = {}
+        for i, c in enumerate(categories):
+            if not isinstance(c, Category):
+                # Replaced one at a time so each category's dicts are freed before the next is converted
+                categories[i] = Category.from_dict(c, pool)
+    return data
@@ -0,0 +1,181 @@
+import os
+from core.codec import get_codec
+from core.events import expense_period
+from core.storage import write_atomic
+
+
+class RollupIndex:
+    """Per-(period, category) sum, count, min and max of expense amounts.
+
+    Buckets of archived periods are persisted to ``path`` together with the
+    size and mtime of the period file they were computed from, so historical
+    reports never need to load the period files. Buckets of the live period
+    are rebuilt from the data file on load. ``source(period, category)`` must
+    return the raw amounts of a bucket; it is only used to recompute min/max
+    after the current extreme value was removed.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path, source, codec="auto"):
+        """Initialize RollupIndex with its file path and raw amount source."""
+        self.path = str(path)
+        self.source = source
+        self.codec = get_codec(codec)
+        # period -> category -> [sum, count, min, max]; min/max are None when stale
+        self._buckets = {}
+        self._sources = {}
+
+    # Updates
+    def add(self, period, category, amount):
+        """Count an expense amount in its bucket."""
+        bucket = self._buckets.setdefault(period, {}).get(category)
+        if bucket is None:
+            self._buckets[period][category] = [amount, 1, amount, amount]
+            return
+        bucket[0] += amount
+        bucket[1] += 1
+        if bucket[2] is not None:
+            bucket[2] = min(bucket[2], amount)
+            bucket[3] = max(bucket[3], amount)
+
+    def remove(self, period, category, amount):
+        """Remove an expense amount from its bucket."""
+        bucket = self._buckets.get(period, {}).get(category)
+        if bucket is None:
+            return
+        bucket[0] -= amount
+        bucket[1] -= 1
+        if bucket[1] <= 0:
+            del self._buckets[period][category]
+            if not self._buckets[period]:
+                del self._buckets[period]
+        elif amount == bucket[2] or amount == bucket[3]:
+            # The extreme value may be gone; recompute lazily on the next read
+            bucket[2] = bucket[3] = None
+
+    def rename_category(self, old_name, new_name, from_period):
+        """Rename a category in the buckets of from_period and later (history keeps old names)."""
+        for period, categories in self._buckets.items():
+            if period >= from_period and old_name in categories:
+                categories[new_name] = categories.pop(old_name)
+
+    def rebuild_live(self, data, from_period):
+        """Recompute the buckets of from_period and later from the live document."""
+        for period in [p for p in self._buckets if p >= from_period]:
+            del self._buckets[period]
+        default = data.get("period", from_period)
+        for c in data.get("categories", []):
+            for s in c["sub"]:
+                period = expense_period(s, default)
+                if period >= from_period:
+                    self.add(period, c["name"], s["amount"])
+
+    def rebuild_period(self, period, document):
+        """Recompute the buckets of one archived period from its document."""
+        self._buckets.pop(period, None)
+        for c in document.get("categories", []):
+            for s in c["sub"]:
+                self.add(period, c["name"], s["amount"])
+
+    # Queries
+    def _bucket(self, period, category):
+        """Return a bucket with fresh min/max, or None."""
+        bucket = self._buckets.get(period, {}).get(category)
+        if bucket is not None and bucket[2] is None:
+            amounts = self.source(period, category)
+            bucket[2], bucket[3] = (min(amounts), max(amounts)) if amounts else (0.0, 0.0)
+        return bucket
+
+    def get(self, period, category):
+        """Return {"sum", "count", "min", "max"} of a bucket, zeros if empty."""
+        bucket = self._bucket(period, category)
+        if bucket is None:
+            return {"sum": 0.0, "count": 0, "min": 0.0, "max": 0.0}
+        return {"sum": bucket[0], "count": bucket[1], "min": bucket[2], "max": bucket[3]}
+
+    def periods(self):
+        """Return the periods that have at least one expense, oldest first."""
+        return sorted(self._buckets)
+
+    def period_totals(self, period):
+        """Return {category: bucket dict} for one period."""
+        return {category: self.get(period, category) for category in self._buckets.get(period, {})}
+
+    def trend(self, category, periods=None):
+        """Return [(period, sum)] for a category, O(number of periods)."""
+        periods = self.periods() if periods is None else periods
+        result = []
+        for period in periods:
+            bucket = self._buckets.get(period, {}).get(category)
+            result.append((period, bucket[0] if bucket else 0.0))
+        return result
+
+    # Persistence
+    def load(self, store):
+        """Load archived buckets, recomputing periods whose file changed.
+
+        store is the PeriodStore holding the archived periods; a period file is
+        only read when its size or mtime no longer match the stored rollup.
+        Returns True if anything had to be recomputed.
+        """
+        stored = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "rb") as f:
+                    stored = self.codec.loads(f.read())
+                if stored.get("version") != self.VERSION:
+                    stored = {}
+            except Exception as e:
+                print(f"Error reading rollups, rebuilding: {e}")
+                stored = {}
+
+        # Periods whose file was removed are dropped
+        known = set(store.periods())
+        self._buckets.update({p: b for p, b in stored.get("buckets", {}).items() if p in known})
+        self._sources.update({p: s for p, s in stored.get("sources", {}).items() if p in known})
+        return self.refresh(store)
+
+    def refresh(self, store):
+        """Recompute the archived periods whose file is new or changed since the last save.
+
+        Returns True if anything was recomputed.
+        """
+        changed = False
+        for period in store.periods():
+            stamp = self._stamp(store.path(period))
+            if period not in self._sources or self._sources[period] != stamp:
+                self.rebuild_period(period, store.get(period) or {})
+                self._sources[period] = stamp
+                changed = True
+        return changed
+
+    @staticmethod
+    def _stamp(path):
+        """Return a cheap change marker for a file."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return [st.st_size, st.st_mtime_ns]
+
+    def save(self, store, before):
+        """Persist the buckets of archived periods (those before the given period).
+
+        Call it after every write made through the store, so the recorded file
+        stamps match the buckets.
+        """
+        for period in store.periods():
+            self._sources[period] = self._stamp(store.path(period))
+        archived = [p for p in self._buckets if p < before]
+        # Fill in stale min/max before writing
+        for period in archived:
+            for category in list(self._buckets[period]):
+                self._bucket(period, category)
+        document = {
+            "version": self.VERSION,
+            "buckets": {p: self._buckets[p] for p in archived},
+            "sources": {p: s for p, s in self._sources.items() if p < before},
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        write_atomic(self.path, self.codec.dumps(document))
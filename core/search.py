@@ -0,0 +1,165 @@
+import bisect
+import re
+import threading
+from core.text import normalize_text
+
+
+# Words of a normalized name; Arabic letters count as word characters
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Return the normalized words of a text."""
+    return _WORD.findall(normalize_text(text))
+
+
+class SearchIndex:
+    """Inverted index from words of expense names to (category, expense name) keys.
+
+    Every query word matches the indexed words it is a prefix of, so results
+    narrow as the user types; all query words must match. Words are kept in a
+    sorted list so the words sharing a prefix are one bisect range. Expenses
+    sharing a name in a category are one key with a count.
+
+    The index is built from source() (the category records) on the first
+    query, so startup does not pay for it; until then updates are ignored.
+    Queries may run concurrently (under the manager's read lock), so the
+    first build is done once under its own lock.
+    """
+
+    def __init__(self, source):
+        """Initialize SearchIndex with a callable returning the category records."""
+        self.source = source
+        self._built = False
+        self._build_lock = threading.Lock()
+        # word -> {(category, name): count}
+        self._postings = {}
+        self._words = []
+        # category -> {name: count}, for renames and deletions of whole categories
+        self._names = {}
+
+    def invalidate(self):
+        """Drop the index; it is rebuilt from source() on the next query."""
+        self._built = False
+        self._postings = {}
+        self._words = []
+        self._names = {}
+
+    def _build(self):
+        """Index every expense of source() from scratch."""
+        postings = {}
+        by_category = {}
+        for c in self.source():
+            if c["name"] in by_category:
+                # Duplicate records are not indexed, like the manager's name indexes
+                continue
+            names = by_category[c["name"]] = {}
+            for s in c["sub"]:
+                names[s["name"]] = names.get(s["name"], 0) + 1
+            for name, count in names.items():
+                key = (c["name"], name)
+                for word in set(tokenize(name)):
+                    posting = postings.get(word)
+                    if posting is None:
+                        posting = postings[word] = {}
+                    posting[key] = count
+        # Published only once complete, for queries running alongside
+        self._names = by_category
+        self._postings = postings
+        self._words = sorted(postings)
+        self._built = True
+
+    def _ensure_built(self):
+        """Build the index on first use, once even when queries race."""
+        if not self._built:
+            with self._build_lock:
+                if not self._built:
+                    self._build()
+
+    def add(self, category, name, count=1):
+        """Index count more expenses called name in a category."""
+        if not self._built:
+            return
+        names = self._names.setdefault(category, {})
+        names[name] = names.get(name, 0) + count
+        key = (category, name)
+        for word in set(tokenize(name)):
+            posting = self._postings.get(word)
+            if posting is None:
+                posting = self._postings[word] = {}
+                bisect.insort(self._words, word)
+            posting[key] = posting.get(key, 0) + count
+
+    def remove(self, category, name, count=1):
+        """Unindex count expenses called name in a category."""
+        if not self._built:
+            return
+        names = self._names.get(category, {})
+        if name not in names:
+            return
+        names[name] -= count
+        if names[name] <= 0:
+            del names[name]
+        key = (category, name)
+        for word in set(tokenize(name)):
+            posting = self._postings.get(word)
+            if posting is None or key not in posting:
+                continue
+            posting[key] -= count
+            if posting[key] <= 0:
+                del posting[key]
+                if not posting:
+                    del self._postings[word]
+                    del self._words[bisect.bisect_left(self._words, word)]
+
+    def remove_category(self, category):
+        """Unindex every expense of a category."""
+        for name, count in list(self._names.get(category, {}).items()):
+            self.remove(category, name, count)
+        self._names.pop(category, None)
+
+    def rename_category(self, old_name, new_name):
+        """Move the expenses of a renamed category to its new name."""
+        names = dict(self._names.get(old_name, {}))
+        self.remove_category(old_name)
+        for name, count in names.items():
+            self.add(new_name, name, count)
+
+    def _prefix_keys(self, term):
+        """Return the keys of every indexed word starting with term."""
+        words = self._words
+        start = bisect.bisect_left(words, term)
+        end = bisect.bisect_left(words, term + "\U0010ffff", start)
+        if end - start == 1:
+            return self._postings[words[start]].keys()
+        keys = set()
+        for word in words[start:end]:
+            keys.update(self._postings[word])
+        return keys
+
+    def search(self, query):
+        """Return {category: set of expense names} matching every word of query, or None if it is empty."""
+        terms = tokenize(query)
+        if not terms:
+            return None
+
+        self._ensure_built()
+
+        # Start from the most selective word (the longest one)
+        keys = None
+        for term in sorted(set(terms), key=len, reverse=True):
+            found = self._prefix_keys(term)
+            keys = set(found) if keys is None else keys.intersection(found)
+            if not keys:
+                break
+
+        result = {}
+        for category, name in keys:
+            result.setdefault(category, set()).add(name)
+        return result
+
+    def keys(self):
+        """Return {(category, name): count} of every indexed expense (for consistency checks)."""
+        self._ensure_built()
+        return {(category, name): count for category, names in self._names.items()
+                for name, count in names.items()}
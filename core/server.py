@@ -0,0 +1,432 @@
+import argparse
+import asyncio
+import signal
+import sys
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote, urlsplit
+from core.codec import get_codec
+from core.events import ChangeEvent
+
+# Request size limits
+MAX_HEADERS = 100
+MAX_BODY = 1024 * 1024
+
+REASONS = {
+    200: "OK", 201: "Created", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error", 501: "Not Implemented",
+}
+
+
+class HttpError(Exception):
+    """An error answered with an HTTP status and {"error": message}."""
+
+    def __init__(self, status, message):
+        """Initialize HttpError with its status code and message."""
+        super().__init__(message)
+        self.status = status
+
+
+class Snapshot:
+    """Read-only copy of the budget that GET requests are served from.
+
+    Built on the writer thread after each round of writes and never changed
+    afterwards, so the event loop reads it without taking any lock. Expense
+    lists of categories untouched since the previous snapshot are shared
+    with it instead of copied. Encoded responses and their ETags are cached
+    per snapshot.
+    """
+
+    __slots__ = ("version", "income", "summary", "categories", "expenses", "_responses")
+
+    def __init__(self, version, income, summary, categories, expenses):
+        """Initialize Snapshot with category summaries (in order) and {name: ExpenseList}."""
+        self.version = version
+        self.income = income
+        self.summary = summary
+        self.categories = categories
+        self.expenses = expenses
+        self._responses = {}
+
+    def response(self, key, build, codec):
+        """Return (etag, body) of a resource, encoding build() on first use."""
+        cached = self._responses.get(key)
+        if cached is None:
+            body = codec.dumps(build())
+            cached = self._responses[key] = (f'"{zlib.crc32(body):08x}-{len(body):x}"', body)
+        return cached
+
+    def inherit(self, previous):
+        """Reuse the encoded expense lists of previous that this snapshot shares."""
+        # dict.copy() is atomic, while the event loop may be adding responses
+        for key, cached in previous._responses.copy().items():
+            if key[0] == "expenses" and self.expenses.get(key[1]) is previous.expenses.get(key[1]):
+                self._responses[key] = cached
+
+    def category(self, name):
+        """Return the summary of a category, raising a 404 HttpError if it does not exist."""
+        for c in self.categories:
+            if c["name"] == name:
+                return c
+        raise HttpError(404, "الفئة غير موجودة.")
+
+
+class BudgetServer:
+    """Serve a BudgetManager as a REST/JSON API over HTTP/1.1 with keep-alive.
+
+        GET    /api/summary                                 global totals
+        GET    /api/income                                  {"monthly_income"}
+        PUT    /api/income                                  {"monthly_income"}
+        GET    /api/categories                              category summaries
+        POST   /api/categories                              {"name", "percentage"}
+        GET    /api/categories/<name>                       summary and expenses
+        PUT    /api/categories/<name>                       {"name"?, "percentage"?}
+        DELETE /api/categories/<name>
+        GET    /api/categories/<name>/expenses
+        POST   /api/categories/<name>/expenses              {"name", "amount", "date"?}
+        PUT    /api/categories/<name>/expenses/<expense>    {"name"?, "amount"}
+        DELETE /api/categories/<name>/expenses/<expense>
+
+    Names in paths are percent-encoded UTF-8.
+
+    Writes go through a queue drained by a single writer task, which runs
+    them (with the snapshot that follows) on one worker thread, so they are
+    applied in arrival order and never block the event loop. Reads are
+    answered from the current Snapshot, with ETags: a client sending
+    If-None-Match for an unchanged resource gets an empty 304.
+    """
+
+    def __init__(self, manager, codec="auto", poll_interval=2.0):
+        """Initialize BudgetServer; changes saved by other processes are picked up every poll_interval seconds."""
+        self.m = manager
+        self.codec = get_codec(codec)
+        self.poll_interval = poll_interval
+        self.snapshot = None
+        self._queue = None
+        self._tasks = []
+        self._server = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="budget-api-writer")
+        # Categories changed since the last snapshot, filled by the change listener
+        self._changes_lock = threading.Lock()
+        self._changed = set()
+        self._changed_all = True
+        self._dirty = True
+        self.m.subscribe(self._on_change)
+
+    # Snapshots
+    def _on_change(self, event):
+        """Remember which categories a change touched (any thread)."""
+        with self._changes_lock:
+            self._dirty = True
+            if event.kind == ChangeEvent.PERIOD_CLOSED:
+                self._changed_all = True
+            elif event.kind == ChangeEvent.DATA_RELOADED:
+                self._changed.update(event.value or ())
+            self._changed.update(name for name in (event.category, event.old_category) if name)
+
+    def _take_snapshot(self):
+        """Build a Snapshot of the manager, sharing unchanged expense lists with the previous one.
+
+        Returns the previous snapshot itself, and its cached responses, if nothing changed.
+        """
+        previous = self.snapshot
+        # Listeners run under the manager's write lock, so no change slips in while it is read
+        with self.m.read_lock:
+            with self._changes_lock:
+                if not self._dirty and previous is not None:
+                    return previous
+                changed, self._changed = self._changed, set()
+                changed_all, self._changed_all = self._changed_all, False
+                self._dirty = False
+            expenses = {}
+            categories = []
+            for c in self.m.get_categories():
+                name = c["name"]
+                if name in expenses:
+                    continue
+                if changed_all or name in changed or previous is None or name not in previous.expenses:
+                    expenses[name] = c["sub"].copy()
+                else:
+                    expenses[name] = previous.expenses[name]
+                categories.append(self.m.get_category_summary(name))
+            snapshot = Snapshot(
+                previous.version + 1 if previous else 1, self.m.get_monthly_income(), self.m.get_summary(),
+                categories, expenses
+            )
+        if previous is not None:
+            snapshot.inherit(previous)
+        return snapshot
+
+    # Writes
+    async def submit(self, function, *args):
+        """Queue a manager call for the writer task and return its result."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((function, args, future))
+        return await future
+
+    def _apply(self, calls):
+        """Run queued calls in order on the worker thread, then take a snapshot."""
+        results = []
+        for function, args in calls:
+            try:
+                results.append((function(*args), None))
+            except Exception as e:
+                results.append((None, e))
+        return results, self._take_snapshot()
+
+    async def _writer(self):
+        """Drain the write queue, applying everything queued so far in one round."""
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._queue.get()]
+            while not self._queue.empty():
+                items.append(self._queue.get_nowait())
+            try:
+                results, snapshot = await loop.run_in_executor(
+                    self._executor, self._apply, [(function, args) for function, args, _ in items]
+                )
+            except Exception as e:
+                results, snapshot = [(None, e)] * len(items), None
+            if snapshot is not None:
+                self.snapshot = snapshot
+            for (_, _, future), (result, error) in zip(items, results):
+                if future.done():
+                    continue
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+
+    async def _poll(self):
+        """Merge changes other processes saved to the data files."""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.submit(self.m.reload_if_changed)
+            except Exception as e:
+                print(f"Error reloading data: {e}")
+
+    # Routing
+    def _read(self, parts):
+        """Return (cache key, builder) of a GET resource."""
+        snapshot = self.snapshot
+        if parts == ["summary"]:
+            return "summary", lambda: snapshot.summary
+        if parts == ["income"]:
+            return "income", lambda: {"monthly_income": snapshot.income}
+        if parts == ["categories"]:
+            return "categories", lambda: snapshot.categories
+        if len(parts) == 2 and parts[0] == "categories":
+            summary = snapshot.category(parts[1])
+            return ("category", parts[1]), lambda: dict(summary, expenses=snapshot.expenses[parts[1]])
+        if len(parts) == 3 and parts[0] == "categories" and parts[2] == "expenses":
+            snapshot.category(parts[1])
+            return ("expenses", parts[1]), lambda: snapshot.expenses[parts[1]]
+        raise HttpError(404, "Not found")
+
+    def _write(self, method, parts, body):
+        """Return (status, manager method, args) of a write request."""
+        m = self.m
+        if parts == ["income"] and method == "PUT":
+            return 200, m.set_monthly_income, (_number(body, "monthly_income"),)
+        if parts == ["categories"] and method == "POST":
+            return 201, m.add_category, (_text(body, "name"), _number(body, "percentage"))
+        if len(parts) == 2 and parts[0] == "categories":
+            current = self.snapshot.category(parts[1])
+            if method == "PUT":
+                name = _text(body, "name") if "name" in body else parts[1]
+                percentage = _number(body, "percentage") if "percentage" in body else current["percentage"]
+                return 200, m.update_category, (parts[1], name, percentage)
+            if method == "DELETE":
+                return 200, m.delete_category, (parts[1],)
+        if len(parts) >= 3 and parts[0] == "categories" and parts[2] == "expenses":
+            self.snapshot.category(parts[1])
+            if len(parts) == 3 and method == "POST":
+                return 201, m.add_expense, (parts[1], _text(body, "name"), _number(body, "amount"), body.get("date"))
+            if len(parts) == 4 and method == "PUT":
+                name = _text(body, "name") if "name" in body else parts[3]
+                return 200, m.update_expense, (parts[1], parts[3], name, _number(body, "amount"))
+            if len(parts) == 4 and method == "DELETE":
+                return 200, m.delete_expense, (parts[1], parts[3])
+        raise HttpError(405, "Method not allowed")
+
+    async def _dispatch(self, method, target, headers, body):
+        """Answer one request; return (status, extra headers, body bytes)."""
+        parts = [unquote(part) for part in urlsplit(target).path.split("/") if part]
+        if not parts or parts[0] != "api":
+            raise HttpError(404, "Not found")
+        parts = parts[1:]
+
+        if method in ("GET", "HEAD"):
+            key, build = self._read(parts)
+            etag, payload = self.snapshot.response(key, build, self.codec)
+            cache = [("ETag", etag), ("Cache-Control", "no-cache")]
+            if etag in (tag.strip() for tag in headers.get("if-none-match", "").split(",")):
+                return 304, cache, b""
+            return 200, cache, payload
+
+        try:
+            data = self.codec.loads(body) if body else {}
+        except Exception:
+            raise HttpError(400, "Invalid JSON body")
+        if not isinstance(data, dict):
+            raise HttpError(400, "Invalid JSON body")
+        status, function, args = self._write(method, parts, data)
+        try:
+            saved = await self.submit(function, *args)
+        except ValueError as e:
+            raise HttpError(400, str(e))
+        return status, [], self.codec.dumps({"saved": bool(saved), "version": self.snapshot.version})
+
+    # HTTP
+    async def _handle(self, reader, writer):
+        """Serve requests on one connection until the client closes it."""
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, target, version, headers, body = request
+                try:
+                    status, extra, payload = await self._dispatch(method, target, headers, body)
+                except HttpError as e:
+                    status, extra, payload = e.status, [], self.codec.dumps({"error": str(e)})
+                except Exception as e:
+                    print(f"Error serving {method} {target}: {e}")
+                    status, extra, payload = 500, [], self.codec.dumps({"error": str(e)})
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+                _respond(writer, status, extra, payload, keep_alive, send_body=method != "HEAD")
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except HttpError as e:
+            _respond(writer, e.status, [], self.codec.dumps({"error": str(e)}), False)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def start(self, host, port):
+        """Take the first snapshot and start listening."""
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self.snapshot = await loop.run_in_executor(self._executor, self._take_snapshot)
+        self._tasks = [asyncio.create_task(self._writer()), asyncio.create_task(self._poll())]
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server
+
+    async def close(self):
+        """Stop listening and stop the writer; the manager is left open."""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._executor.shutdown(wait=True)
+        self.m.unsubscribe(self._on_change)
+
+
+def _text(body, key):
+    """Return a required string field of a request body."""
+    value = body.get(key)
+    if not isinstance(value, str):
+        raise HttpError(400, f"Field '{key}' must be a string")
+    return value
+
+
+def _number(body, key):
+    """Return a required numeric field of a request body."""
+    value = body.get(key)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise HttpError(400, f"Field '{key}' must be a number")
+    return float(value)
+
+
+async def _read_request(reader):
+    """Read one request as (method, target, version, headers, body), or None at end of stream."""
+    try:
+        line = await reader.readline()
+        if not line.strip():
+            return None
+        method, target, version = line.decode("latin-1").split()
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if len(headers) >= MAX_HEADERS:
+                raise HttpError(400, "Too many headers")
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+    except (ValueError, UnicodeDecodeError):
+        raise HttpError(400, "Malformed request")
+    if "transfer-encoding" in headers:
+        raise HttpError(501, "Transfer-Encoding is not supported")
+    if length > MAX_BODY:
+        raise HttpError(413, "Request body too large")
+    body = await reader.readexactly(length) if length > 0 else b""
+    return method.upper(), target, version.upper(), headers, body
+
+
+def _respond(writer, status, extra, payload, keep_alive, send_body=True):
+    """Write a complete response (JSON body unless it is a 304)."""
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+    if status != 304:
+        lines.append("Content-Type: application/json; charset=utf-8")
+        lines.append(f"Content-Length: {len(payload)}")
+    lines.extend(f"{name}: {value}" for name, value in extra)
+    lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+    head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+    writer.write(head + payload if send_body and status != 304 else head)
+
+
+async def serve(manager, host, port, codec="auto"):
+    """Serve the manager until cancelled or terminated."""
+    server = BudgetServer(manager, codec)
+    listener = await server.start(host, port)
+    for sock in listener.sockets:
+        address = sock.getsockname()
+        print(f"Serving the budget API on http://{address[0]}:{address[1]}/api/")
+    stop = asyncio.Event()
+    try:
+        # Stop cleanly (flushing pending saves) when a service manager asks
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+    except (NotImplementedError, AttributeError):
+        pass
+    try:
+        await stop.wait()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    """Run the API server with the data configured in settings."""
+    from config import settings
+    from core.startup import open_budget
+
+    parser = argparse.ArgumentParser(prog="app.py --serve", description="Serve the budget as a REST/JSON API.")
+    parser.add_argument("--host", default=settings.SERVER_HOST, help=f"address to bind (default {settings.SERVER_HOST})")
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT, help=f"port (default {settings.SERVER_PORT})")
+    args = parser.parse_args(argv)
+
+    # The categorizer follows categories renamed or deleted through the API
+    manager, _ = open_budget()
+    try:
+        asyncio.run(serve(manager, args.host, args.port, settings.JSON_CODEC))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        manager.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
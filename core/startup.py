@@ -0,0 +1,130 @@
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    """Record how long each startup phase takes and print a breakdown.
+
+    Disabled by default, in which case phases cost almost nothing. Phases
+    may run on any thread; overlapping ones show up as such in the report.
+    """
+
+    def __init__(self):
+        """Initialize a disabled profiler."""
+        self.enabled = False
+        self.origin = time.perf_counter()
+        self._phases = []
+        self._lock = threading.Lock()
+        self._reported = False
+
+    def start(self, origin=None):
+        """Enable the profiler, counting time from origin (a perf_counter value)."""
+        self.enabled = True
+        if origin is not None:
+            self.origin = origin
+
+    @contextmanager
+    def phase(self, name):
+        """Time the enclosed block as a named phase."""
+        if not self.enabled:
+            yield
+            return
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, begin, time.perf_counter())
+
+    def record(self, name, begin, end):
+        """Add a phase measured elsewhere (perf_counter values)."""
+        if self.enabled:
+            with self._lock:
+                self._phases.append((begin, end, name, threading.current_thread().name))
+
+    def report(self, file=None):
+        """Print the phases in start order, once."""
+        if not self.enabled or self._reported:
+            return
+        self._reported = True
+        file = file or sys.stdout
+        with self._lock:
+            phases = sorted(self._phases)
+        total = max((end for _, end, _, _ in phases), default=self.origin) - self.origin
+        print("Startup profile (ms since launch):", file=file)
+        print(f"{'start':>9} {'duration':>9}  phase", file=file)
+        for begin, end, name, thread in phases:
+            where = "" if thread == "MainThread" else f"  [{thread}]"
+            print(f"{(begin - self.origin) * 1000:9.1f} {(end - begin) * 1000:9.1f}  {name}{where}", file=file)
+        print(f"{'':>9} {total * 1000:9.1f}  total until first frame", file=file)
+        file.flush()
+
+
+# Shared by app.py and the windows it builds
+profiler = StartupProfiler()
+
+
+class BackgroundCall(threading.Thread):
+    """Run a function on a daemon thread and hand its result (or error) to get()."""
+
+    def __init__(self, name, function, *args, **kwargs):
+        """Start running function(*args, **kwargs) right away."""
+        super().__init__(name=name, daemon=True)
+        self._call = (function, args, kwargs)
+        self._result = None
+        self._error = None
+        self.start()
+
+    def run(self):
+        """Call the function, keeping its result or exception."""
+        function, args, kwargs = self._call
+        try:
+            with profiler.phase(self.name):
+                self._result = function(*args, **kwargs)
+        except BaseException as e:
+            self._error = e
+
+    def get(self):
+        """Wait for the call to finish and return its result, re-raising its error."""
+        self.join()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+def open_manager(async_save=None, data_file=None, codec=None):
+    """Open the BudgetManager configured in settings (no Qt needed).
+
+    async_save overrides settings.ASYNC_SAVE when given. data_file opens
+    another data file, with its periods folder next to it, and codec
+    replaces the JSON codec of the backends that take one.
+    """
+    from config import settings
+    from core.budget_manager import BudgetManager
+
+    options = dict(settings.STORAGE_OPTIONS.get(settings.STORAGE_BACKEND, {}))
+    if codec is not None and "codec" in options:
+        options["codec"] = codec
+    with profiler.phase("open budget data"):
+        return BudgetManager(
+            str(data_file or settings.DATA_FILE),
+            backend=settings.STORAGE_BACKEND,
+            async_save=settings.ASYNC_SAVE if async_save is None else async_save,
+            save_delay=settings.SAVE_DEBOUNCE_MS / 1000.0,
+            periods_dir=None if data_file else str(settings.PERIODS_DIR),
+            period_cache_size=settings.PERIOD_CACHE_SIZE,
+            **options
+        )
+
+
+def open_budget():
+    """Open the BudgetManager and Categorizer configured in settings (no Qt needed)."""
+    from config import settings
+    from core.categorizer import Categorizer
+
+    manager = open_manager()
+    with profiler.phase("load categorization rules"):
+        categorizer = Categorizer(settings.RULES_FILE, codec=settings.JSON_CODEC)
+    categorizer.follow(manager)
+    return manager, categorizer
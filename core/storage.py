@@ -0,0 +1,745 @@
+import glob
+import os
+import threading
+import time
+import zlib
+from core.codec import get_codec
+from core.events import ChangeEvent, apply_event
+
+
+class Storage:
+    """Base class for storage backends.
+
+    Saving happens in two phases so it can run off the GUI thread:
+    ``prepare`` takes a consistent snapshot of the data (called while the
+    manager is locked) and ``write`` performs the disk I/O (called unlocked).
+    ``lock`` is the FileLock the owner holds while it reads or writes the
+    files (see BudgetManager); work a backend does on its own threads takes
+    it too.
+    """
+
+    lock = None
+
+    def load(self):
+        """Load and return the budget document."""
+        raise NotImplementedError
+
+    def prepare(self, data, events=()):
+        """Return a payload capturing what write() needs to persist."""
+        raise NotImplementedError
+
+    def write(self, payload):
+        """Persist a payload from prepare(), raising on failure."""
+        raise NotImplementedError
+
+    def save(self, data, events=()):
+        """Prepare and write in one step, returning True on success."""
+        try:
+            self.write(self.prepare(data, events))
+            return True
+        except Exception:
+            return False
+
+    def paths(self):
+        """Return the files holding the data, for change detection and file watchers."""
+        return []
+
+    def changed_on_disk(self):
+        """Return True if the files differ from what this storage last read or wrote.
+
+        Called once their stat has changed, to tell edits by another process
+        from a touch or a rewrite with the same content.
+        """
+        return True
+
+    def close(self):
+        """Release resources held by the storage."""
+
+
+def fsync_dir(path):
+    """Flush a directory entry to disk so a rename survives a crash (POSIX only)."""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        # Directories cannot be opened on Windows; NTFS renames are journaled anyway
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_atomic(path, payload, backup_path=None):
+    """Durably write bytes to a temporary file and rename it over path.
+
+    If backup_path is given, the current file is moved there before the
+    new one takes its place.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    if backup_path and os.path.exists(path):
+        os.replace(path, backup_path)
+    os.replace(tmp_path, path)
+    fsync_dir(path)
+
+
+class JsonStorage(Storage):
+    """Store the whole budget document in a single JSON file.
+
+    Every write is atomic and fsynced. The previous ``backups`` versions are kept
+    next to the data file as ``<name>.<generation>.<crc32>.bak``; when the data
+    file is unreadable, the newest backup whose bytes match the CRC in its name
+    is loaded instead, so only one backup is ever parsed.
+    """
+
+    def __init__(self, path, backups=5, codec="auto", compact=True):
+        """Initialize JsonStorage with the data file path, backup count and JSON codec.
+
+        codec is "auto" (fastest installed), "orjson", "ujson" or "json".
+        compact writes without indentation; either layout loads the same way.
+        """
+        self.path = str(path)
+        self.backups = backups
+        self.codec = get_codec(codec)
+        self.compact = compact
+        # CRC of the bytes currently in the data file, None if unknown or corrupt
+        self._current_crc = None
+        self._generation = max((gen for gen, _, _ in self._list_backups()), default=0)
+
+    @staticmethod
+    def _read_file(path):
+        """Return the raw bytes of a file."""
+        with open(path, "rb") as f:
+            return f.read()
+
+    def _parse(self, raw):
+        """Parse a JSON document from bytes."""
+        data = self.codec.loads(raw)
+        if not isinstance(data, dict):
+            raise ValueError("Data file does not contain a JSON object.")
+        return data
+
+    def _list_backups(self):
+        """Return (generation, crc, path) for every backup, newest first."""
+        backups = []
+        for path in glob.glob(glob.escape(self.path) + ".*.bak"):
+            parts = path[len(self.path) + 1:].split(".")
+            try:
+                backups.append((int(parts[0]), int(parts[1], 16), path))
+            except (ValueError, IndexError):
+                continue
+        return sorted(backups, reverse=True)
+
+    def load(self):
+        """Load the document, recovering from the newest valid backup if needed."""
+        if not os.path.exists(self.path):
+            return self._recover() if self._list_backups() else {}
+        try:
+            raw = self._read_file(self.path)
+            data = self._parse(raw)
+        except Exception as e:
+            print(f"Error reading {self.path}: {e}")
+            # Keep the damaged file for inspection instead of overwriting it
+            try:
+                os.replace(self.path, f"{self.path}.corrupt-{int(time.time())}")
+            except OSError:
+                pass
+            return self._recover()
+        self._current_crc = zlib.crc32(raw)
+        return data
+
+    def paths(self):
+        """Return the data file."""
+        return [self.path]
+
+    def changed_on_disk(self):
+        """Compare the CRC of the data file with the one last read or written."""
+        try:
+            return zlib.crc32(self._read_file(self.path)) != self._current_crc
+        except OSError:
+            return self._current_crc is not None
+
+    def _recover(self):
+        """Load the newest backup whose checksum matches, or an empty document."""
+        for _, crc, path in self._list_backups():
+            try:
+                raw = self._read_file(path)
+                if zlib.crc32(raw) != crc:
+                    continue
+                data = self._parse(raw)
+            except Exception:
+                continue
+            print(f"Recovered budget data from {path}")
+            return data
+        return {}
+
+    def prepare(self, data, events=()):
+        """Serialize the whole document."""
+        return self.codec.dumps(data, pretty=not self.compact)
+
+    def write(self, payload):
+        """Atomically replace the data file, rotating the previous one into the backups."""
+        backup_path = None
+        if self.backups and self._current_crc is not None:
+            self._generation += 1
+            backup_path = f"{self.path}.{self._generation:06d}.{self._current_crc:08x}.bak"
+        write_atomic(self.path, payload, backup_path)
+        self._current_crc = zlib.crc32(payload)
+        for _, _, path in self._list_backups()[self.backups:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class JournalStorage(JsonStorage):
+    """Snapshot file plus an append-only journal of change events.
+
+    Each mutation appends one compact JSON line to ``<path>.journal``. Once the
+    journal grows past ``max_records`` lines or ``max_bytes`` bytes it is rotated
+    to ``<path>.journal.old`` and a background thread folds it into the snapshot.
+    Loading reads the snapshot and replays any journal records newer than it.
+    """
+
+    SEQ_KEY = "_journal_seq"
+
+    def __init__(self, path, max_records=1000, max_bytes=1024 * 1024, backups=5, codec="auto", compact=True):
+        """Initialize JournalStorage with snapshot path and compaction thresholds."""
+        super().__init__(path, backups, codec, compact)
+        self.journal_path = self.path + ".journal"
+        self.rotated_path = self.path + ".journal.old"
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self._seq = 0
+        self._records = 0
+        self._bytes = 0
+        self._journal = None
+        self._compactor = None
+        # Stands in for the owner's FileLock when the storage is used on its own
+        self._local_lock = threading.RLock()
+
+    def _files_lock(self):
+        """Return the lock serializing compaction with loads and change checks."""
+        return self.lock if self.lock is not None else self._local_lock
+
+    def load(self):
+        """Load the snapshot and replay pending journal records."""
+        # A compaction holds the lock until the new snapshot is in place and
+        # the rotated journal is gone, so both are read from the same state
+        with self._files_lock():
+            if self._journal:
+                # Another process may have rotated the journal; appends go to the current file
+                self._journal.close()
+                self._journal = None
+            data = super().load()
+            snapshot_seq = data.pop(self.SEQ_KEY, 0)
+            self._seq = snapshot_seq
+            self._records = 0
+            self._bytes = 0
+            for path in (self.rotated_path, self.journal_path):
+                for seq, event, end in self._read_journal(path):
+                    if path == self.journal_path:
+                        self._records += 1
+                        self._bytes = end
+                    if seq <= snapshot_seq:
+                        continue
+                    try:
+                        apply_event(data, event)
+                    except Exception as e:
+                        print(f"Error replaying journal record {seq}: {e}")
+                    self._seq = max(self._seq, seq)
+
+            # Drop a torn trailing record so new appends start on a clean line
+            if os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) > self._bytes:
+                with open(self.journal_path, "r+b") as f:
+                    f.truncate(self._bytes)
+            return data
+
+    def paths(self):
+        """Return the snapshot and the journal."""
+        return [self.path, self.journal_path]
+
+    def changed_on_disk(self):
+        """Compare the snapshot CRC and the journal size with the ones last read or written."""
+        with self._files_lock():
+            try:
+                size = os.path.getsize(self.journal_path)
+            except OSError:
+                size = 0
+            return size != self._bytes or super().changed_on_disk()
+
+    def _read_journal(self, path):
+        """Yield (seq, ChangeEvent, end offset) tuples, stopping at the first torn record."""
+        if not os.path.exists(path):
+            return
+        offset = 0
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete record")
+                    record = self.codec.loads(line)
+                    seq = record.pop("seq")
+                    event = ChangeEvent.from_dict(record)
+                except Exception:
+                    # A partially written last line means the app stopped mid-append
+                    return
+                offset += len(line)
+                yield seq, event, offset
+
+    def prepare(self, data, events=()):
+        """Encode the events as numbered journal lines."""
+        lines = []
+        for event in events:
+            self._seq += 1
+            record = event.to_dict()
+            record["seq"] = self._seq
+            lines.append(self.codec.dumps(record) + b"\n")
+        return len(lines), b"".join(lines)
+
+    def write(self, payload):
+        """Append encoded records to the journal, compacting when it grows too large."""
+        count, chunk = payload
+        if not count:
+            return
+        if self._journal is None:
+            self._journal = open(self.journal_path, "ab")
+        self._journal.write(chunk)
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._records += count
+        self._bytes += len(chunk)
+
+        if self._records >= self.max_records or self._bytes >= self.max_bytes:
+            self._start_compaction()
+
+    def _start_compaction(self):
+        """Rotate the journal and fold it into the snapshot on a background thread."""
+        if self._compactor and self._compactor.is_alive():
+            return
+        # If an earlier compaction left its rotated journal behind, retry that one first
+        if not os.path.exists(self.rotated_path):
+            self._journal.close()
+            self._journal = None
+            os.replace(self.journal_path, self.rotated_path)
+            self._records = 0
+            self._bytes = 0
+        self._compactor = threading.Thread(target=self._compact, name="journal-compactor", daemon=True)
+        self._compactor.start()
+
+    def _compact(self):
+        """Write a new snapshot from the old snapshot plus the rotated journal.
+
+        Runs holding the files lock, so no process reads the new snapshot
+        with the rotated journal still pending, or the old one once it is
+        gone, and the snapshot CRC changes under the lock readers take.
+        """
+        try:
+            with self._files_lock():
+                if not os.path.exists(self.rotated_path):
+                    # Another process compacted it while this one waited for the lock
+                    return
+                data = JsonStorage.load(self)
+                seq = data.pop(self.SEQ_KEY, 0)
+                for record_seq, event, _ in self._read_journal(self.rotated_path):
+                    if record_seq > seq:
+                        apply_event(data, event)
+                        seq = record_seq
+                data[self.SEQ_KEY] = seq
+                JsonStorage.write(self, JsonStorage.prepare(self, data))
+                os.remove(self.rotated_path)
+        except Exception as e:
+            print(f"Error compacting journal: {e}")
+
+    def close(self):
+        """Wait for a running compaction and close the journal file."""
+        if self._compactor:
+            self._compactor.join()
+        if self._journal:
+            self._journal.close()
+            self._journal = None
+
+
+class SqliteStorage(Storage):
+    """Store categories, expenses and income in indexed SQLite tables.
+
+    The database lives next to the JSON file (``data.json`` -> ``data.db``). Every
+    change event is applied as its own transaction with indexed lookups, so a
+    mutation costs O(log n) regardless of ledger size. An existing data.json is
+    imported the first time the database is created.
+
+    Like the other backends, load() builds the whole document of the open
+    period in memory; earlier months are moved to the period files when the
+    month closes and are only read on demand (see core.periods).
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value
+        );
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            percentage REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS expenses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category_id INTEGER NOT NULL REFERENCES categories(id) ON DELETE CASCADE,
+            name TEXT NOT NULL,
+            amount REAL NOT NULL,
+            date TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_categories_name ON categories(name);
+        CREATE INDEX IF NOT EXISTS idx_expenses_category_name ON expenses(category_id, name);
+    """
+
+    def __init__(self, path):
+        """Initialize SqliteStorage, creating the schema if needed."""
+        self.json_path = str(path)
+        root, _ = os.path.splitext(self.json_path)
+        self.path = root + ".db"
+        is_new = not os.path.exists(self.path)
+        import sqlite3
+
+        # Writes may come from the background writer thread; they are never concurrent
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(self.SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(expenses)")}
+        if "date" not in columns:
+            # Databases created before expenses carried dates
+            self.conn.execute("ALTER TABLE expenses ADD COLUMN date TEXT")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses(date)")
+        # Changes whenever another connection commits (see changed_on_disk)
+        self._data_version = None
+        if is_new and os.path.exists(self.json_path):
+            self._import(JsonStorage(self.json_path).load())
+
+    def load(self):
+        """Build the budget document of the open period from the tables."""
+        self._data_version = self._get_data_version()
+        data = {"categories": []}
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'monthly_income'").fetchone()
+        if row is not None:
+            data["monthly_income"] = float(row[0])
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'period'").fetchone()
+        if row is not None:
+            data["period"] = row[0]
+        # Rows of closed months are deleted when they are archived; databases
+        # written before periods existed have no period yet and load whole
+        since = data.get("period", "")
+
+        by_id = {}
+        for cat_id, name, percentage in self.conn.execute(
+                "SELECT id, name, percentage FROM categories ORDER BY id"):
+            category = {"name": name, "percentage": percentage, "sub": []}
+            by_id[cat_id] = category
+            data["categories"].append(category)
+        for cat_id, name, amount, date in self.conn.execute(
+                "SELECT category_id, name, amount, date FROM expenses"
+                " WHERE date IS NULL OR date >= ? ORDER BY id", (since,)):
+            if cat_id in by_id:
+                expense = {"name": name, "amount": amount}
+                if date:
+                    expense["date"] = date
+                by_id[cat_id]["sub"].append(expense)
+        return data
+
+    def _get_data_version(self):
+        """Return SQLite's counter of commits made by other connections."""
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def paths(self):
+        """Return the database and its write-ahead log."""
+        return [self.path, self.path + "-wal"]
+
+    def changed_on_disk(self):
+        """Return True if another connection committed since the tables were last read."""
+        return self._get_data_version() != self._data_version
+
+    def prepare(self, data, events=()):
+        """Keep the events, or a copy of the whole document when there are none."""
+        if events:
+            return "events", list(events)
+        import copy
+        return "import", copy.deepcopy(data)
+
+    def write(self, payload):
+        """Apply each event in its own transaction, or rewrite all tables."""
+        kind, value = payload
+        if kind == "import":
+            self._import(value)
+            return
+        for event in value:
+            with self.conn:
+                self._apply(event)
+
+    def _import(self, data):
+        """Replace the table contents with a whole document in one transaction."""
+        with self.conn:
+            self.conn.execute("DELETE FROM expenses")
+            self.conn.execute("DELETE FROM categories")
+            self.conn.execute("DELETE FROM meta")
+            if "monthly_income" in data:
+                self._set_meta("monthly_income", float(data["monthly_income"]))
+            if "period" in data:
+                self._set_meta("period", data["period"])
+            for c in data.get("categories", []):
+                cur = self.conn.execute(
+                    "INSERT INTO categories (name, percentage) VALUES (?, ?)",
+                    (c["name"], float(c["percentage"]))
+                )
+                self.conn.executemany(
+                    "INSERT INTO expenses (category_id, name, amount, date) VALUES (?, ?, ?, ?)",
+                    [(cur.lastrowid, s["name"], float(s["amount"]), s.get("date")) for s in c.get("sub", [])]
+                )
+
+    def _set_meta(self, key, value):
+        """Insert or replace a meta value."""
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _category_id(self, name):
+        """Return the id of the first category with the given name, or None."""
+        row = self.conn.execute(
+            "SELECT id FROM categories WHERE name = ? ORDER BY id LIMIT 1", (name,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _apply(self, event):
+        """Translate a ChangeEvent into indexed SQL statements."""
+        kind = event.kind
+        if kind == ChangeEvent.INCOME_CHANGED:
+            self._set_meta("monthly_income", float(event.value))
+        elif kind == ChangeEvent.CATEGORY_ADDED:
+            self.conn.execute(
+                "INSERT INTO categories (name, percentage) VALUES (?, ?)", (event.category, float(event.value))
+            )
+        elif kind == ChangeEvent.CATEGORY_UPDATED:
+            self.conn.execute(
+                "UPDATE categories SET name = ?, percentage = ? WHERE id = ?",
+                (event.category, float(event.value), self._category_id(event.old_category))
+            )
+        elif kind == ChangeEvent.CATEGORY_DELETED:
+            self.conn.execute("DELETE FROM categories WHERE name = ?", (event.category,))
+        elif kind == ChangeEvent.EXPENSE_ADDED:
+            self.conn.execute(
+                "INSERT INTO expenses (category_id, name, amount, date) VALUES (?, ?, ?, ?)",
+                (self._category_id(event.category), event.expense, float(event.value), event.date)
+            )
+        elif kind == ChangeEvent.EXPENSE_UPDATED:
+            self.conn.execute(
+                "UPDATE expenses SET name = ?, amount = ? WHERE id = ("
+                " SELECT id FROM expenses WHERE category_id = ? AND name = ? ORDER BY id LIMIT 1)",
+                (event.expense, float(event.value), self._category_id(event.category), event.old_expense)
+            )
+        elif kind == ChangeEvent.EXPENSE_DELETED:
+            self.conn.execute(
+                "DELETE FROM expenses WHERE category_id = ? AND name = ?",
+                (self._category_id(event.category), event.expense)
+            )
+        elif kind == ChangeEvent.PERIOD_CLOSED:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'period'").fetchone()
+            old = row[0] if row else event.value
+            self.conn.execute(
+                "DELETE FROM expenses WHERE COALESCE(substr(date, 1, 7), ?) < ?", (old, event.value)
+            )
+            self._set_meta("period", event.value)
+        else:
+            raise ValueError(f"Unknown change event: {kind}")
+
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+
+
+class ChangeMonitor:
+    """Tell changes other processes made to the storage files from this process's own.
+
+    mark() records the stat (mtime, size, inode) of the files after they
+    were read or written here. changed() stats them again, and only when
+    that differs asks the storage to compare their content, so polling it
+    is cheap. ``lock`` is the FileLock held while reading or writing them.
+    """
+
+    def __init__(self, storage, lock):
+        """Initialize ChangeMonitor for a storage backend and its FileLock."""
+        self.storage = storage
+        self.lock = lock
+        self._signature = None
+
+    def _stat(self):
+        """Return the current signature of the storage files."""
+        signature = []
+        for path in self.storage.paths():
+            try:
+                st = os.stat(path)
+                signature.append((st.st_mtime_ns, st.st_size, st.st_ino))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def mark(self):
+        """Remember the files as they are now, after reading or writing them."""
+        self._signature = self._stat()
+
+    def changed(self):
+        """Return True if another process changed the files since mark()."""
+        signature = self._stat()
+        if signature == self._signature:
+            return False
+        if self.storage.changed_on_disk():
+            return True
+        # Touched, or rewritten with the same content (e.g. by a journal compaction)
+        self._signature = signature
+        return False
+
+
+class BackgroundWriter:
+    """Debounce save requests and write them on a worker thread.
+
+    ``submit`` only records the events and returns. Once no new request has
+    arrived for ``delay`` seconds, the worker takes ``lock``, asks the storage to
+    prepare a snapshot of ``get_data()``, releases the lock and writes it.
+    ``on_done(ok, error)`` is called from the worker thread after each write.
+
+    With a ChangeMonitor, its file lock is held from the snapshot until the
+    write is done. If another process changed the files in the meantime,
+    ``refresh()`` is called first (outside ``lock``) to merge their changes
+    with the ones still to write (see unwritten()).
+    """
+
+    def __init__(self, storage, lock, get_data, delay=0.3, on_done=None, monitor=None, refresh=None):
+        """Initialize the writer and start its thread."""
+        self.storage = storage
+        self.lock = lock
+        self.get_data = get_data
+        self.delay = delay
+        self.on_done = on_done
+        self.monitor = monitor
+        self.refresh = refresh
+        self._cond = threading.Condition()
+        self._events = []
+        # Events taken by the write in progress
+        self._writing = []
+        self._dirty = False
+        self._busy = False
+        self._flush_now = False
+        self._closing = False
+        self._last_submit = 0.0
+        self._thread = threading.Thread(target=self._run, name="budget-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, events=()):
+        """Schedule a save covering the given events."""
+        with self._cond:
+            self._events.extend(events)
+            self._dirty = True
+            self._last_submit = time.monotonic()
+            self._cond.notify_all()
+
+    def unwritten(self):
+        """Return the submitted events not yet on disk, oldest first."""
+        with self._cond:
+            return self._writing + self._events
+
+    def flush(self):
+        """Write pending changes now and wait until they are on disk."""
+        with self._cond:
+            self._flush_now = True
+            self._cond.notify_all()
+            while self._dirty or self._busy:
+                self._cond.wait()
+
+    def close(self):
+        """Flush pending changes and stop the worker thread."""
+        self.flush()
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        """Worker loop: wait for requests, debounce, then write."""
+        while True:
+            with self._cond:
+                while not self._dirty and not self._closing:
+                    self._cond.wait()
+                if not self._dirty:
+                    return
+                # Keep waiting while requests keep arriving within the delay
+                while not self._flush_now and not self._closing:
+                    remaining = self._last_submit + self.delay - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                events, self._events = self._events, []
+                self._writing = events
+                self._dirty = False
+                self._flush_now = False
+                self._busy = True
+
+            ok, error = True, ""
+            try:
+                payload = self._prepare(events)
+                try:
+                    self.storage.write(payload)
+                    if self.monitor:
+                        self.monitor.mark()
+                finally:
+                    if self.monitor:
+                        self.monitor.lock.release()
+            except Exception as e:
+                ok, error = False, str(e)
+
+            with self._cond:
+                if not ok:
+                    # Keep the events so the next save retries them
+                    self._events[:0] = events
+                self._writing = []
+                self._busy = False
+                self._cond.notify_all()
+            if self.on_done:
+                try:
+                    self.on_done(ok, error)
+                except Exception as e:
+                    print(f"Error in save callback: {e}")
+
+    def _prepare(self, events):
+        """Snapshot the data to write; with a monitor, return holding its file lock."""
+        while True:
+            with self.lock:
+                if self.monitor is None:
+                    return self.storage.prepare(self.get_data(), events)
+                self.monitor.lock.acquire()
+                try:
+                    if not self.monitor.changed():
+                        return self.storage.prepare(self.get_data(), events)
+                except BaseException:
+                    self.monitor.lock.release()
+                    raise
+                self.monitor.lock.release()
+            # Merge what the other process wrote, then snapshot the merged data
+            self.refresh()
+
+
+def open_storage(path, backend="json", **options):
+    """Create the storage engine registered under the given backend name."""
+    backends = {
+        "json": JsonStorage,
+        "journal": JournalStorage,
+        "sqlite": SqliteStorage,
+    }
+    if backend == "ledger":
+        # Imported here because core.ledger builds on this module
+        from core.ledger import LedgerStorage
+
+        backends["ledger"] = LedgerStorage
+    if backend not in backends:
+        raise ValueError(f"Unknown storage backend: {backend}")
+    return backends[backend](path, **options)
@@ -0,0 +1,20 @@
+# Harakat, Quranic marks and tatweel, which do not change the word
+_ARABIC_MARKS = "".join(
+    chr(c) for first, last in ((0x0610, 0x061A), (0x064B, 0x065F), (0x0670, 0x0670), (0x06D6, 0x06ED), (0x0640, 0x0640))
+    for c in range(first, last + 1)
+)
+
+# Letter variants users type interchangeably, plus Arabic-Indic and Persian digits;
+# marks are deleted in the same translate pass
+_ARABIC_LETTERS = str.maketrans(
+    "أإآٱىةؤئ"
+    "٠١٢٣٤٥٦٧٨٩"
+    "۰۱۲۳۴۵۶۷۸۹",
+    "اااايهوي" "0123456789" "0123456789",
+    _ARABIC_MARKS,
+)
+
+
+def normalize_text(text) -> str:
+    """Return text folded for matching: case, Arabic letter variants, marks, digits and spaces."""
+    return " ".join(str(text).casefold().translate(_ARABIC_LETTERS).split())
@@ -1,59 +1,140 @@
-from functools import partial
+import os
+import threading
 from PyQt5.QtWidgets import (
     QWidget, QHBoxLayout, QVBoxLayout, QFrame, QGroupBox, QLineEdit, QPushButton,
-    QScrollArea, QGridLayout, QLabel, QTableWidget, QTableWidgetItem,
-    QAbstractItemView, QHeaderView, QProgressBar, QMessageBox, QSizePolicy
+    QScrollArea, QGridLayout, QLabel, QTableView,
+    QAbstractItemView, QHeaderView, QProgressBar, QMessageBox, QSizePolicy, QFileDialog, QInputDialog
 )
-from PyQt5.QtCore import Qt, QTimer, QPropertyAnimation, QRect, QEasingCurve, pyqtSignal
+from PyQt5.QtCore import Qt, QTimer, QPropertyAnimation, QRect, QEasingCurve, QModelIndex, QEvent, QFileSystemWatcher, pyqtSignal
 from PyQt5.QtGui import QFont
-from ui.dialogs import CategoryDialog, ExpenseDialog
+from ui.table_models import (
+    CategoriesTableModel, ExpensesTableModel, ActionButtonDelegate, COL_AMOUNT, COL_EDIT, COL_DELETE
+)
+from core.events import ChangeEvent
+from core.startup import profiler
 from config import settings
+from ui.styles import read_qss
 
 
 class BudgetWindow(QWidget):
     """Budget Management Interface"""
 
-    # Signal to notify data update
+    # Signal to notify data update (full reload)
     data_updated = pyqtSignal()
+    # Signal waking the GUI thread once the first ChangeEvent of a burst is queued
+    changes_pending = pyqtSignal()
+    # Signal reporting a finished write to disk (ok, error), possibly from the writer thread
+    save_finished = pyqtSignal(bool, str)
+
+    # Bursts with more changes than this (e.g. a batch import) trigger one full reload
+    MAX_PATCHES = 50
 
-    def __init__(self, manager):
+    # Cards are only built for slots within this many pixels of the visible area
+    CARD_OVERSCAN = 400
+    # Placeholder height used until the first real card has been measured
+    CARD_HEIGHT_ESTIMATE = 400
+    # Unbound cards kept for reuse; extra ones are destroyed
+    MAX_SPARE_CARDS = 6
+    # Quiet time after the last data file notification before checking for external changes
+    RELOAD_DELAY_MS = 200
+    # Files are also checked this often: writes through a memory map (ledger backend)
+    # and some network filesystems raise no watcher notification
+    RELOAD_POLL_MS = 2000
+
+    def __init__(self, manager, categorizer=None):
         """Initialize the BudgetWindow."""
         super().__init__()
         self.m = manager
+        # Rules suggesting categories for quick-added and imported expenses
+        self.categorizer = categorizer
         self._is_loading = False
+        # ChangeEvents waiting to be applied; filled from any thread
         self._update_queue = []
+        self._queue_lock = threading.Lock()
         self._toast_label = None
         self._current_selected_table = None
+        # Widget cache of rendered cards keyed by category name (only cards near the viewport)
+        self._cards = {}
+        # One grid slot per category; a slot holds a card or stays an empty placeholder
+        self._slots = []
+        self._slot_cards = []
+        self._spare_cards = []
+        self._card_height = None
+        self._visible_pending = False
+        # {category: expense names} matching the search box, None while it is empty
+        self._search_result = None
+        self._import_worker = None
+        self._export_worker = None
+        # Single delegate painting Edit/Delete cells for every table
+        self._actions = ActionButtonDelegate(self)
+        self._actions.clicked.connect(self._on_action_clicked)
 
         # Connect signals
         self.data_updated.connect(self._safe_reload_ui)
+        self.changes_pending.connect(self._schedule_flush)
+        self.m.subscribe(self._queue_change)
+        self.save_finished.connect(self._on_save_finished)
+        self.m.subscribe_saves(self.save_finished.emit)
+
+        # Hot reload when another instance (or a sync tool) changes the data files
+        self._reload_timer = QTimer(self)
+        self._reload_timer.setSingleShot(True)
+        self._reload_timer.setInterval(self.RELOAD_DELAY_MS)
+        self._reload_timer.timeout.connect(self._check_external_changes)
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self._reload_timer.start)
+        self._watcher.directoryChanged.connect(self._reload_timer.start)
+        self._watch_data_files()
+        self._poll_timer = QTimer(self)
+        self._poll_timer.setInterval(self.RELOAD_POLL_MS)
+        self._poll_timer.timeout.connect(self._check_external_changes)
+        self._poll_timer.start()
 
         self.setLayoutDirection(Qt.RightToLeft)
         self._load_styles()
         self._build_ui()
 
-        # Initial UI load
-        QTimer.singleShot(100, self._initial_load)
+        # Initial UI load, on the first event-loop turn after the window is shown
+        QTimer.singleShot(0, self._initial_load)
 
     def _initial_load(self):
         """Perform safe initial data load."""
         self._is_loading = True
         try:
-            self._reload_all_data()
+            with profiler.phase("first data render"):
+                self._reload_all_data()
         finally:
             self._is_loading = False
+        # Runs after the frame showing the data has been painted
+        QTimer.singleShot(0, profiler.report)
+
+    def _watch_data_files(self):
+        """Watch the data files and their folder.
+
+        Atomic saves replace a file, which drops it from the watcher, so the
+        paths are added again after every notification; the folder reports
+        files that did not exist yet (e.g. a new journal).
+        """
+        paths = self.m.watched_paths()
+        wanted = [p for p in paths if os.path.exists(p)]
+        wanted += sorted({os.path.dirname(os.path.abspath(p)) for p in paths})
+        watched = set(self._watcher.files()) | set(self._watcher.directories())
+        missing = [p for p in wanted if p not in watched and os.path.exists(p)]
+        if missing:
+            self._watcher.addPaths(missing)
+
+    def _check_external_changes(self):
+        """Merge data another process saved; the manager's DATA_RELOADED event reloads the UI."""
+        self._watch_data_files()
+        try:
+            self.m.reload_if_changed()
+        except Exception as e:
+            print(f"Error reloading data: {e}")
 
     def _load_styles(self):
         """Load QSS style files."""
         try:
-            qss_budget = settings.QSS_DIR / "budget.qss"
-            qss_dialogs = settings.QSS_DIR / "dialogs.qss"
-            qss = ""
-            for path in (qss_budget, qss_dialogs):
-                if path.exists():
-                    with open(path, "r", encoding="utf-8") as f:
-                        qss += f.read() + "\n"
-            self.setStyleSheet(qss)
+            self.setStyleSheet(read_qss("budget.qss") + "\n" + read_qss("dialogs.qss"))
         except Exception as e:
             print(f"Error loading styles: {e}")
 
@@ -76,6 +157,9 @@ class BudgetWindow(QWidget):
         layout.addWidget(self._build_income_box())
         layout.addWidget(self._build_categories_box())
         layout.addWidget(self._build_add_category_button())
+        layout.addLayout(self._build_quick_actions())
+        layout.addWidget(self._build_import_box())
+        layout.addWidget(self._build_export_box())
         layout.addStretch(1)
         return frame
 
@@ -119,17 +203,8 @@ class BudgetWindow(QWidget):
         layout = QVBoxLayout(box)
         layout.setSpacing(8)
 
-        self.tbl = QTableWidget(0, 4)
-        self.tbl.setHorizontalHeaderLabels(["اسم الفئة", "المبلغ", "تعديل", "حذف"])
-        self._apply_table_style(self.tbl)
-
-        # Connect table selection event
-        self.tbl.itemSelectionChanged.connect(lambda: self._on_table_selection_changed(self.tbl))
-
-        h = self.tbl.horizontalHeader()
-        h.setSectionResizeMode(0, QHeaderView.Stretch)
-        for i in range(1, 4):
-            h.setSectionResizeMode(i, QHeaderView.ResizeToContents)
+        self.categories_model = CategoriesTableModel(self.m, self)
+        self.tbl = self._create_table_view(self.categories_model)
 
         layout.addWidget(self.tbl)
         return box
@@ -142,11 +217,103 @@ class BudgetWindow(QWidget):
         btn.clicked.connect(self._add_category)
         return btn
 
+    def _build_quick_actions(self):
+        """Create the quick-add expense and categorization rules buttons."""
+        row = QHBoxLayout()
+        row.setSpacing(6)
+        btn_quick = QPushButton("إضافة مصروف سريع")
+        btn_quick.setFixedHeight(36)
+        btn_quick.setObjectName("btnQuickExpense")
+        btn_quick.clicked.connect(self._quick_add_expense)
+        row.addWidget(btn_quick, 1)
+        if self.categorizer is not None:
+            btn_rules = QPushButton("قواعد التصنيف")
+            btn_rules.setFixedHeight(36)
+            btn_rules.setObjectName("btnRules")
+            btn_rules.clicked.connect(self._edit_rules)
+            row.addWidget(btn_rules, 1)
+        return row
+
+    def _build_import_box(self):
+        """Create the statement import button and its progress row."""
+        box = QWidget()
+        layout = QVBoxLayout(box)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(6)
+
+        self.btn_import = QPushButton("استيراد كشف حساب")
+        self.btn_import.setFixedHeight(36)
+        self.btn_import.setObjectName("btnImport")
+        self.btn_import.clicked.connect(self._import_statement)
+        layout.addWidget(self.btn_import)
+
+        self.import_row = QWidget()
+        row = QHBoxLayout(self.import_row)
+        row.setContentsMargins(0, 0, 0, 0)
+        self.import_progress = QProgressBar()
+        self.import_progress.setRange(0, 100)
+        self.import_progress.setAlignment(Qt.AlignCenter)
+        btn_cancel = QPushButton("إلغاء")
+        btn_cancel.setFixedWidth(80)
+        btn_cancel.clicked.connect(self._cancel_import)
+        row.addWidget(self.import_progress, 1)
+        row.addWidget(btn_cancel, 0)
+        self.import_row.hide()
+        layout.addWidget(self.import_row)
+        return box
+
+    def _build_export_box(self):
+        """Create the report export button and its progress row."""
+        box = QWidget()
+        layout = QVBoxLayout(box)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(6)
+
+        self.btn_export = QPushButton("تصدير تقرير")
+        self.btn_export.setFixedHeight(36)
+        self.btn_export.setObjectName("btnExport")
+        self.btn_export.clicked.connect(self._export_report)
+        layout.addWidget(self.btn_export)
+
+        self.export_row = QWidget()
+        row = QHBoxLayout(self.export_row)
+        row.setContentsMargins(0, 0, 0, 0)
+        self.export_progress = QProgressBar()
+        self.export_progress.setRange(0, 100)
+        self.export_progress.setAlignment(Qt.AlignCenter)
+        btn_cancel = QPushButton("إلغاء")
+        btn_cancel.setFixedWidth(80)
+        btn_cancel.clicked.connect(self._cancel_export)
+        row.addWidget(self.export_progress, 1)
+        row.addWidget(btn_cancel, 0)
+        self.export_row.hide()
+        layout.addWidget(self.export_row)
+        return box
+
+    def _build_search_row(self):
+        """Create the expense search box and its no-results hint."""
+        row = QHBoxLayout()
+        row.setSpacing(8)
+        self.search_input = QLineEdit()
+        self.search_input.setObjectName("searchInput")
+        self.search_input.setPlaceholderText("ابحث في المصروفات...")
+        self.search_input.setFixedHeight(36)
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.textChanged.connect(self._apply_search)
+        self.search_empty = QLabel("لا توجد نتائج")
+        self.search_empty.setObjectName("searchEmpty")
+        self.search_empty.hide()
+        row.addWidget(self.search_input, 1)
+        row.addWidget(self.search_empty, 0)
+        return row
+
     def _build_left_panel(self):
         """Create left panel for cards area."""
         frame = QFrame()
         layout = QVBoxLayout(frame)
         layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(8)
+        layout.addLayout(self._build_search_row())
         scroll = QScrollArea()
         scroll.setWidgetResizable(True)
         self.cards_host = QWidget()
@@ -154,21 +321,31 @@ class BudgetWindow(QWidget):
         self.grid.setSpacing(24)
         self.grid.setAlignment(Qt.AlignTop)
         scroll.setWidget(self.cards_host)
+        # Bind cards to the slots that scroll into view
+        scroll.verticalScrollBar().valueChanged.connect(self._schedule_visible_cards)
+        scroll.viewport().installEventFilter(self)
+        self.scroll = scroll
         layout.addWidget(scroll)
         return frame
 
+    def eventFilter(self, obj, event):
+        """Re-check visible cards when the scroll viewport is resized."""
+        if event.type() == QEvent.Resize and obj is self.scroll.viewport():
+            self._schedule_visible_cards()
+        return super().eventFilter(obj, event)
+
     def _on_table_selection_changed(self, current_table):
         """Handle table selection change."""
         if self._current_selected_table and self._current_selected_table != current_table:
             self._current_selected_table.clearSelection()
-            self._current_selected_table.setCurrentItem(None)
+            self._current_selected_table.setCurrentIndex(QModelIndex())
         self._current_selected_table = current_table
 
     def _clear_all_selections(self):
         """Clear selections from all tables."""
         if self._current_selected_table:
             self._current_selected_table.clearSelection()
-            self._current_selected_table.setCurrentItem(None)
+            self._current_selected_table.setCurrentIndex(QModelIndex())
             self._current_selected_table = None
 
     def _reload_all_data(self):
@@ -179,6 +356,7 @@ class BudgetWindow(QWidget):
             self.income_input.setText(f"{income:.2f}")
             self.income_input.blockSignals(False)
             self._render_categories_table()
+            self._search_result = self.m.search_expenses(self.search_input.text())
             self._render_cards()
         except Exception as e:
             print(f"Error loading data: {e}")
@@ -201,7 +379,27 @@ class BudgetWindow(QWidget):
         finally:
             self._is_loading = False
 
-    def _apply_table_style(self, table: QTableWidget, max_visible_rows=6):
+    def _create_table_view(self, model):
+        """Create a styled table view over a model with painted action columns."""
+        table = QTableView()
+        table.setModel(model)
+        self._apply_table_style(table)
+        table.setItemDelegateForColumn(COL_EDIT, self._actions)
+        table.setItemDelegateForColumn(COL_DELETE, self._actions)
+        table.selectionModel().selectionChanged.connect(lambda *_: self._on_table_selection_changed(table))
+        header = table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        # Fixed widths: ResizeToContents asks the model for up to 1000 rows per column on every
+        # relayout, which is slow for long expense lists and stalls the GUI during imports
+        metrics = table.fontMetrics()
+        samples = {COL_AMOUNT: f"0000000 {settings.CURRENCY}", COL_EDIT: "تعديل", COL_DELETE: "حذف"}
+        for col, sample in samples.items():
+            header.setSectionResizeMode(col, QHeaderView.Fixed)
+            text = max(sample, model.HEADERS[col], key=metrics.horizontalAdvance)
+            header.resizeSection(col, metrics.horizontalAdvance(text) + 32)
+        return table
+
+    def _apply_table_style(self, table: QTableView, max_visible_rows=6):
         """Apply consistent style to tables."""
         table.setFocusPolicy(Qt.StrongFocus)
         table.verticalHeader().setVisible(False)
@@ -211,9 +409,12 @@ class BudgetWindow(QWidget):
         table.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
         table.verticalHeader().setDefaultSectionSize(31)
         table.setFocusPolicy(Qt.ClickFocus)
+        # Hover state is needed for the delegate-painted action buttons
+        table.setMouseTracking(True)
+        table.viewport().setAttribute(Qt.WA_Hover, True)
         self._fix_table_height(table, max_visible_rows)
 
-    def _fix_table_height(self, table: QTableWidget, visible_rows=6):
+    def _fix_table_height(self, table: QTableView, visible_rows=6):
         """Fix table height according to visible rows."""
         fixed = table.horizontalHeader().height() + (31 * visible_rows) + 2
         table.setMinimumHeight(fixed)
@@ -232,58 +433,204 @@ class BudgetWindow(QWidget):
             return
         try:
             self.m.set_monthly_income(value)
-            self.data_updated.emit()
             self._show_message("تم حفظ الدخل بنجاح ✅")
         except Exception as e:
             self._show_message(f"خطأ في الحفظ: {str(e)}", success=False)
 
     def _add_category(self):
         """Add new budget category."""
+        from ui.dialogs import CategoryDialog
         try:
-            cats = self.m.get_categories()
-            remaining = max(100 - sum(c["percentage"] for c in cats), 0)
+            remaining = self.m.get_summary()["percentage_remaining"]
             dlg = CategoryDialog(self, title="إضافة فئة", init_perc=remaining)
             if dlg.exec_():
                 name, perc = dlg.get_data()
                 self.m.add_category(name, perc)
-                self.data_updated.emit()
                 self._show_message("تمت إضافة الفئة بنجاح ✅")
         except Exception as e:
             self._show_message(str(e), success=False)
 
+    def _quick_add_expense(self):
+        """Add an expense, letting the rules pick its category."""
+        from ui.dialogs import ExpenseDialog
+        names = [c["name"] for c in self.m.get_categories()]
+        if not names:
+            self._show_message("أضف فئة واحدة على الأقل قبل إضافة المصروفات.", success=False)
+            return
+        try:
+            dlg = ExpenseDialog(self, title="إضافة مصروف", categories=names, categorizer=self.categorizer)
+            if dlg.exec_():
+                name, amount = dlg.get_data()
+                category = dlg.get_category()
+                self.m.add_expense(category, name, amount)
+                if self.categorizer is not None and category != dlg.suggested:
+                    # Remember the correction for the next time this name is entered
+                    self.categorizer.learn(name, category)
+                self._show_message("تمت إضافة المصروف ✅")
+        except Exception as e:
+            self._show_message(str(e), success=False)
+
+    def _edit_rules(self):
+        """Open the categorization rules editor."""
+        from ui.dialogs import RulesDialog
+        names = [c["name"] for c in self.m.get_categories()]
+        RulesDialog(self.categorizer, names, self).exec_()
+
+    # Statement import
+    def _import_statement(self):
+        """Pick a CSV/OFX statement and import it on a background thread."""
+        from ui.workers import ImportWorker
+        names = [c["name"] for c in self.m.get_categories()]
+        if not names:
+            self._show_message("أضف فئة واحدة على الأقل قبل الاستيراد.", success=False)
+            return
+        path, _ = QFileDialog.getOpenFileName(
+            self, "استيراد كشف حساب", "", "كشوف الحساب (*.csv *.ofx *.qfx);;كل الملفات (*)"
+        )
+        if not path:
+            return
+        default, ok = QInputDialog.getItem(
+            self, "الفئة الافتراضية", "الفئة للعمليات غير المصنفة:", names, 0, False
+        )
+        if not ok:
+            return
+
+        self._import_worker = ImportWorker(self.m, path, default, self.categorizer, self)
+        self._import_worker.progress.connect(self._on_import_progress)
+        self._import_worker.finished_import.connect(self._on_import_finished)
+        self._import_worker.failed.connect(self._on_import_failed)
+        self._import_worker.finished.connect(self._on_import_done)
+        self.btn_import.setEnabled(False)
+        self.import_progress.setValue(0)
+        self.import_progress.setFormat("%p%")
+        self.import_row.show()
+        self._import_worker.start()
+
+    def _cancel_import(self):
+        """Stop the running import after its current chunk."""
+        if self._import_worker:
+            self._import_worker.cancel()
+
+    def _on_import_progress(self, percent, imported):
+        """Show import progress."""
+        self.import_progress.setValue(percent)
+        self.import_progress.setFormat(f"{percent}% — {imported}")
+
+    def _on_import_finished(self, stats):
+        """Report the outcome of an import."""
+        self._show_message(
+            f"تم استيراد {stats.imported} مصروف ({stats.duplicates} مكرر، {stats.skipped} متجاوز) ✅"
+        )
+
+    def _on_import_failed(self, error):
+        """Report an import error."""
+        self._show_message(f"تعذّر الاستيراد: {error}", success=False)
+
+    def _on_import_done(self):
+        """Reset the import controls once the worker thread has ended."""
+        self.import_row.hide()
+        self.btn_import.setEnabled(True)
+        self._import_worker.deleteLater()
+        self._import_worker = None
+
+    # Report export
+    def _export_report(self):
+        """Pick a report and a CSV/XLSX/PDF file, then export on a background thread."""
+        from ui.workers import ExportWorker
+        reports = {"المصروفات (كل الأشهر)": "expenses", "الفئات (الشهر الحالي)": "categories",
+                   "الملخص الشهري": "summary"}
+        label, ok = QInputDialog.getItem(self, "تصدير تقرير", "التقرير:", list(reports), 0, False)
+        if not ok:
+            return
+        path, selected = QFileDialog.getSaveFileName(
+            self, "تصدير تقرير", "", "CSV (*.csv);;Excel (*.xlsx);;PDF (*.pdf)"
+        )
+        if not path:
+            return
+        if not os.path.splitext(path)[1]:
+            # Take the extension from the chosen filter
+            path += selected[selected.index("*") + 1:-1]
+
+        self._export_worker = ExportWorker(self.m, path, reports[label], parent=self)
+        self._export_worker.progress.connect(self._on_export_progress)
+        self._export_worker.finished_export.connect(self._on_export_finished)
+        self._export_worker.failed.connect(self._on_export_failed)
+        self._export_worker.finished.connect(self._on_export_done)
+        self.btn_export.setEnabled(False)
+        self.export_progress.setValue(0)
+        self.export_progress.setFormat("%p%")
+        self.export_row.show()
+        self._export_worker.start()
+
+    def _cancel_export(self):
+        """Stop the running export and discard its partial file."""
+        if self._export_worker:
+            self._export_worker.cancel()
+
+    def _on_export_progress(self, percent, written):
+        """Show export progress."""
+        self.export_progress.setValue(percent)
+        self.export_progress.setFormat(f"{percent}% — {written}")
+
+    def _on_export_finished(self, stats):
+        """Report the outcome of an export."""
+        if stats.cancelled:
+            self._show_message("تم إلغاء التصدير", success=False)
+        else:
+            self._show_message(f"تم تصدير {stats.written} صف ✅")
+
+    def _on_export_failed(self, error):
+        """Report an export error."""
+        self._show_message(f"تعذّر التصدير: {error}", success=False)
+
+    def _on_export_done(self):
+        """Reset the export controls once the worker thread has ended."""
+        self.export_row.hide()
+        self.btn_export.setEnabled(True)
+        self._export_worker.deleteLater()
+        self._export_worker = None
+
+    def shutdown(self):
+        """Stop background work before the manager is closed."""
+        self._poll_timer.stop()
+        self._reload_timer.stop()
+        watched = self._watcher.files() + self._watcher.directories()
+        if watched:
+            self._watcher.removePaths(watched)
+        for worker in (self._import_worker, self._export_worker):
+            if worker:
+                worker.cancel()
+                worker.wait()
+
     def _render_categories_table(self):
         """Render categories table."""
-        from config.settings import CURRENCY
-        self.tbl.setUpdatesEnabled(False)
-        self.tbl.setRowCount(0)
-        try:
-            inc = self.m.get_monthly_income()
-            categories = self.m.get_categories()
-            for c in categories:
-                r = self.tbl.rowCount()
-                self.tbl.insertRow(r)
-                self.tbl.setItem(r, 0, QTableWidgetItem(c["name"]))
-                allocated = inc * c["percentage"] / 100.0
-                self.tbl.setItem(r, 1, QTableWidgetItem(f"{allocated:.0f} {CURRENCY}"))
-                btn_edit = QPushButton("تعديل")
-                btn_edit.setObjectName("btnEdit")
-                btn_del = QPushButton("حذف")
-                btn_del.setObjectName("btnDelete")
-                btn_edit.clicked.connect(partial(self._edit_category, c["name"], c["percentage"]))
-                btn_del.clicked.connect(partial(self._delete_category, c["name"]))
-                self.tbl.setCellWidget(r, 2, btn_edit)
-                self.tbl.setCellWidget(r, 3, btn_del)
-        finally:
-            self.tbl.setUpdatesEnabled(True)
+        self.categories_model.reset()
+
+    def _on_action_clicked(self, index):
+        """Dispatch a click on a painted Edit/Delete cell."""
+        model = index.model()
+        record = model.record_at(index.row())
+        if record is None:
+            return
+        if isinstance(model, CategoriesTableModel):
+            if index.column() == COL_EDIT:
+                self._edit_category(record["name"], record["percentage"])
+            else:
+                self._delete_category(record["name"])
+        elif isinstance(model, ExpensesTableModel):
+            if index.column() == COL_EDIT:
+                self._edit_expense(model.category_name, record["name"], record["amount"])
+            else:
+                self._delete_expense(model.category_name, record["name"])
 
     def _edit_category(self, old_name, old_perc):
         """Edit category details."""
+        from ui.dialogs import CategoryDialog
         try:
             dlg = CategoryDialog(self, title="تعديل فئة", init_name=old_name, init_perc=old_perc)
             if dlg.exec_():
                 n, p = dlg.get_data()
                 self.m.update_category(old_name, n, p)
-                self.data_updated.emit()
                 self._show_message("تم تعديل الفئة بنجاح ✅")
         except Exception as e:
             self._show_message(str(e), success=False)
@@ -301,36 +648,152 @@ class BudgetWindow(QWidget):
         if reply == QMessageBox.Yes:
             try:
                 self.m.delete_category(name)
-                self.data_updated.emit()
                 self._show_message("تم حذف الفئة 🗑")
             except Exception as e:
                 self._show_message(str(e), success=False)
 
-    def _clear_grid(self):
-        """Safely clear all cards from layout."""
-        for i in reversed(range(self.grid.count())):
-            item = self.grid.itemAt(i)
-            if item and item.widget():
-                widget = item.widget()
-                widget.setParent(None)
-                widget.deleteLater()
-
     def _render_cards(self):
         """Render category cards."""
         try:
-            self._clear_grid()
-            from config.settings import CURRENCY
-            inc = self.m.get_monthly_income()
-            categories = self.m.get_categories()
-            for i, cat in enumerate(categories):
-                card = self._create_category_card(cat, inc, CURRENCY)
-                if card:
-                    self.grid.addWidget(card, i // 2, i % 2)
+            # Every card is rebound, so anything the reload changed is picked up
+            for i in range(len(self._slots)):
+                self._unbind_slot(i)
+            self._sync_slots()
         except Exception as e:
             print(f"Error rendering cards: {e}")
 
-    def _create_category_card(self, category, income, currency):
-        """Create single category card."""
+    # Search
+    def _apply_search(self, *_):
+        """Filter cards and their rows to the expenses matching the search box."""
+        try:
+            self._search_result = self.m.search_expenses(self.search_input.text())
+        except Exception as e:
+            print(f"Error searching expenses: {e}")
+            return
+        self.search_empty.setVisible(self._search_result == {})
+        self._sync_slots()
+        for name, parts in self._cards.items():
+            parts["table"].model().set_filter(self._card_filter(name))
+
+    def _card_names(self):
+        """Return the categories that get a card: all, or those with search matches."""
+        names = [c["name"] for c in self.m.get_categories()]
+        if self._search_result is None:
+            return names
+        return [name for name in names if name in self._search_result]
+
+    def _card_filter(self, name):
+        """Return the expense names a card shows, or None for all."""
+        if self._search_result is None:
+            return None
+        return self._search_result.get(name, set())
+
+    # Card slots
+    def _sync_slots(self):
+        """Match the grid slots to the shown categories and rebind moved cards."""
+        names = self._card_names()
+        while len(self._slots) > len(names):
+            self._unbind_slot(len(self._slots) - 1)
+            slot = self._slots.pop()
+            self._slot_cards.pop()
+            self.grid.removeWidget(slot)
+            slot.setParent(None)
+            slot.deleteLater()
+        while len(self._slots) < len(names):
+            i = len(self._slots)
+            slot = self._create_slot()
+            self._slots.append(slot)
+            self._slot_cards.append(None)
+            self.grid.addWidget(slot, i // 2, i % 2)
+        for i, name in enumerate(names):
+            parts = self._slot_cards[i]
+            if parts is not None and parts["name"] != name:
+                self._unbind_slot(i)
+        self._schedule_visible_cards()
+
+    def _create_slot(self):
+        """Create an empty placeholder slot of card height."""
+        slot = QFrame()
+        slot.setObjectName("CardSlot")
+        layout = QVBoxLayout(slot)
+        layout.setContentsMargins(0, 0, 0, 0)
+        slot.setFixedHeight(self._card_height or self.CARD_HEIGHT_ESTIMATE)
+        self._set_slot_empty(slot, True)
+        return slot
+
+    @staticmethod
+    def _set_slot_empty(slot, empty):
+        """Toggle the placeholder look of a slot."""
+        slot.setProperty("empty", empty)
+        slot.style().unpolish(slot)
+        slot.style().polish(slot)
+
+    def _schedule_visible_cards(self, *_):
+        """Update the bound cards on the next event-loop turn (coalesces scroll bursts)."""
+        if not self._visible_pending:
+            self._visible_pending = True
+            QTimer.singleShot(0, self._update_visible_cards)
+
+    def _update_visible_cards(self):
+        """Bind cards to slots near the viewport and recycle the ones far from it."""
+        self._visible_pending = False
+        top = self.scroll.verticalScrollBar().value() - self.CARD_OVERSCAN
+        bottom = top + self.scroll.viewport().height() + 2 * self.CARD_OVERSCAN
+        names = self._card_names()
+        margin = self.grid.contentsMargins().top()
+        for i, slot in enumerate(self._slots):
+            # Rows are uniform, so slot positions follow from the index alone
+            row_top = margin + (i // 2) * ((self._card_height or self.CARD_HEIGHT_ESTIMATE) + self.grid.spacing())
+            row_bottom = row_top + (self._card_height or self.CARD_HEIGHT_ESTIMATE)
+            near = row_bottom >= top and row_top <= bottom and i < len(names)
+            if near and self._slot_cards[i] is None:
+                self._bind_slot(i, names[i])
+            elif not near and self._slot_cards[i] is not None:
+                self._unbind_slot(i)
+        self._trim_spare_cards()
+
+    def _bind_slot(self, i, name):
+        """Put a (recycled if possible) card for a category into slot i."""
+        from config.settings import CURRENCY
+        parts = self._spare_cards.pop() if self._spare_cards else self._create_category_card()
+        if parts is None:
+            return
+        parts["name"] = name
+        parts["table"].model().set_category(name, self._card_filter(name))
+        self._update_card_summary(parts, name, CURRENCY)
+        slot = self._slots[i]
+        slot.layout().addWidget(parts["card"])
+        parts["card"].show()
+        self._set_slot_empty(slot, False)
+        self._slot_cards[i] = parts
+        self._cards[name] = parts
+
+    def _unbind_slot(self, i):
+        """Move the card out of slot i into the spare pool, leaving a placeholder."""
+        parts = self._slot_cards[i]
+        if parts is None:
+            return
+        self._slot_cards[i] = None
+        if self._cards.get(parts["name"]) is parts:
+            del self._cards[parts["name"]]
+        if self._current_selected_table is parts["table"]:
+            self._clear_all_selections()
+        slot = self._slots[i]
+        slot.layout().removeWidget(parts["card"])
+        parts["card"].hide()
+        parts["card"].setParent(self.cards_host)
+        self._set_slot_empty(slot, True)
+        self._spare_cards.append(parts)
+
+    def _trim_spare_cards(self):
+        """Destroy spare cards beyond MAX_SPARE_CARDS."""
+        while len(self._spare_cards) > self.MAX_SPARE_CARDS:
+            parts = self._spare_cards.pop()
+            parts["card"].setParent(None)
+            parts["card"].deleteLater()
+
+    def _create_category_card(self):
+        """Create an unbound category card; _bind_slot points it at a category."""
         try:
             card = QFrame()
             card.setObjectName("Card")
@@ -338,89 +801,198 @@ class BudgetWindow(QWidget):
             layout.setContentsMargins(16, 16, 16, 16)
             layout.setSpacing(10)
 
-            title = QLabel(f"{category['name']} ({category['percentage']:.1f}%)")
+            title = QLabel()
             title.setFont(QFont("Tajawal", 13, QFont.Bold))
             layout.addWidget(title)
 
-            allocated = income * category["percentage"] / 100.0
-            spent = sum(s["amount"] for s in category["sub"])
-            remain = allocated - spent
-            percent = min((spent / allocated * 100) if allocated > 0 else 0, 100)
-
             bar = QProgressBar()
-            bar.setValue(int(percent))
             bar.setAlignment(Qt.AlignCenter)
-            bar.setFormat(f"{percent:.1f}%")
             bar.setMinimum(0)
             bar.setMaximum(100)
             layout.addWidget(bar)
 
-            color = "red" if remain < 0 else "#424242"
-            info_text = f"المخصص: {allocated:.0f} {currency} | المصروف: {spent:.0f} {currency} | المتبقي: <span style='color:{color};'>{remain:.0f} {currency}</span>"
-            info = QLabel(info_text)
+            info = QLabel()
             info.setTextFormat(Qt.RichText)
             info.setObjectName("infoLabel")
             layout.addWidget(info)
 
-            table = self._create_expenses_table(category)
+            table = self._create_expenses_table()
             layout.addWidget(table)
 
             add_btn = QPushButton("إضافة مصروف")
             add_btn.setFixedHeight(42)
             add_btn.setObjectName("btnAddExpense")
-            add_btn.clicked.connect(partial(self._add_expense, category["name"]))
             layout.addWidget(add_btn)
 
-            return card
+            parts = {"card": card, "title": title, "bar": bar, "info": info, "table": table,
+                     "add_btn": add_btn, "name": None}
+            # Cards are recycled, so the button reads the category it is bound to at click time
+            add_btn.clicked.connect(lambda: self._add_expense(parts["name"]))
+            self._measure_card(card)
+            return parts
         except Exception as e:
             print(f"Error creating card: {e}")
             return None
 
-    def _create_expenses_table(self, category):
-        """Create expenses table for a category."""
-        table = QTableWidget(0, 4)
-        table.setHorizontalHeaderLabels(["اسم المصروف", "المبلغ", "تعديل", "حذف"])
-        self._apply_table_style(table)
-        table.itemSelectionChanged.connect(lambda: self._on_table_selection_changed(table))
-        header = table.horizontalHeader()
-        header.setSectionResizeMode(0, QHeaderView.Stretch)
-        for col in range(1, 4):
-            header.setSectionResizeMode(col, QHeaderView.ResizeToContents)
-        for expense in category["sub"]:
-            row = table.rowCount()
-            table.insertRow(row)
-            table.setItem(row, 0, QTableWidgetItem(expense["name"]))
-            table.setItem(row, 1, QTableWidgetItem(f"{expense['amount']:.0f}"))
-            btn_edit = QPushButton("تعديل")
-            btn_edit.setObjectName("btnEdit")
-            btn_del = QPushButton("حذف")
-            btn_del.setObjectName("btnDelete")
-            btn_edit.clicked.connect(partial(self._edit_expense, category["name"], expense["name"], expense["amount"]))
-            btn_del.clicked.connect(partial(self._delete_expense, category["name"], expense["name"]))
-            table.setCellWidget(row, 2, btn_edit)
-            table.setCellWidget(row, 3, btn_del)
+    def _measure_card(self, card):
+        """Size every slot like the first real card so the scroll range is exact."""
+        if self._card_height is not None:
+            return
+        card.ensurePolished()
+        self._card_height = card.sizeHint().height()
+        for slot in self._slots:
+            slot.setFixedHeight(self._card_height)
+
+    def _update_card_summary(self, parts, name, currency):
+        """Refresh the title, progress bar and totals of a cached card."""
+        summary = self.m.get_category_summary(name)
+        parts["title"].setText(f"{name} ({summary['percentage']:.1f}%)")
+
+        allocated = summary["allocated"]
+        spent = summary["spent"]
+        remain = summary["remaining"]
+        percent = min(summary["percent_used"], 100)
+
+        parts["bar"].setValue(int(percent))
+        parts["bar"].setFormat(f"{percent:.1f}%")
+
+        color = "red" if remain < 0 else "#424242"
+        info_text = f"المخصص: {allocated:.0f} {currency} | المصروف: {spent:.0f} {currency} | المتبقي: <span style='color:{color};'>{remain:.0f} {currency}</span>"
+        parts["info"].setText(info_text)
+
+    def _create_expenses_table(self):
+        """Create an expenses table; its model is pointed at a category when the card is bound."""
+        model = ExpensesTableModel(self.m, None)
+        table = self._create_table_view(model)
+        # Let the model live and die with its card
+        model.setParent(table)
         return table
 
+    # Incremental updates
+    def _queue_change(self, event):
+        """Collect a change event from any thread; wake the GUI thread once per burst.
+
+        Background imports produce thousands of events, and crossing threads
+        with one signal each would make the GUI thread wait for the GIL on
+        every single one.
+        """
+        with self._queue_lock:
+            self._update_queue.append(event)
+            first = len(self._update_queue) == 1
+        if first:
+            self.changes_pending.emit()
+
+    def _schedule_flush(self):
+        """Apply the queued changes on the next event-loop turn."""
+        QTimer.singleShot(0, self._flush_changes)
+
+    def _flush_changes(self):
+        """Apply queued change events, falling back to a full reload for large bursts."""
+        with self._queue_lock:
+            events, self._update_queue = self._update_queue, []
+        if len(events) > self.MAX_PATCHES:
+            self.data_updated.emit()
+            return
+        for event in events:
+            self._apply_change(event)
+        if self._search_result is not None:
+            # Matches may have appeared or gone; re-run the query
+            self._apply_search()
+
+    def _on_save_finished(self, ok, error):
+        """Warn the user when writing the data file failed."""
+        if not ok:
+            self._show_message(f"تعذّر حفظ البيانات: {error}", success=False)
+
+    def _apply_change(self, event):
+        """Patch only the widgets affected by a ChangeEvent."""
+        if self._is_loading:
+            # A full reload is pending and will pick up this change
+            return
+        try:
+            handler = {
+                ChangeEvent.INCOME_CHANGED: self._on_income_changed,
+                ChangeEvent.CATEGORY_ADDED: self._on_category_added,
+                ChangeEvent.CATEGORY_UPDATED: self._on_category_updated,
+                ChangeEvent.CATEGORY_DELETED: self._on_category_deleted,
+                ChangeEvent.EXPENSE_ADDED: self._on_expense_changed,
+                ChangeEvent.EXPENSE_UPDATED: self._on_expense_changed,
+                ChangeEvent.EXPENSE_DELETED: self._on_expense_changed,
+                ChangeEvent.PERIOD_CLOSED: lambda e: self.data_updated.emit(),
+                ChangeEvent.DATA_RELOADED: lambda e: self.data_updated.emit(),
+            }.get(event.kind)
+            if handler:
+                handler(event)
+        except Exception as e:
+            print(f"Error applying change: {e}")
+            self.data_updated.emit()
+
+    def _on_income_changed(self, event):
+        """Update allocated amounts in the table and every card summary."""
+        from config.settings import CURRENCY
+        inc = self.m.get_monthly_income()
+        self.income_input.blockSignals(True)
+        self.income_input.setText(f"{inc:.2f}")
+        self.income_input.blockSignals(False)
+        self.categories_model.refresh()
+        for name, parts in self._cards.items():
+            self._update_card_summary(parts, name, CURRENCY)
+
+    def _on_category_added(self, event):
+        """Append a row and a card slot for a new category."""
+        self.categories_model.sync()
+        self._sync_slots()
+
+    def _on_category_updated(self, event):
+        """Refresh the row and card of an edited category."""
+        from config.settings import CURRENCY
+        self.categories_model.sync()
+        c = self.m.get_category(event.category)
+        parts = self._cards.pop(event.old_category, None)
+        if c is None or parts is None:
+            return
+        self._cards[c["name"]] = parts
+        self._update_card_summary(parts, c["name"], CURRENCY)
+        if event.old_category != c["name"]:
+            # The add button and expenses model follow the bound name
+            parts["name"] = c["name"]
+            parts["table"].model().set_category(c["name"], self._card_filter(c["name"]))
+
+    def _on_category_deleted(self, event):
+        """Remove the row and card slot of a deleted category."""
+        self.categories_model.sync()
+        self._sync_slots()
+
+    def _on_expense_changed(self, event):
+        """Patch the expense rows and summary of the affected card."""
+        from config.settings import CURRENCY
+        c = self.m.get_category(event.category)
+        parts = self._cards.get(event.category)
+        if c is None or parts is None:
+            return
+        parts["table"].model().sync()
+        self._update_card_summary(parts, c["name"], CURRENCY)
+
     def _add_expense(self, cat_name):
         """Add expense to a category."""
+        from ui.dialogs import ExpenseDialog
         try:
             dlg = ExpenseDialog(self, title="إضافة مصروف")
             if dlg.exec_():
                 name, amount = dlg.get_data()
                 self.m.add_expense(cat_name, name, amount)
-                self.data_updated.emit()
                 self._show_message("تمت إضافة المصروف ✅")
         except Exception as e:
             self._show_message(str(e), success=False)
 
     def _edit_expense(self, cat_name, old_name, old_amount):
         """Edit existing expense."""
+        from ui.dialogs import ExpenseDialog
         try:
             dlg = ExpenseDialog(self, title="تعديل مصروف", init_name=old_name, init_amount=old_amount)
             if dlg.exec_():
                 name, amount = dlg.get_data()
                 self.m.update_expense(cat_name, old_name, name, amount)
-                self.data_updated.emit()
                 self._show_message("تم تعديل المصروف ✅")
         except Exception as e:
             self._show_message(str(e), success=False)
@@ -438,7 +1010,6 @@ class BudgetWindow(QWidget):
         if reply == QMessageBox.Yes:
             try:
                 self.m.delete_expense(cat_name, expense_name)
-                self.data_updated.emit()
                 self._show_message("تم حذف المصروف 🗑")
             except Exception as e:
                 self._show_message(str(e), success=False)
@@ -1,8 +1,10 @@
 from PyQt5.QtWidgets import (
-    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QSpacerItem, QSizePolicy
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QSpacerItem, QSizePolicy,
+    QComboBox, QTableWidget, QTableWidgetItem, QAbstractItemView, QHeaderView
 )
 from PyQt5.QtCore import Qt
-from config import settings
+from ui.styles import read_qss
+from core.categorizer import Rule
 
 
 class CategoryDialog(QDialog):
@@ -17,8 +19,7 @@ class CategoryDialog(QDialog):
         self.perc_input = QLineEdit(str(init_perc))
 
         # Load dialog QSS style
-        with open(settings.QSS_DIR / "dialogs.qss", "r", encoding="utf-8") as f:
-            self.setStyleSheet(f.read())
+        self.setStyleSheet(read_qss("dialogs.qss"))
 
         self._ui()
 
@@ -94,17 +95,26 @@ class CategoryDialog(QDialog):
 class ExpenseDialog(QDialog):
     """Dialog for adding or editing an expense."""
     
-    def __init__(self, parent=None, title="إضافة مصروف", init_name="", init_amount=""):
-        """Initialize ExpenseDialog."""
+    def __init__(self, parent=None, title="إضافة مصروف", init_name="", init_amount="",
+                 categories=None, categorizer=None):
+        """Initialize ExpenseDialog.
+
+        With a list of categories the dialog also asks for the category, and a
+        categorizer preselects it from the rules while the user types.
+        """
         super().__init__(parent)
         self.setWindowTitle(title)
         self.setLayoutDirection(Qt.RightToLeft)
         self.name_input = QLineEdit(init_name)
         self.amount_input = QLineEdit(str(init_amount))
+        self.categories = categories
+        self.categorizer = categorizer
+        self.category_input = None
+        self.suggested = None
+        self._category_picked = False
 
         # Load dialog QSS style
-        with open(settings.QSS_DIR / "dialogs.qss", "r", encoding="utf-8") as f:
-            self.setStyleSheet(f.read())
+        self.setStyleSheet(read_qss("dialogs.qss"))
 
         self._ui()
 
@@ -116,6 +126,16 @@ class ExpenseDialog(QDialog):
         layout = QVBoxLayout(self)
         layout.setSpacing(20)
 
+        if self.categories:
+            layout.addWidget(QLabel("الفئة"))
+            self.category_input = QComboBox()
+            self.category_input.addItems(self.categories)
+            # Stop suggesting once the user picks a category by hand
+            self.category_input.activated.connect(lambda _: setattr(self, "_category_picked", True))
+            layout.addWidget(self.category_input)
+            self.name_input.textChanged.connect(self._suggest_category)
+            self.amount_input.textChanged.connect(self._suggest_category)
+
         lbl_name = QLabel("اسم المصروف")
         self.name_input.setPlaceholderText("مثال: إيجار، كهرباء، تسوق")
         layout.addWidget(lbl_name)
@@ -175,3 +195,145 @@ class ExpenseDialog(QDialog):
             return self.name_input.text().strip(), float(self.amount_input.text().strip())
         except ValueError:
             return self.name_input.text().strip(), 0.0
+
+    def get_category(self):
+        """Return the chosen category, or None when the dialog does not ask for one."""
+        return self.category_input.currentText() if self.category_input else None
+
+    def _suggest_category(self):
+        """Preselect the category the rules give for the typed name and amount."""
+        if not self.categorizer or self._category_picked:
+            return
+        name, amount = self.get_data()
+        self.suggested = self.categorizer.classify(name, amount or None) if name else None
+        if self.suggested in self.categories:
+            self.category_input.setCurrentText(self.suggested)
+
+
+class RulesDialog(QDialog):
+    """Dialog listing categorization rules, with a form to add and delete them."""
+
+    KIND_LABELS = {
+        Rule.EXACT: "الاسم يساوي",
+        Rule.PREFIX: "الاسم يبدأ بـ",
+        Rule.CONTAINS: "الاسم يحتوي",
+        Rule.REGEX: "تعبير نمطي",
+        Rule.AMOUNT: "نطاق المبلغ فقط",
+    }
+
+    def __init__(self, categorizer, categories, parent=None):
+        """Initialize RulesDialog with the categorizer and the category names."""
+        super().__init__(parent)
+        self.categorizer = categorizer
+        self.categories = categories
+        self.setWindowTitle("قواعد التصنيف")
+        self.setLayoutDirection(Qt.RightToLeft)
+
+        # Load dialog QSS style
+        self.setStyleSheet(read_qss("dialogs.qss"))
+
+        self._ui()
+        self._refresh()
+
+    def _ui(self):
+        """Build the dialog UI layout."""
+        self.resize(720, 520)
+        layout = QVBoxLayout(self)
+        layout.setSpacing(12)
+
+        hint = QLabel("تُطبّق القواعد بالترتيب، وأول قاعدة مطابقة تحدد الفئة.")
+        hint.setObjectName("hintLabel")
+        layout.addWidget(hint)
+
+        self.table = QTableWidget(0, 5)
+        self.table.setHorizontalHeaderLabels(["النوع", "النص", "الفئة", "من مبلغ", "إلى مبلغ"])
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        layout.addWidget(self.table)
+
+        form = QHBoxLayout()
+        self.kind_input = QComboBox()
+        for kind in Rule.KINDS:
+            self.kind_input.addItem(self.KIND_LABELS[kind], kind)
+        self.pattern_input = QLineEdit()
+        self.pattern_input.setPlaceholderText("مثال: STARBUCKS")
+        self.category_input = QComboBox()
+        self.category_input.addItems(self.categories)
+        self.min_input = QLineEdit()
+        self.min_input.setPlaceholderText("من")
+        self.min_input.setFixedWidth(80)
+        self.max_input = QLineEdit()
+        self.max_input.setPlaceholderText("إلى")
+        self.max_input.setFixedWidth(80)
+        for widget in (self.kind_input, self.pattern_input, self.category_input, self.min_input, self.max_input):
+            form.addWidget(widget)
+        layout.addLayout(form)
+
+        self.error_label = QLabel()
+        self.error_label.setObjectName("hintLabel")
+        layout.addWidget(self.error_label)
+
+        buttons = QHBoxLayout()
+        add_btn = QPushButton("إضافة قاعدة")
+        delete_btn = QPushButton("حذف المحددة")
+        close_btn = QPushButton("إغلاق")
+        add_btn.setObjectName("saveBtn")
+        close_btn.setObjectName("cancelBtn")
+        add_btn.clicked.connect(self._on_add)
+        delete_btn.clicked.connect(self._on_delete)
+        close_btn.clicked.connect(self.accept)
+        buttons.addWidget(add_btn)
+        buttons.addWidget(delete_btn)
+        buttons.addItem(QSpacerItem(40, 20, QSizePolicy.Expanding, QSizePolicy.Minimum))
+        buttons.addWidget(close_btn)
+        layout.addLayout(buttons)
+
+    def _refresh(self):
+        """Fill the table with the current rules."""
+        rules = self.categorizer.rules()
+        self.table.setRowCount(len(rules))
+        for row, rule in enumerate(rules):
+            values = [
+                self.KIND_LABELS.get(rule.kind, rule.kind), rule.pattern or "", rule.category,
+                "" if rule.min_amount is None else f"{rule.min_amount:g}",
+                "" if rule.max_amount is None else f"{rule.max_amount:g}",
+            ]
+            for col, value in enumerate(values):
+                self.table.setItem(row, col, QTableWidgetItem(value))
+
+    @staticmethod
+    def _amount(line_edit):
+        """Return the number typed in an optional amount field, or None."""
+        text = line_edit.text().strip()
+        if not text:
+            return None
+        try:
+            return float(text)
+        except ValueError:
+            raise ValueError("حدود المبلغ يجب أن تكون أرقاماً.")
+
+    def _on_add(self):
+        """Validate the form and add a rule."""
+        try:
+            self.categorizer.add_rule(
+                self.kind_input.currentData(), self.pattern_input.text(), self.category_input.currentText(),
+                self._amount(self.min_input), self._amount(self.max_input)
+            )
+        except ValueError as e:
+            self.error_label.setText(str(e))
+            return
+        self.error_label.clear()
+        self.pattern_input.clear()
+        self.min_input.clear()
+        self.max_input.clear()
+        self._refresh()
+
+    def _on_delete(self):
+        """Delete the selected rule."""
+        row = self.table.currentRow()
+        if row >= 0:
+            self.categorizer.remove_rule(row)
+            self._refresh()
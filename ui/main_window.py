@@ -1,7 +1,7 @@
 from PyQt5.QtWidgets import QMainWindow, QStackedWidget
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QIcon
-from core.budget_manager import BudgetManager
+from core.startup import open_budget, profiler
 from ui.budget_window import BudgetWindow
 from config.settings import APP_TITLE, APP_ICON
 
@@ -9,27 +9,46 @@ from config.settings import APP_TITLE, APP_ICON
 class MainWindow(QMainWindow):
     """Main application window."""
 
-    def __init__(self):
-        """Initialize the main window."""
+    def __init__(self, budget_data=None):
+        """Initialize the main window.
+
+        budget_data is a BackgroundCall already opening the (manager,
+        categorizer) pair; it is waited for only once the window frame is
+        built. Without it the data is opened here.
+        """
         super().__init__()
         self.setWindowTitle(APP_TITLE)
         self.setWindowIcon(QIcon(str(APP_ICON)))
         self.resize(1280, 800)
         self.setLayoutDirection(Qt.RightToLeft)
 
-        # Initialize budget manager
-        self.manager = BudgetManager()
-
         # Create stacked widget to manage pages
         self.stack = QStackedWidget()
         self.setCentralWidget(self.stack)
 
+        # Initialize budget manager
+        if budget_data is None:
+            self.manager, self.categorizer = open_budget()
+        else:
+            with profiler.phase("wait for budget data"):
+                self.manager, self.categorizer = budget_data.get()
+
         # Display budget management window
         self._show_budget()
 
     def _show_budget(self):
         """Display the budget management interface."""
-        self.budget = BudgetWindow(self.manager)
+        with profiler.phase("build budget window"):
+            self.budget = BudgetWindow(self.manager, self.categorizer)
         self.stack.addWidget(self.budget)
         self.stack.setCurrentWidget(self.budget)
         self.showMaximized()
+
+    def closeEvent(self, event):
+        """Flush pending data before the window closes."""
+        try:
+            self.budget.shutdown()
+            self.manager.close()
+        except Exception as e:
+            print(f"Error closing storage: {e}")
+        super().closeEvent(event)
@@ -0,0 +1,91 @@
+from PyQt5.QtCore import Qt, QRectF, QMarginsF
+from PyQt5.QtGui import QPdfWriter, QPainter, QPageSize, QPageLayout, QFont, QFontMetricsF, QPen, QColor
+
+
+class PdfTableWriter:
+    """Write report rows as a paginated right-to-left table with QPdfWriter.
+
+    Rows are painted as they arrive and every full page is emitted right
+    away, so only the current page is held in memory. Painting on a
+    QPdfWriter is allowed outside the GUI thread.
+    """
+
+    RESOLUTION = 150
+    FONT_SIZE = 9
+
+    def __init__(self, path, title=""):
+        """Open the PDF file with an A4 page and a title."""
+        self.title = title
+        self._pdf = QPdfWriter(path)
+        self._pdf.setResolution(self.RESOLUTION)
+        self._pdf.setPageLayout(QPageLayout(
+            QPageSize(QPageSize.A4), QPageLayout.Portrait, QMarginsF(12, 12, 12, 12), QPageLayout.Millimeter
+        ))
+        self._pdf.setTitle(title)
+        self._painter = QPainter(self._pdf)
+        self._painter.setLayoutDirection(Qt.RightToLeft)
+        self._font = QFont("Tajawal", self.FONT_SIZE)
+        self._bold = QFont(self._font)
+        self._bold.setBold(True)
+        self._painter.setFont(self._font)
+        self._row_height = QFontMetricsF(self._font, self._pdf).height() * 1.6
+        self._page = QRectF(self._painter.viewport())
+        self._headers = []
+        self._y = 0.0
+        self._page_number = 1
+
+    def write_header(self, headers):
+        """Remember the header row and start the first page with the title."""
+        self._headers = [str(h) for h in headers]
+        title_font = QFont(self._bold)
+        title_font.setPointSize(self.FONT_SIZE + 5)
+        self._painter.setFont(title_font)
+        title_height = self._row_height * 1.8
+        self._painter.drawText(QRectF(0, 0, self._page.width(), title_height),
+                               Qt.AlignRight | Qt.AlignVCenter, self.title)
+        self._painter.setFont(self._font)
+        self._y = title_height
+        self._draw_row(self._headers, header=True)
+
+    def write_row(self, row):
+        """Paint one row, starting a new page when the current one is full."""
+        if self._y + self._row_height > self._page.height() - self._row_height:
+            self._new_page()
+        self._draw_row(["" if v is None else str(v) for v in row])
+
+    def close(self):
+        """Finish the last page and close the file."""
+        if self._painter.isActive():
+            self._draw_page_number()
+            self._painter.end()
+
+    def _new_page(self):
+        """Emit the current page and repeat the header on the next one."""
+        self._draw_page_number()
+        self._pdf.newPage()
+        self._page_number += 1
+        self._y = 0.0
+        self._draw_row(self._headers, header=True)
+
+    def _draw_row(self, values, header=False):
+        """Paint cells from the right edge, one equal-width column per value."""
+        width = self._page.width() / max(len(self._headers), 1)
+        if header:
+            self._painter.fillRect(QRectF(0, self._y, self._page.width(), self._row_height), QColor("#F2F2F7"))
+            self._painter.setFont(self._bold)
+        for i, value in enumerate(values):
+            x = self._page.width() - (i + 1) * width
+            cell = QRectF(x + 4, self._y, width - 8, self._row_height)
+            text = self._painter.fontMetrics().elidedText(value, Qt.ElideRight, int(cell.width()))
+            self._painter.drawText(cell, Qt.AlignRight | Qt.AlignVCenter, text)
+        if header:
+            self._painter.setFont(self._font)
+        self._y += self._row_height
+        self._painter.setPen(QPen(QColor("#E5E5EA")))
+        self._painter.drawLine(0, int(self._y), int(self._page.width()), int(self._y))
+        self._painter.setPen(QPen(QColor("#202124")))
+
+    def _draw_page_number(self):
+        """Paint the page number at the bottom of the current page."""
+        self._painter.drawText(QRectF(0, self._page.height() - self._row_height, self._page.width(), self._row_height),
+                               Qt.AlignCenter, str(self._page_number))
@@ -0,0 +1,19 @@
+import functools
+import os
+from config import settings
+
+
+@functools.lru_cache(maxsize=None)
+def read_qss(name: str) -> str:
+    """Return the text of a QSS file in QSS_DIR ("" if missing), read from disk only once."""
+    path = os.path.join(settings.QSS_DIR, name)
+    if not os.path.exists(path):
+        return ""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def preload_qss():
+    """Read every stylesheet ahead of time (safe to call from a worker thread)."""
+    for name in ("app.qss", "budget.qss", "dialogs.qss"):
+        read_qss(name)
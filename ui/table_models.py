@@ -0,0 +1,262 @@
+from PyQt5.QtWidgets import QStyledItemDelegate, QStyle
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QEvent, pyqtSignal
+from PyQt5.QtGui import QColor, QFont
+from config.settings import CURRENCY
+from core.records import ExpenseList
+
+
+# Column indexes shared by every budget table
+COL_NAME = 0
+COL_AMOUNT = 1
+COL_EDIT = 2
+COL_DELETE = 3
+
+
+class BudgetTableModel(QAbstractTableModel):
+    """Base table model showing a snapshot of BudgetManager rows.
+
+    The keys of the rows are copied under the manager's read lock by
+    reset() and sync(), which run on the GUI thread, and the view is served
+    from that copy: the manager's lists may grow on a background import
+    thread while the view paints.
+    """
+
+    HEADERS = ["الاسم", "المبلغ", "تعديل", "حذف"]
+    ACTIONS = {COL_EDIT: "تعديل", COL_DELETE: "حذف"}
+
+    def __init__(self, manager, parent=None):
+        """Initialize the model with the budget manager."""
+        super().__init__(parent)
+        self.m = manager
+        self._keys = self._snapshot()
+
+    # Hooks implemented by subclasses
+    def _rows(self):
+        """Return the live list of records shown by the model (called under the read lock)."""
+        raise NotImplementedError
+
+    def _key(self, record):
+        """Return a comparable key holding everything the view shows of a record."""
+        raise NotImplementedError
+
+    def _display(self, key, column):
+        """Return display text for a column of the row with the given key."""
+        raise NotImplementedError
+
+    def _record(self, key):
+        """Return the fields of the row with the given key as a dict."""
+        raise NotImplementedError
+
+    def _keys_of(self, rows):
+        """Return the keys of rows (subclasses may read them in bulk)."""
+        return [self._key(r) for r in rows]
+
+    def _snapshot(self):
+        """Copy the keys of the rows while no writer can change them."""
+        with self.m.read_lock:
+            return self._keys_of(self._rows())
+
+    # Qt model interface
+    def rowCount(self, parent=QModelIndex()):
+        """Return the number of rows known to the view."""
+        return 0 if parent.isValid() else len(self._keys)
+
+    def columnCount(self, parent=QModelIndex()):
+        """Return the number of columns."""
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        """Return header labels."""
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        """Return cell data for the view."""
+        if not index.isValid() or index.row() >= len(self._keys):
+            return None
+        col = index.column()
+        if role == Qt.DisplayRole:
+            if col in self.ACTIONS:
+                return self.ACTIONS[col]
+            return self._display(self._keys[index.row()], col)
+        if role == Qt.TextAlignmentRole and col in self.ACTIONS:
+            return Qt.AlignCenter
+        return None
+
+    def record_at(self, row):
+        """Return the fields displayed at the given row as a dict, or None."""
+        return self._record(self._keys[row]) if 0 <= row < len(self._keys) else None
+
+    # Synchronization with the manager
+    def reset(self):
+        """Reload every row from the manager."""
+        self.beginResetModel()
+        self._keys = self._snapshot()
+        self.endResetModel()
+
+    def refresh(self):
+        """Repaint all rows without changing the row set (e.g. income changed)."""
+        if self._keys:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self._keys) - 1, COL_AMOUNT))
+
+    def sync(self):
+        """Emit minimal insert/remove/change notifications after a mutation."""
+        old = self._keys
+        new = self._snapshot()
+        if new == old:
+            return
+
+        if len(new) > len(old) and new[:len(old)] == old:
+            self.beginInsertRows(QModelIndex(), len(old), len(new) - 1)
+            self._keys = new
+            self.endInsertRows()
+        elif len(new) == len(old):
+            changed = [i for i, (a, b) in enumerate(zip(old, new)) if a != b]
+            self._keys = new
+            self.dataChanged.emit(self.index(changed[0], 0), self.index(changed[-1], COL_AMOUNT))
+        elif len(new) < len(old):
+            removed = self._removed_rows(old, new)
+            if removed is None:
+                self.reset()
+                return
+            # Remove from the bottom up so earlier row numbers stay valid
+            for row in reversed(removed):
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self._keys[row]
+                self.endRemoveRows()
+        else:
+            self.reset()
+
+    @staticmethod
+    def _removed_rows(old, new):
+        """Return indexes of old rows missing from new, or None if not a pure removal."""
+        removed = []
+        j = 0
+        for i, key in enumerate(old):
+            if j < len(new) and new[j] == key:
+                j += 1
+            else:
+                removed.append(i)
+        return removed if j == len(new) else None
+
+
+class CategoriesTableModel(BudgetTableModel):
+    """Table model listing categories with their allocated amount."""
+
+    HEADERS = ["اسم الفئة", "المبلغ", "تعديل", "حذف"]
+
+    def _rows(self):
+        """Return the manager's categories."""
+        return self.m.get_categories()
+
+    def _key(self, record):
+        """Return the category name and percentage."""
+        return record["name"], record["percentage"]
+
+    def _display(self, key, column):
+        """Return category name or allocated amount."""
+        name, percentage = key
+        if column == COL_NAME:
+            return name
+        allocated = self.m.get_monthly_income() * percentage / 100.0
+        return f"{allocated:.0f} {CURRENCY}"
+
+    def _record(self, key):
+        """Return {"name", "percentage"}."""
+        return {"name": key[0], "percentage": key[1]}
+
+
+class ExpensesTableModel(BudgetTableModel):
+    """Table model listing the expenses of a single category."""
+
+    HEADERS = ["اسم المصروف", "المبلغ", "تعديل", "حذف"]
+
+    def __init__(self, manager, category_name, parent=None):
+        """Initialize the model for the given category."""
+        self.category_name = category_name
+        # Expense names shown while a search is active (None shows every row)
+        self.filter_names = None
+        super().__init__(manager, parent)
+
+    def set_category(self, category_name, filter_names=None):
+        """Point the model at a (renamed) category, showing only filter_names if given."""
+        self.category_name = category_name
+        self.filter_names = filter_names
+        self.reset()
+
+    def set_filter(self, filter_names):
+        """Show only the expenses whose names are in filter_names (None shows all)."""
+        if filter_names != self.filter_names:
+            self.filter_names = filter_names
+            self.reset()
+
+    def _rows(self):
+        """Return the expenses of the model's category, filtered by the search."""
+        c = self.m.get_category(self.category_name)
+        rows = c["sub"] if c else []
+        if self.filter_names is None:
+            return rows
+        return [s for s in rows if s["name"] in self.filter_names]
+
+    def _key(self, record):
+        """Return the expense name and amount."""
+        return record["name"], record["amount"]
+
+    def _keys_of(self, rows):
+        """Read the keys straight from the expense columns when the rows are not filtered."""
+        if isinstance(rows, ExpenseList):
+            return rows.pairs()
+        return super()._keys_of(rows)
+
+    def _display(self, key, column):
+        """Return expense name or amount."""
+        name, amount = key
+        if column == COL_NAME:
+            return name
+        return f"{amount:.0f}"
+
+    def _record(self, key):
+        """Return {"name", "amount"}."""
+        return {"name": key[0], "amount": key[1]}
+
+
+class ActionButtonDelegate(QStyledItemDelegate):
+    """Paint Edit/Delete cells as link-style buttons without real widgets."""
+
+    # Emitted with the model index of the clicked action cell
+    clicked = pyqtSignal(QModelIndex)
+
+    COLOR = QColor("#007AFF")
+    HOVER_COLOR = QColor("#005BEA")
+
+    def paint(self, painter, option, index):
+        """Draw the action label, underlined while hovered."""
+        # Keep the selection background consistent with the rest of the row
+        self.initStyleOption(option, index)
+        text = option.text
+        option.text = ""
+        style = option.widget.style() if option.widget else None
+        if style:
+            style.drawControl(QStyle.CE_ItemViewItem, option, painter, option.widget)
+
+        hovered = bool(option.state & QStyle.State_MouseOver)
+        font = QFont(option.font)
+        font.setPointSize(max(font.pointSize() - 1, 8))
+        font.setWeight(QFont.DemiBold)
+        font.setUnderline(hovered)
+
+        painter.save()
+        painter.setFont(font)
+        painter.setPen(self.HOVER_COLOR if hovered else self.COLOR)
+        painter.drawText(option.rect, Qt.AlignCenter, text)
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        """Emit clicked when the left mouse button is released over the cell."""
+        if (event.type() == QEvent.MouseButtonRelease
+                and event.button() == Qt.LeftButton
+                and option.rect.contains(event.pos())):
+            self.clicked.emit(index)
+            return True
+        return super().editorEvent(event, model, option, index)
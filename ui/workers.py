@@ -0,0 +1,81 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+from core.exporter import export_report
+from core.importer import import_statement
+from ui.pdf_writer import PdfTableWriter
+
+
+class ImportWorker(QThread):
+    """Import a bank statement into the manager on a background thread."""
+
+    # Emitted after every committed chunk with (percent of file read, expenses imported)
+    progress = pyqtSignal(int, int)
+    # Emitted with the final ImportStats, also after a cancel
+    finished_import = pyqtSignal(object)
+    # Emitted with an error message when the import stops on an error
+    failed = pyqtSignal(str)
+
+    def __init__(self, manager, path, default_category, categorizer=None, parent=None, **options):
+        """Initialize ImportWorker with the statement path and import options."""
+        super().__init__(parent)
+        self.m = manager
+        self.path = path
+        self.default_category = default_category
+        self.categorizer = categorizer
+        self.options = options
+        self._cancelled = False
+
+    def cancel(self):
+        """Ask the import to stop after the current chunk."""
+        self._cancelled = True
+
+    def run(self):
+        """Run the import pipeline, reporting progress through signals."""
+        try:
+            stats = import_statement(
+                self.m, self.path, default_category=self.default_category,
+                classify=self.categorizer.classify_transaction if self.categorizer else None,
+                progress=lambda s: self.progress.emit(s.percent(), s.imported),
+                cancelled=lambda: self._cancelled, **self.options
+            )
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.finished_import.emit(stats)
+
+
+class ExportWorker(QThread):
+    """Export a report from the manager to a file on a background thread."""
+
+    # Emitted every few thousand rows with (percent written, rows written)
+    progress = pyqtSignal(int, int)
+    # Emitted with the final ExportStats, also after a cancel
+    finished_export = pyqtSignal(object)
+    # Emitted with an error message when the export stops on an error
+    failed = pyqtSignal(str)
+
+    def __init__(self, manager, path, report, periods=None, parent=None):
+        """Initialize ExportWorker with the target path and report name."""
+        super().__init__(parent)
+        self.m = manager
+        self.path = path
+        self.report = report
+        self.periods = periods
+        self._cancelled = False
+
+    def cancel(self):
+        """Ask the export to stop; the partial file is removed."""
+        self._cancelled = True
+
+    def run(self):
+        """Run the export, reporting progress through signals."""
+        writer_class = PdfTableWriter if self.path.lower().endswith(".pdf") else None
+        try:
+            stats = export_report(
+                self.m, self.path, self.report, self.periods, writer_class,
+                progress=lambda s: self.progress.emit(s.percent(), s.written),
+                cancelled=lambda: self._cancelled
+            )
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.finished_export.emit(stats)